@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class ClientsConfig(AppConfig):
     name = 'clients'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,84 @@
+from django.db import transaction
+from django.db.models import Count, F, Q
+import logging
+
+from gym.cache import bump_version
+from gym.db import single_row
+from .models import Client, MembershipCounter
+
+logger = logging.getLogger(__name__)
+
+# Cada cliente cuenta en exactamente uno: su estado de pago o 'deleted' si está en la papelera
+BUCKETS = ['pending', 'paid', 'overdue', 'deleted']
+
+
+def adjust(deltas):
+    """Aplica incrementos {contador: delta} con UPDATE ... SET value = value + delta"""
+    for key, delta in deltas.items():
+        if not delta:
+            continue
+        updated = MembershipCounter.objects.filter(key=key).update(value=F('value') + delta)
+        if not updated:
+            # Primer uso del contador: se crea y se vuelve a aplicar el delta
+            MembershipCounter.objects.get_or_create(key=key)
+            MembershipCounter.objects.filter(key=key).update(value=F('value') + delta)
+
+
+def move(old_bucket, new_bucket):
+    """Un cliente pasa de un contador a otro (None = alta o baja definitiva)"""
+    if old_bucket == new_bucket:
+        return
+    deltas = {}
+    if old_bucket:
+        deltas[old_bucket] = -1
+    if new_bucket:
+        deltas[new_bucket] = 1
+    adjust(deltas)
+
+
+def get_counts():
+    """Lee todos los contadores (una consulta sobre una tabla de pocas filas)"""
+    counts = dict.fromkeys(BUCKETS, 0)
+    counts.update(MembershipCounter.objects.values_list('key', 'value'))
+
+    counts['total_clients'] = counts['pending'] + counts['paid'] + counts['overdue']
+    counts['total_clients_all'] = counts['total_clients'] + counts['deleted']
+    return counts
+
+
+def count_actual():
+    """Recalcula los contadores desde la tabla Client en una sola consulta"""
+    return single_row(
+        Client.objects.all(),
+        pending=Count('id', filter=Q(is_deleted=False, payment_status='pending')),
+        paid=Count('id', filter=Q(is_deleted=False, payment_status='paid')),
+        overdue=Count('id', filter=Q(is_deleted=False, payment_status='overdue')),
+        deleted=Count('id', filter=Q(is_deleted=True)),
+    ).values(*BUCKETS)[0]
+
+
+def reconcile():
+    """
+    Corrige la deriva de los contadores. Las filas de contador se bloquean
+    mientras se recuenta. Cada escritura de Client aplica su delta en la
+    misma transacción que el cambio de la fila (Client.save, UPDATE en
+    bloque), así que una escritura que espera el bloqueo aún no está
+    confirmada ni contada: aplica su delta sobre el valor ya corregido.
+    Devuelve {contador: deriva}.
+    """
+    with transaction.atomic():
+        for key in BUCKETS:
+            MembershipCounter.objects.get_or_create(key=key)
+        stored = dict(
+            MembershipCounter.objects.select_for_update().filter(key__in=BUCKETS).values_list('key', 'value')
+        )
+        actual = count_actual()
+
+        drift = {key: actual[key] - stored[key] for key in BUCKETS if actual[key] != stored[key]}
+        for key in drift:
+            MembershipCounter.objects.filter(key=key).update(value=actual[key])
+
+    if drift:
+        bump_version('clients')
+        logger.warning(f'Contadores de membresía corregidos: {drift}')
+    return drift
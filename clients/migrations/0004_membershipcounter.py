@@ -0,0 +1,36 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:02
+
+from django.db import migrations, models
+
+
+def populate_counters(apps, schema_editor):
+    Client = apps.get_model('clients', 'Client')
+    MembershipCounter = apps.get_model('clients', 'MembershipCounter')
+
+    counts = {
+        status: Client.objects.filter(is_deleted=False, payment_status=status).count()
+        for status in ('pending', 'paid', 'overdue')
+    }
+    counts['deleted'] = Client.objects.filter(is_deleted=True).count()
+
+    MembershipCounter.objects.bulk_create([
+        MembershipCounter(key=key, value=value) for key, value in counts.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0003_alter_client_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MembershipCounter',
+            fields=[
+                ('key', models.CharField(max_length=20, primary_key=True, serialize=False)),
+                ('value', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
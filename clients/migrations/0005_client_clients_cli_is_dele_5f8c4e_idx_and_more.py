@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0004_membershipcounter'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['is_deleted', 'id'], name='clients_cli_is_dele_5f8c4e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['is_deleted', 'payment_status', 'id'], name='clients_cli_is_dele_bae07a_idx'),
+        ),
+    ]
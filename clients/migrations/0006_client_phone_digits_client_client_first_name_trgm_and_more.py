@@ -0,0 +1,54 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:04
+
+from django.contrib.postgres.operations import TrigramExtension
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+def fill_phone_digits(apps, schema_editor):
+    Client = apps.get_model('clients', 'Client')
+
+    if schema_editor.connection.vendor == 'postgresql':
+        Client.objects.update(phone_digits=models.Func(
+            models.F('phone'), models.Value('[^0-9]'), models.Value(''), models.Value('g'),
+            function='REGEXP_REPLACE'
+        ))
+        return
+
+    for client in Client.objects.only('id', 'phone'):
+        client.phone_digits = ''.join(filter(str.isdigit, client.phone or ''))
+        client.save(update_fields=['phone_digits'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0005_client_clients_cli_is_dele_5f8c4e_idx_and_more'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='client',
+            name='phone_digits',
+            field=models.CharField(blank=True, editable=False, max_length=15),
+        ),
+        migrations.RunPython(fill_phone_digits, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='client',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('first_name'), name='gin_trgm_ops'), name='client_first_name_trgm'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('last_name'), name='gin_trgm_ops'), name='client_last_name_trgm'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('email'), name='gin_trgm_ops'), name='client_email_trgm'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['phone_digits'], name='client_phone_digits_trgm', opclasses=['gin_trgm_ops']),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0005_alter_smsnotification_sid'),
+        ('clients', '0006_client_phone_digits_client_client_first_name_trgm_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReminderLog',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reminder_type', models.CharField(choices=[('upcoming', 'Próximo vencimiento'), ('overdue', 'Pago vencido')], max_length=20)),
+                ('due_date', models.DateField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reminder_logs', to='clients.client')),
+                ('notification', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='notifications.smsnotification')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='reminderlog',
+            constraint=models.UniqueConstraint(fields=('client', 'reminder_type', 'due_date'), name='reminder_log_unique_key'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:44
+
+from django.db import migrations, models
+
+
+def mark_existing_as_queued(apps, schema_editor):
+    # Los registros anteriores ya se encolaron (o su notificación se purgó)
+    ReminderLog = apps.get_model('clients', 'ReminderLog')
+    ReminderLog.objects.update(queued_at=models.F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0007_reminderlog'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reminderlog',
+            name='queued_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(mark_existing_as_queued, migrations.RunPython.noop),
+    ]
@@ -1,10 +1,14 @@
-from django.db import models
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.db import models, transaction
+from django.db.models.functions import Upper
 from django.utils import timezone
 
 class Client(models.Model):
     first_name = models.CharField(max_length=100)
     last_name = models.CharField(max_length=100)
     phone = models.CharField(max_length=15)
+    # Solo dígitos del teléfono, para búsqueda (se calcula en save)
+    phone_digits = models.CharField(max_length=15, blank=True, editable=False)
     email = models.EmailField(blank=True, null=True)
     active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -27,6 +31,28 @@ class Client(models.Model):
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
     
+    def save(self, *args, **kwargs):
+        self.phone_digits = ''.join(filter(str.isdigit, self.phone or ''))
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'phone' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'phone_digits'}
+        # La fila y su contador de membresía (señal post_save) se confirman juntos
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Recordar el contador al que pertenece tal como se leyó de la BD
+        if not instance.get_deferred_fields() & {'is_deleted', 'payment_status'}:
+            instance._membership_bucket = instance.membership_bucket
+        return instance
+    
+    @property
+    def membership_bucket(self):
+        """Contador de membresía al que pertenece el cliente"""
+        return 'deleted' if self.is_deleted else self.payment_status
+    
     def soft_delete(self):
         """Eliminación suave"""
         self.is_deleted = True
@@ -59,4 +85,54 @@ class Client(models.Model):
         indexes = [
             models.Index(fields=['is_deleted', 'active']),
             models.Index(fields=['payment_status', 'next_payment_date']),
-        ]
\ No newline at end of file
+            # Paginación por cursor de client_list (con y sin filtro de estado)
+            models.Index(fields=['is_deleted', 'id']),
+            models.Index(fields=['is_deleted', 'payment_status', 'id']),
+            # Búsqueda por subcadena (ICONTAINS compara UPPER(columna)) con pg_trgm
+            GinIndex(OpClass(Upper('first_name'), name='gin_trgm_ops'), name='client_first_name_trgm'),
+            GinIndex(OpClass(Upper('last_name'), name='gin_trgm_ops'), name='client_last_name_trgm'),
+            GinIndex(OpClass(Upper('email'), name='gin_trgm_ops'), name='client_email_trgm'),
+            GinIndex(fields=['phone_digits'], opclasses=['gin_trgm_ops'], name='client_phone_digits_trgm'),
+        ]
+
+
+class MembershipCounter(models.Model):
+    """Conteos de clientes mantenidos de forma incremental (ver clients.counters)"""
+    key = models.CharField(max_length=20, primary_key=True)
+    value = models.IntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.key}: {self.value}"
+
+
+class ReminderLog(models.Model):
+    """Recordatorio de pago ya enviado; la restricción única evita repetirlo"""
+    REMINDER_TYPES = [
+        ('upcoming', 'Próximo vencimiento'),
+        ('overdue', 'Pago vencido'),
+    ]
+    
+    client = models.ForeignKey(Client, on_delete=models.CASCADE, related_name='reminder_logs')
+    reminder_type = models.CharField(max_length=20, choices=REMINDER_TYPES)
+    due_date = models.DateField()
+    notification = models.ForeignKey(
+        'notifications.SMSNotification',
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name='+'
+    )
+    # Cuándo se encoló el SMS; no depende de que la notificación siga existiendo
+    queued_at = models.DateTimeField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['client', 'reminder_type', 'due_date'],
+                name='reminder_log_unique_key'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.client} - {self.reminder_type} {self.due_date}"
@@ -0,0 +1,108 @@
+from django.db import models, transaction
+from django.db.models import Count
+from django.utils import timezone
+from datetime import timedelta
+import logging
+
+from . import counters
+from .models import Client
+from gym.cache import bump_version
+from jumping.models import ClassBooking
+from jumping.services import promote_waitlists, release_seats
+
+logger = logging.getLogger(__name__)
+
+
+def purge_queryset(retention_days=30, now=None):
+    """Clientes en la papelera desde hace más de `retention_days` días"""
+    cutoff = (now or timezone.now()) - timedelta(days=retention_days)
+    return Client.objects.filter(is_deleted=True, deleted_at__lt=cutoff)
+
+
+def _delete_dependents(model, rows):
+    """
+    Borra (o desvincula) las filas que apuntan a `rows` según el on_delete de
+    cada relación, antes de borrar `rows`. Todo con DELETE/UPDATE ... WHERE
+    fk IN (subconsulta): a diferencia del Collector de Django, no se carga
+    ninguna fila en memoria ni se emiten señales por fila.
+    """
+    relations = [
+        field for field in model._meta.get_fields(include_hidden=True)
+        if field.auto_created and not field.concrete and (field.one_to_many or field.one_to_one)
+    ]
+    for relation in relations:
+        if relation.on_delete is models.DO_NOTHING:
+            continue
+
+        related_model = relation.related_model
+        dependents = related_model._base_manager.filter(**{f'{relation.field.name}__in': rows})
+
+        if relation.on_delete is models.CASCADE:
+            _delete_dependents(related_model, dependents.values('pk'))
+            dependents._raw_delete(dependents.db)
+        elif relation.on_delete is models.SET_NULL:
+            dependents.update(**{relation.field.name: None})
+        else:
+            # PROTECT / RESTRICT / SET_DEFAULT: que lo resuelva el borrado normal
+            raise models.ProtectedError(
+                f'{related_model.__name__} impide la purga en bloque', set()
+            )
+
+
+def purge_chunk(client_ids, queryset):
+    """
+    Borra definitivamente un lote de clientes y todo lo que depende de ellos
+    en una transacción. Los clientes se bloquean y se vuelve a comprobar que
+    sigan en la papelera (uno restaurado a mitad de la purga no se toca).
+    Devuelve el número de clientes borrados.
+    """
+    with transaction.atomic():
+        ids = list(
+            queryset.select_for_update().filter(pk__in=client_ids).values_list('pk', flat=True)
+        )
+        if not ids:
+            return 0
+
+        # El borrado en crudo no dispara las señales que mantienen la ocupación
+        # de las clases: se cuentan antes los lugares de sus reservas activas
+        seats_by_class = dict(
+            ClassBooking.objects.filter(
+                client_id__in=ids
+            ).exclude(status='cancelled').values_list(
+                'jumping_class_id'
+            ).annotate(seats=Count('id')).order_by()
+        )
+
+        _delete_dependents(Client, ids)
+        deleted = Client.objects.filter(pk__in=ids)._raw_delete(Client.objects.db)
+
+        # Ya sin sus reservas ni sus entradas en listas de espera, los lugares
+        # liberados pasan a los siguientes en espera
+        release_seats(seats_by_class)
+        promote_waitlists(seats_by_class)
+
+        # Ni las que mantienen los contadores de membresía
+        counters.adjust({'deleted': -deleted})
+
+    return deleted
+
+
+def iter_purge(queryset, chunk_size=500, after_id=0):
+    """
+    Purga `queryset` en lotes de `chunk_size` por id ascendente, con un
+    commit por lote. Produce (borrados en el lote, último id procesado) para
+    informar el progreso; basta con volver a llamarla con `after_id` para
+    reanudar donde se quedó.
+    """
+    while True:
+        client_ids = list(
+            queryset.filter(pk__gt=after_id).order_by('pk').values_list('pk', flat=True)[:chunk_size]
+        )
+        if not client_ids:
+            return
+
+        deleted = purge_chunk(client_ids, queryset)
+        after_id = client_ids[-1]
+        bump_version('clients')
+        logger.info(f'Purga de papelera: {deleted} clientes borrados hasta el id {after_id}')
+        yield deleted, after_id
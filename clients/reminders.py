@@ -0,0 +1,120 @@
+from django.db import transaction
+from django.db.models import Case, CharField, Exists, OuterRef, Q, Value, When
+from django.utils import timezone
+from datetime import timedelta
+import logging
+
+from .models import Client, ReminderLog
+from notifications.services import queue_notifications
+
+logger = logging.getLogger(__name__)
+
+# Plantillas de cada tipo de recordatorio ({first_name}, {due_date})
+REMINDER_TEMPLATES = {
+    'overdue': (
+        "Hola {first_name}, tu membresía del gimnasio está VENCIDA desde {due_date:%d/%m/%Y}. "
+        "Por favor regulariza tu situación para evitar la desactivación."
+    ),
+    'upcoming': (
+        "Hola {first_name}, tu membresía del gimnasio vence el {due_date:%d/%m/%Y}. "
+        "Por favor realiza el pago para continuar disfrutando de nuestros servicios."
+    ),
+}
+
+
+def reminder_rules(today):
+    """
+    Cohortes de recordatorio: {tipo: condición}. Un cliente vencido se avisa
+    una vez cuando lleva más de 7 días de atraso; uno pendiente, 3 días antes
+    de la fecha de pago.
+    """
+    return {
+        'overdue': Q(payment_status='overdue', next_payment_date__lt=today - timedelta(days=7)),
+        'upcoming': Q(payment_status='pending', next_payment_date=today + timedelta(days=3)),
+    }
+
+
+def plan_reminders(today=None):
+    """
+    Selecciona en una sola consulta todos los recordatorios que tocan hoy y
+    que aún no se han enviado (según ReminderLog). Devuelve una lista de
+    tuplas (client_id, tipo, fecha de pago, mensaje).
+    """
+    today = today or timezone.now().date()
+    rules = reminder_rules(today)
+
+    cohort_filter = Q()
+    for condition in rules.values():
+        cohort_filter |= condition
+
+    due = Client.objects.filter(
+        cohort_filter,
+        is_deleted=False,
+        active=True
+    ).annotate(
+        reminder_type=Case(
+            *[When(condition, then=Value(reminder_type)) for reminder_type, condition in rules.items()],
+            output_field=CharField()
+        )
+    ).annotate(
+        already_sent=Exists(ReminderLog.objects.filter(
+            client=OuterRef('pk'),
+            reminder_type=OuterRef('reminder_type'),
+            due_date=OuterRef('next_payment_date')
+        ))
+    ).filter(already_sent=False).values_list(
+        'id', 'first_name', 'next_payment_date', 'reminder_type'
+    )
+
+    return [
+        (
+            client_id, reminder_type, due_date,
+            REMINDER_TEMPLATES[reminder_type].format(first_name=first_name, due_date=due_date)
+        )
+        for client_id, first_name, due_date, reminder_type in due
+    ]
+
+
+def queue_payment_reminders(today=None):
+    """
+    Registra los recordatorios pendientes y deja en cola sus SMS.
+
+    Primero se insertan las claves (cliente, tipo, fecha de pago) con
+    ON CONFLICT DO NOTHING y luego se bloquean las que aún no se han
+    encolado (queued_at): si la tarea se repite o dos ejecuciones coinciden,
+    cada recordatorio se encola exactamente una vez, aunque después se
+    purgue su notificación. Devuelve los ids de las notificaciones creadas.
+    """
+    plan = plan_reminders(today)
+    if not plan:
+        return []
+
+    messages = {(client_id, reminder_type, due_date): message
+                for client_id, reminder_type, due_date, message in plan}
+
+    with transaction.atomic():
+        ReminderLog.objects.bulk_create(
+            [ReminderLog(client_id=client_id, reminder_type=reminder_type, due_date=due_date)
+             for client_id, reminder_type, due_date in messages],
+            ignore_conflicts=True
+        )
+        logs = [
+            log for log in ReminderLog.objects.select_for_update().filter(
+                client_id__in={client_id for client_id, _, _ in messages},
+                queued_at__isnull=True
+            )
+            if (log.client_id, log.reminder_type, log.due_date) in messages
+        ]
+
+        notification_ids = queue_notifications(
+            (log.client_id, messages[(log.client_id, log.reminder_type, log.due_date)])
+            for log in logs
+        )
+        now = timezone.now()
+        for log, notification_id in zip(logs, notification_ids):
+            log.notification_id = notification_id
+            log.queued_at = now
+        ReminderLog.objects.bulk_update(logs, ['notification', 'queued_at'])
+
+    logger.info(f'Recordatorios de pago planificados: {len(plan)}, en cola: {len(notification_ids)}')
+    return notification_ids
@@ -0,0 +1,62 @@
+import re
+
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db.models import Case, FloatField, Q, Value, When
+from django.db.models.functions import Greatest
+
+# Mínimo de dígitos para buscar también por teléfono
+MIN_PHONE_DIGITS = 3
+
+# Una búsqueda con solo estos caracteres se trata como un único teléfono
+PHONE_QUERY_RE = re.compile(r'^[\d\s()+.-]+$')
+
+
+def normalize_digits(value):
+    """Deja solo los dígitos de un teléfono ('(55) 1234-5678' -> '5512345678')"""
+    return ''.join(filter(str.isdigit, value or ''))
+
+
+def search_filter(query):
+    """
+    Filtro de búsqueda de clientes: cada palabra debe aparecer en el nombre,
+    apellido, email o teléfono. Los ICONTAINS usan los índices trigram
+    sobre UPPER(columna) y el teléfono se busca en `phone_digits`.
+    """
+    digits = normalize_digits(query)
+    if PHONE_QUERY_RE.match(query) and len(digits) >= MIN_PHONE_DIGITS:
+        return Q(phone_digits__contains=digits)
+
+    condition = Q()
+    for term in query.split():
+        term_condition = (
+            Q(first_name__icontains=term) |
+            Q(last_name__icontains=term) |
+            Q(email__icontains=term)
+        )
+        digits = normalize_digits(term)
+        if len(digits) >= MIN_PHONE_DIGITS:
+            term_condition |= Q(phone_digits__contains=digits)
+        condition &= term_condition
+    return condition
+
+
+def search_clients(queryset, query, limit=10):
+    """Clientes que coinciden con `query`, ordenados por relevancia"""
+    digits = normalize_digits(query)
+    phone_rank = Value(0.0)
+    if len(digits) >= MIN_PHONE_DIGITS:
+        phone_rank = Case(
+            When(phone_digits__startswith=digits, then=Value(1.0)),
+            When(phone_digits__contains=digits, then=Value(0.8)),
+            default=Value(0.0),
+            output_field=FloatField()
+        )
+
+    return queryset.filter(search_filter(query)).annotate(
+        rank=Greatest(
+            TrigramWordSimilarity(query, 'first_name'),
+            TrigramWordSimilarity(query, 'last_name'),
+            TrigramWordSimilarity(query, 'email'),
+            phone_rank,
+        )
+    ).order_by('-rank', 'id')[:limit]
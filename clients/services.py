@@ -0,0 +1,133 @@
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from datetime import timedelta
+import logging
+
+from . import counters
+from .models import Client
+from gym.cache import bump_version, cached
+from notifications.services import queue_notifications
+
+logger = logging.getLogger(__name__)
+
+# Transiciones automáticas de estado de pago: (estado origen, estado destino).
+# Cada una se ejecuta como un único UPDATE ... WHERE condicional.
+PAYMENT_STATUS_TRANSITIONS = [
+    ('pending', 'overdue'),
+    ('paid', 'overdue'),
+]
+
+
+def overdue_transition_queryset(source_status, today=None):
+    """Clientes que deben pasar de `source_status` a vencido"""
+    today = today or timezone.now().date()
+    return Client.objects.filter(
+        is_deleted=False,
+        next_payment_date__lt=today,
+        payment_status=source_status,
+    )
+
+
+def apply_payment_status_transitions(today=None):
+    """
+    Aplica todas las transiciones de estado de pago en bloque.
+
+    Las condiciones se vuelven a evaluar dentro del propio UPDATE, de modo que
+    una renovación concurrente (que mueve `next_payment_date` al futuro) nunca
+    se sobrescribe. Devuelve un diccionario {'origen->destino': filas}.
+    """
+    today = today or timezone.now().date()
+    counts = {}
+
+    with transaction.atomic():
+        for source_status, target_status in PAYMENT_STATUS_TRANSITIONS:
+            updated = overdue_transition_queryset(source_status, today).update(
+                payment_status=target_status
+            )
+            counts[f'{source_status}->{target_status}'] = updated
+            counters.adjust({source_status: -updated, target_status: updated})
+
+    if any(counts.values()):
+        bump_version('clients')
+    logger.info(f'Transiciones de estado de pago aplicadas: {counts}')
+    return counts
+
+
+DEACTIVATION_MESSAGE = (
+    "Hola {first_name}, tu membresía del gimnasio ha sido DESACTIVADA por falta de pago. "
+    "Para reactivar, comunícate con recepción."
+)
+
+
+def deactivate_unpaid_clients(today=None, grace_days=15):
+    """
+    Desactiva en bloque a los clientes vencidos por más de `grace_days` días
+    y deja en cola su SMS de aviso.
+
+    Las filas se bloquean para que el UPDATE y las notificaciones cubran
+    exactamente la misma cohorte. Devuelve los ids de las notificaciones
+    creadas; el envío corre aparte (ver notifications.task.enqueue_delivery).
+    """
+    today = today or timezone.now().date()
+    cutoff_date = today - timedelta(days=grace_days)
+
+    with transaction.atomic():
+        cohort = list(
+            Client.objects.select_for_update().filter(
+                is_deleted=False,
+                payment_status='overdue',
+                next_payment_date__lt=cutoff_date,
+                active=True
+            ).values_list('id', 'first_name')
+        )
+        if not cohort:
+            return []
+
+        Client.objects.filter(id__in=[client_id for client_id, _ in cohort]).update(active=False)
+
+        notification_ids = queue_notifications(
+            (client_id, DEACTIVATION_MESSAGE.format(first_name=first_name))
+            for client_id, first_name in cohort
+        )
+
+    bump_version('clients')
+    return notification_ids
+
+
+def _compute_client_stats(today):
+    counts = counters.get_counts()
+    stats = {
+        'total_clients_all': counts['total_clients_all'],
+        'total_clients': counts['total_clients'],
+        'overdue_clients': counts['overdue'],
+        'paid_clients': counts['paid'],
+        'deleted_clients': counts['deleted'],
+    }
+
+    # Próximos vencimientos
+    stats['upcoming_clients'] = list(
+        Client.objects.filter(
+            is_deleted=False,
+            next_payment_date__gte=today,
+            payment_status='pending'
+        ).order_by('next_payment_date')[:5]
+    )
+    stats['recent_clients'] = list(
+        Client.objects.filter(is_deleted=False).order_by('-created_at')[:3]
+    )
+    return stats
+
+
+def get_client_stats(today=None):
+    """
+    Métricas de clientes para el dashboard. Los conteos salen de los
+    contadores incrementales (clients.counters), así que su costo no depende
+    del número de clientes; todo se cachea hasta la siguiente escritura sobre
+    Client (o DASHBOARD_CACHE_TTL).
+    """
+    today = today or timezone.now().date()
+    return cached(
+        ['clients'], f'dashboard:clients:{today}', settings.DASHBOARD_CACHE_TTL,
+        lambda: _compute_client_stats(today)
+    )
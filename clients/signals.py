@@ -0,0 +1,33 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from gym.cache import bump_version
+from . import counters
+from .models import Client
+
+
+@receiver([post_save, post_delete], sender=Client)
+def invalidate_client_cache(sender, **kwargs):
+    """Cualquier escritura sobre clientes invalida las métricas cacheadas"""
+    bump_version('clients')
+
+
+@receiver(post_save, sender=Client)
+def update_membership_counters(sender, instance, created, raw=False, **kwargs):
+    """Mueve al cliente de contador si cambió su estado de pago o de papelera"""
+    if raw:
+        return
+    if created:
+        old_bucket = None
+    elif hasattr(instance, '_membership_bucket'):
+        old_bucket = instance._membership_bucket
+    else:
+        # Estado previo desconocido: lo corregirá la reconciliación
+        return
+    counters.move(old_bucket, instance.membership_bucket)
+    instance._membership_bucket = instance.membership_bucket
+
+
+@receiver(post_delete, sender=Client)
+def remove_from_membership_counters(sender, instance, **kwargs):
+    counters.move(getattr(instance, '_membership_bucket', instance.membership_bucket), None)
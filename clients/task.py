@@ -1,11 +1,13 @@
 from celery import shared_task
-from django.utils import timezone
-from datetime import timedelta
-from django.db.models import Q
-from .models import Client
-from notifications.services import send_sms
-from notifications.models import SMSNotification
+from django.conf import settings
+from django.db import transaction
+from . import counters
+from .purge import iter_purge, purge_queryset
+from .reminders import queue_payment_reminders
+from .services import apply_payment_status_transitions, deactivate_unpaid_clients
+from notifications.task import enqueue_delivery
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
@@ -13,19 +15,10 @@ logger = logging.getLogger(__name__)
 def check_overdue_payments_task():
     """Tarea para verificar pagos vencidos diariamente"""
     try:
-        today = timezone.now().date()
-        clients = Client.objects.filter(
-            is_deleted=False,
-            next_payment_date__lt=today,
-            payment_status__in=['pending', 'paid']
-        )
+        counts = apply_payment_status_transitions()
+        updated_count = sum(counts.values())
         
-        updated_count = 0
-        for client in clients:
-            client.update_payment_status()
-            updated_count += 1
-        
-        logger.info(f'Tarea check_overdue_payments: {updated_count} clientes actualizados a vencido')
+        logger.info(f'Tarea check_overdue_payments: {updated_count} clientes actualizados a vencido {counts}')
         return f'{updated_count} clientes actualizados'
         
     except Exception as e:
@@ -34,81 +27,46 @@ def check_overdue_payments_task():
 
 @shared_task
 def send_payment_reminders_task():
-    """Enviar recordatorios de pago a clientes"""
+    """Enviar recordatorios de pago a clientes (una sola vez por cliente, tipo y fecha de pago)"""
     try:
-        today = timezone.now().date()
-        
-        # Clientes con pago vencido (más de 7 días)
-        overdue_clients = Client.objects.filter(
-            is_deleted=False,
-            payment_status='overdue',
-            next_payment_date__lt=today - timedelta(days=7),
-            active=True
-        )
-        
-        # Clientes con pago próximo (3 días antes)
-        upcoming_clients = Client.objects.filter(
-            is_deleted=False,
-            payment_status='pending',
-            next_payment_date=today + timedelta(days=3),
-            active=True
-        )
-        
-        total_sent = 0
-        
-        # Enviar a clientes vencidos
-        for client in overdue_clients:
-            message = f"Hola {client.first_name}, tu membresía del gimnasio está VENCIDA desde {client.next_payment_date.strftime('%d/%m/%Y')}. Por favor regulariza tu situación para evitar la desactivación."
-            
-            try:
-                sid = send_sms(client.phone, message)
-                SMSNotification.objects.create(
-                    client=client,
-                    message=message,
-                    sid=sid,
-                    status='sent'
-                )
-                total_sent += 1
-            except Exception as e:
-                logger.error(f'Error enviando SMS a {client.phone}: {e}')
+        # Los SMS se envían en paralelo fuera de esta tarea
+        with transaction.atomic():
+            notification_ids = queue_payment_reminders()
+            enqueue_delivery(notification_ids)
         
-        # Enviar a clientes con pago próximo
-        for client in upcoming_clients:
-            message = f"Hola {client.first_name}, tu membresía del gimnasio vence el {client.next_payment_date.strftime('%d/%m/%Y')}. Por favor realiza el pago para continuar disfrutando de nuestros servicios."
-            
-            try:
-                sid = send_sms(client.phone, message)
-                SMSNotification.objects.create(
-                    client=client,
-                    message=message,
-                    sid=sid,
-                    status='sent'
-                )
-                total_sent += 1
-            except Exception as e:
-                logger.error(f'Error enviando SMS a {client.phone}: {e}')
+        total_sent = len(notification_ids)
         
-        logger.info(f'Tarea send_payment_reminders: {total_sent} SMS enviados')
-        return f'{total_sent} recordatorios enviados'
+        logger.info(f'Tarea send_payment_reminders: {total_sent} SMS en cola')
+        return f'{total_sent} recordatorios en cola'
         
     except Exception as e:
         logger.error(f'Error en send_payment_reminders_task: {e}')
         return f'Error: {e}'
 
-@shared_task
-def cleanup_recycle_bin_task():
-    """Limpiar papelera: eliminar permanentemente después de 30 días"""
+@shared_task(bind=True)
+def cleanup_recycle_bin_task(self, after_id=0, deleted_count=0):
+    """
+    Limpiar papelera: eliminar permanentemente después de RECYCLE_BIN_RETENTION_DAYS días.
+    Borra por lotes e informa el progreso; si se agota PURGE_TIME_BUDGET se
+    vuelve a encolar desde el último id procesado.
+    """
     try:
-        cutoff_date = timezone.now() - timedelta(days=30)
-        old_deleted_clients = Client.objects.filter(
-            is_deleted=True,
-            deleted_at__lt=cutoff_date
-        )
-        
-        deleted_count = old_deleted_clients.count()
-        
-        # Eliminar permanentemente
-        old_deleted_clients.delete()
+        started = time.monotonic()
+        queryset = purge_queryset(settings.RECYCLE_BIN_RETENTION_DAYS)
+        
+        for chunk_deleted, after_id in iter_purge(queryset, settings.PURGE_CHUNK_SIZE, after_id):
+            deleted_count += chunk_deleted
+            # Llamada directa (sin worker ni id de tarea): no hay dónde informar
+            if self.request.id:
+                self.update_state(state='PROGRESS', meta={
+                    'deleted': deleted_count,
+                    'last_id': after_id,
+                })
+            
+            if time.monotonic() - started > settings.PURGE_TIME_BUDGET:
+                self.apply_async(kwargs={'after_id': after_id, 'deleted_count': deleted_count})
+                logger.info(f'Tarea cleanup_recycle_bin: {deleted_count} clientes eliminados, continúa desde el id {after_id}')
+                return f'{deleted_count} clientes eliminados, continúa desde el id {after_id}'
         
         logger.info(f'Tarea cleanup_recycle_bin: {deleted_count} clientes eliminados permanentemente')
         return f'{deleted_count} clientes eliminados permanentemente'
@@ -121,34 +79,13 @@ def cleanup_recycle_bin_task():
 def deactivate_unpaid_clients_task():
     """Desactivar clientes con pago vencido por más de 15 días"""
     try:
-        cutoff_date = timezone.now().date() - timedelta(days=15)
-        unpaid_clients = Client.objects.filter(
-            is_deleted=False,
-            payment_status='overdue',
-            next_payment_date__lt=cutoff_date,
-            active=True
-        )
-        
-        deactivated_count = 0
-        for client in unpaid_clients:
-            client.active = False
-            client.save()
-            deactivated_count += 1
-            
-            # Enviar notificación de desactivación
-            message = f"Hola {client.first_name}, tu membresía del gimnasio ha sido DESACTIVADA por falta de pago. Para reactivar, comunícate con recepción."
+        with transaction.atomic():
+            notification_ids = deactivate_unpaid_clients()
             
-            try:
-                sid = send_sms(client.phone, message)
-                SMSNotification.objects.create(
-                    client=client,
-                    message=message,
-                    sid=sid,
-                    status='sent'
-                )
-            except Exception as e:
-                logger.error(f'Error enviando SMS de desactivación a {client.phone}: {e}')
+            # Los avisos se envían en paralelo, fuera de esta tarea
+            enqueue_delivery(notification_ids)
         
+        deactivated_count = len(notification_ids)
         logger.info(f'Tarea deactivate_unpaid_clients: {deactivated_count} clientes desactivados')
         return f'{deactivated_count} clientes desactivados'
         
@@ -156,6 +93,19 @@ def deactivate_unpaid_clients_task():
         logger.error(f'Error en deactivate_unpaid_clients_task: {e}')
         return f'Error: {e}'
 
+@shared_task
+def reconcile_membership_counters_task():
+    """Corregir la deriva de los contadores de membresía"""
+    try:
+        drift = counters.reconcile()
+        
+        logger.info(f'Tarea reconcile_membership_counters: deriva corregida {drift}')
+        return f'Deriva corregida: {drift}'
+        
+    except Exception as e:
+        logger.error(f'Error en reconcile_membership_counters_task: {e}')
+        return f'Error: {e}'
+
 @shared_task
 def renew_monthly_memberships_task():
     """Renovación automática para clientes con pago automático (futura funcionalidad)"""
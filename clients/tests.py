@@ -1,3 +1,258 @@
-from django.test import TestCase
+import base64
+import json
+from datetime import time, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from gym.pagination import encode_cursor, paginate_keyset
+from jumping.models import ClassBooking, Instructor, JumpingClass, Location
+from jumping.services import book_class
+from notifications.models import SMSNotification
+from users.models import User
+from . import counters
+from .models import Client, ReminderLog
+from .reminders import plan_reminders, queue_payment_reminders
+from .services import apply_payment_status_transitions
+from .task import cleanup_recycle_bin_task
+
+
+def raw_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+class ClientsTestCase(TestCase):
+    """Clientes y sesión de recepción comunes a las pruebas de clientes"""
+
+    def create_clients(self, count, **fields):
+        return [
+            Client.objects.create(
+                first_name=f'Cliente{i}', last_name='Prueba', phone=f'55512345{i:02d}', **fields
+            )
+            for i in range(count)
+        ]
+
+    def login(self):
+        user = User.objects.create_user(username='recepcion', password='secreto', role='recep')
+        self.client.force_login(user)
+        return user
+
+
+class KeysetPaginationTests(ClientsTestCase):
+
+    def setUp(self):
+        self.clients = self.create_clients(5)
+        self.ids = sorted((client.pk for client in self.clients), reverse=True)
+
+    def page(self, cursor=None, backwards=False):
+        return paginate_keyset(Client.objects.all(), ['-id'], cursor=cursor, backwards=backwards, per_page=2)
+
+    def test_walks_forward_and_back(self):
+        first = self.page()
+        second = self.page(first.next_cursor)
+        third = self.page(second.next_cursor)
+
+        self.assertEqual([c.pk for c in first], self.ids[:2])
+        self.assertEqual([c.pk for c in second], self.ids[2:4])
+        self.assertEqual([c.pk for c in third], self.ids[4:])
+        self.assertFalse(first.has_previous)
+        self.assertFalse(third.has_next)
+
+        back = self.page(third.previous_cursor, backwards=True)
+        self.assertEqual([c.pk for c in back], self.ids[2:4])
+        self.assertTrue(back.has_previous)
+
+    def test_invalid_cursors_show_the_first_page(self):
+        cursors = [
+            'no es base64',
+            raw_cursor({'id': 1}),
+            raw_cursor(['abc']),
+            raw_cursor([None]),
+            raw_cursor([[1]]),
+            raw_cursor([1, 2]),
+        ]
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                page = self.page(cursor)
+                self.assertEqual([c.pk for c in page], self.ids[:2])
+                self.assertFalse(page.has_previous)
+
+    def test_string_values_are_converted(self):
+        page = self.page(encode_cursor([str(self.ids[1])]))
+
+        self.assertEqual([c.pk for c in page], self.ids[2:4])
+
+
+class ClientListTests(ClientsTestCase):
+
+    def setUp(self):
+        self.login()
+
+    def test_malformed_cursor_shows_the_first_page(self):
+        clients = self.create_clients(2)
+
+        response = self.client.get(reverse('client_list'), {'cursor': 'WyJhYmMiXQ=='})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['page']), len(clients))
+
+    def test_status_filter_uses_its_counter(self):
+        self.create_clients(2, payment_status='paid')
+        self.create_clients(1, payment_status='overdue')
+
+        response = self.client.get(reverse('client_list'), {'status': 'paid'})
+
+        self.assertEqual(response.context['total_count'], 2)
+        self.assertEqual(len(response.context['page']), 2)
+
+    def test_unknown_status_is_ignored(self):
+        self.create_clients(2)
+        self.create_clients(1)[0].soft_delete()
+
+        response = self.client.get(reverse('client_list'), {'status': 'deleted'})
+
+        self.assertIsNone(response.context['status_filter'])
+        self.assertEqual(response.context['total_count'], 2)
+        self.assertEqual(len(response.context['page']), 2)
+
+
+class PaymentReminderTests(ClientsTestCase):
+
+    def setUp(self):
+        self.today = timezone.localdate()
+        self.overdue, = self.create_clients(
+            1, payment_status='overdue', next_payment_date=self.today - timedelta(days=10)
+        )
+        self.upcoming, = self.create_clients(
+            1, payment_status='pending', next_payment_date=self.today + timedelta(days=3)
+        )
+        self.create_clients(1, payment_status='paid', next_payment_date=self.today + timedelta(days=20))
+
+    def test_each_reminder_is_queued_once(self):
+        notification_ids = queue_payment_reminders(self.today)
+
+        self.assertEqual(
+            set(SMSNotification.objects.filter(id__in=notification_ids).values_list('client_id', flat=True)),
+            {self.overdue.pk, self.upcoming.pk}
+        )
+        self.assertEqual(queue_payment_reminders(self.today), [])
+        self.assertEqual(SMSNotification.objects.count(), 2)
+
+    def test_purging_notifications_does_not_resend(self):
+        # Plan de una ejecución concurrente, calculado antes de registrar los envíos
+        stale_plan = plan_reminders(self.today)
+        queue_payment_reminders(self.today)
+        SMSNotification.objects.all().delete()
+
+        with mock.patch('clients.reminders.plan_reminders', return_value=stale_plan):
+            self.assertEqual(queue_payment_reminders(self.today), [])
+        self.assertFalse(ReminderLog.objects.filter(queued_at__isnull=True).exists())
+
+    def test_new_due_date_gets_a_new_reminder(self):
+        queue_payment_reminders(self.today)
+        Client.objects.filter(pk=self.overdue.pk).update(next_payment_date=self.today - timedelta(days=8))
+
+        notification_ids = queue_payment_reminders(self.today)
+
+        self.assertEqual(len(notification_ids), 1)
+        self.assertEqual(SMSNotification.objects.get(id=notification_ids[0]).client_id, self.overdue.pk)
+
+
+class RecycleBinPurgeTests(ClientsTestCase):
+
+    def setUp(self):
+        self.clients = self.create_clients(5)
+        self.jumping_class = JumpingClass.objects.create(
+            name='Jumping',
+            instructor=Instructor.objects.create(first_name='Ana', last_name='López', phone='5550000000'),
+            location=Location.objects.create(name='Centro', address='Calle 1', phone='5550000001'),
+            date=timezone.localdate() + timedelta(days=1),
+            start_time=time(8, 0),
+            end_time=time(9, 0),
+            capacity=4
+        )
+        for client in self.clients[:4]:
+            book_class(self.jumping_class, client)
+
+        # Tres en la papelera desde hace tiempo y uno recién borrado
+        for client in self.clients[:4]:
+            client.soft_delete()
+        Client.objects.filter(pk__in=[c.pk for c in self.clients[:3]]).update(
+            deleted_at=timezone.now() - timedelta(days=60)
+        )
+
+    @override_settings(PURGE_CHUNK_SIZE=2, RECYCLE_BIN_RETENTION_DAYS=30)
+    def test_purge_in_chunks_releases_seats_and_counters(self):
+        result = cleanup_recycle_bin_task()
+
+        self.assertEqual(result, '3 clientes eliminados permanentemente')
+        self.assertEqual(
+            list(Client.objects.values_list('pk', flat=True).order_by('pk')),
+            [c.pk for c in self.clients[3:]]
+        )
+        self.assertEqual(ClassBooking.objects.count(), 1)
+
+        self.jumping_class.refresh_from_db()
+        self.assertEqual((self.jumping_class.current_participants, self.jumping_class.status), (1, 'scheduled'))
+
+        counts = counters.get_counts()
+        self.assertEqual((counts['deleted'], counts['total_clients']), (1, 1))
+        self.assertEqual(counters.reconcile(), {})
+
+    @override_settings(PURGE_CHUNK_SIZE=1, PURGE_TIME_BUDGET=-1, RECYCLE_BIN_RETENTION_DAYS=30)
+    def test_resumes_from_the_last_id_when_out_of_time(self):
+        with mock.patch.object(cleanup_recycle_bin_task, 'apply_async') as apply_async:
+            result = cleanup_recycle_bin_task()
+
+        self.assertEqual(result, f'1 clientes eliminados, continúa desde el id {self.clients[0].pk}')
+        apply_async.assert_called_once_with(kwargs={'after_id': self.clients[0].pk, 'deleted_count': 1})
+
+
+class MembershipCounterTests(ClientsTestCase):
+
+    def assertCountersMatch(self):
+        counts = counters.get_counts()
+        self.assertEqual({key: counts[key] for key in counters.BUCKETS}, counters.count_actual())
+
+    def test_adjust_and_move(self):
+        counters.adjust({'paid': 2, 'overdue': 0})
+        counters.move('paid', 'overdue')
+        counters.move('overdue', 'overdue')
+        counters.move(None, 'pending')
+
+        counts = counters.get_counts()
+        self.assertEqual(
+            (counts['paid'], counts['overdue'], counts['pending'], counts['total_clients']),
+            (1, 1, 1, 3)
+        )
+
+    def test_client_lifecycle_keeps_counters_exact(self):
+        client, other = self.create_clients(2)
+        client.renew_membership()
+        other.soft_delete()
+        self.assertCountersMatch()
+
+        other.restore()
+        Client.objects.get(pk=client.pk).delete()
+        self.assertCountersMatch()
+        self.assertEqual(counters.get_counts()['total_clients_all'], 1)
+
+    def test_bulk_transitions_adjust_counters(self):
+        self.create_clients(2, payment_status='paid', next_payment_date=timezone.localdate() - timedelta(days=1))
+        self.create_clients(1, payment_status='pending', next_payment_date=timezone.localdate() + timedelta(days=5))
+
+        counts = apply_payment_status_transitions()
+
+        self.assertEqual(counts['paid->overdue'], 2)
+        self.assertEqual(counters.get_counts()['overdue'], 2)
+        self.assertCountersMatch()
+
+    def test_reconcile_fixes_drift(self):
+        self.create_clients(3)
+        Client.objects.update(payment_status='paid')
+
+        self.assertEqual(counters.reconcile(), {'pending': -3, 'paid': 3})
+        self.assertCountersMatch()
+        self.assertEqual(counters.reconcile(), {})
@@ -1,27 +1,24 @@
+from django.conf import settings
+from django.http import JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Q
+from django.db import transaction
 from django.utils import timezone
 from datetime import timedelta
+from urllib.parse import urlencode
 
 from users.decorators import allowed_roles
+from . import counters
 from .models import Client
-from notifications.services import send_sms
+from .search import search_clients, search_filter
+from .services import apply_payment_status_transitions, get_client_stats
+from notifications.services import deliver_notifications, queue_notifications
+from notifications.task import enqueue_delivery
 from notifications.models import SMSNotification
-# users/views.py o donde tengas la home view
-
-
-# users/views.py
-from django.shortcuts import render
-from django.contrib.auth.decorators import login_required
-from clients.models import Client
-from jumping.models import JumpingClass, ClassBooking, Instructor, Location
-from notifications.models import SMSNotification
-from django.utils import timezone
-from datetime import timedelta, datetime
-from django.db.models import Count, Sum
-from django.conf import settings
+from jumping.services import get_jumping_stats
+from gym.cache import cached
+from gym.pagination import paginate_keyset
 
 @login_required
 def home(request):
@@ -29,76 +26,39 @@ def home(request):
     today = timezone.now().date()
     
     # ============================================
-    # DATOS DE CLIENTES
+    # DATOS DE CLIENTES (cacheados)
     # ============================================
-    total_clients_all = Client.objects.count()
-    total_clients = Client.objects.filter(is_deleted=False).count()
-    overdue_clients = Client.objects.filter(
-        is_deleted=False, 
-        payment_status='overdue'
-    ).count()
-    paid_clients = Client.objects.filter(
-        is_deleted=False, 
-        payment_status='paid'
-    ).count()
-    deleted_clients = Client.objects.filter(is_deleted=True).count()
+    client_stats = get_client_stats(today)
+    total_clients = client_stats['total_clients']
+    overdue_clients = client_stats['overdue_clients']
+    paid_clients = client_stats['paid_clients']
     
     # Porcentajes
     overdue_percentage = (overdue_clients / total_clients * 100) if total_clients > 0 else 0
     paid_percentage = (paid_clients / total_clients * 100) if total_clients > 0 else 0
     
-    # Próximos vencimientos (7 días)
-    upcoming_clients = Client.objects.filter(
-        is_deleted=False,
-        next_payment_date__gte=today,
-        payment_status='pending'
-    ).order_by('next_payment_date')[:5]
-    
-    # Agregar días hasta vencimiento
+    # Próximos vencimientos: agregar días hasta vencimiento
+    upcoming_clients = client_stats['upcoming_clients']
     for client in upcoming_clients:
         client.days_until_due = (client.next_payment_date - today).days if client.next_payment_date else 0
     
     # ============================================
-    # DATOS DE JUMPING
+    # DATOS DE JUMPING (cacheados)
     # ============================================
-    # Clases de hoy
-    today_jumping_classes = JumpingClass.objects.filter(
-        date=today,
-        status__in=['scheduled', 'in_progress']
-    ).select_related('instructor', 'location')[:5]
-    
-    jumping_classes_today = today_jumping_classes.count()
-    
-    # Reservas de hoy
-    jumping_bookings_today = ClassBooking.objects.filter(
-        jumping_class__date=today,
-        status='confirmed'
-    ).count()
+    jumping_stats = get_jumping_stats(today)
     
     # Ocupación de hoy
-    total_capacity_today = sum(c.capacity for c in today_jumping_classes)
-    total_booked_today = sum(c.current_participants for c in today_jumping_classes)
+    total_capacity_today = jumping_stats['capacity_today']
+    total_booked_today = jumping_stats['booked_today']
     jumping_occupancy_today = (total_booked_today / total_capacity_today * 100) if total_capacity_today > 0 else 0
     
-    # Instructores y ubicaciones activas
-    active_instructors = Instructor.objects.filter(active=True).count()
-    active_locations = Location.objects.filter(is_active=True).count()
-    
-    # Próximas clases (próximos 7 días)
-    upcoming_jumping_classes = JumpingClass.objects.filter(
-        date__gte=today,
-        date__lte=today + timedelta(days=7),
-        status='scheduled'
-    ).select_related('instructor', 'location').order_by('date', 'start_time')[:5]
-    
     # ============================================
     # ACTIVIDAD RECIENTE
     # ============================================
     recent_activities = []
     
     # Últimos clientes agregados
-    recent_clients = Client.objects.filter(is_deleted=False).order_by('-created_at')[:3]
-    for client in recent_clients:
+    for client in client_stats['recent_clients']:
         recent_activities.append({
             'type': 'client',
             'title': f'Nuevo cliente: {client.first_name} {client.last_name}',
@@ -108,8 +68,7 @@ def home(request):
         })
     
     # Últimas reservas
-    recent_bookings = ClassBooking.objects.select_related('client', 'jumping_class').order_by('-booking_date')[:3]
-    for booking in recent_bookings:
+    for booking in jumping_stats['recent_bookings']:
         recent_activities.append({
             'type': 'jumping',
             'title': f'Reserva: {booking.client.first_name} {booking.client.last_name}',
@@ -118,8 +77,11 @@ def home(request):
             'user': booking.created_by.username if booking.created_by else 'Sistema'
         })
     
-    # Últimos SMS
-    recent_sms = SMSNotification.objects.select_related('client').order_by('-created_at')[:3]
+    # Últimos SMS (los envíos masivos no pasan por señales: solo TTL)
+    recent_sms = cached(
+        [], 'dashboard:recent_sms', settings.DASHBOARD_CACHE_TTL,
+        lambda: list(SMSNotification.objects.select_related('client').order_by('-created_at')[:3])
+    )
     for sms in recent_sms:
         recent_activities.append({
             'type': 'sms',
@@ -141,22 +103,22 @@ def home(request):
     context = {
         # Clientes
         'total_clients': total_clients,
-        'total_clients_all': total_clients_all,
+        'total_clients_all': client_stats['total_clients_all'],
         'overdue_clients': overdue_clients,
         'paid_clients': paid_clients,
-        'deleted_clients': deleted_clients,
+        'deleted_clients': client_stats['deleted_clients'],
         'overdue_percentage': round(overdue_percentage, 1),
         'paid_percentage': round(paid_percentage, 1),
         'upcoming_clients': upcoming_clients,
         
         # Jumping
-        'today_jumping_classes': today_jumping_classes,
-        'jumping_classes_today': jumping_classes_today,
-        'jumping_bookings_today': jumping_bookings_today,
+        'today_jumping_classes': jumping_stats['today_classes'],
+        'jumping_classes_today': jumping_stats['classes_today'],
+        'jumping_bookings_today': jumping_stats['bookings_today'],
         'jumping_occupancy_today': round(jumping_occupancy_today, 1),
-        'active_instructors': active_instructors,
-        'active_locations': active_locations,
-        'upcoming_jumping_classes': upcoming_jumping_classes,
+        'active_instructors': jumping_stats['active_instructors'],
+        'active_locations': jumping_stats['active_locations'],
+        'upcoming_jumping_classes': jumping_stats['upcoming_classes'],
         
         # Actividad
         'recent_activities': recent_activities,
@@ -167,38 +129,86 @@ def home(request):
     
     return render(request, 'home.html', context)
 
+CLIENTS_PER_PAGE = 25
+
 @login_required
 @allowed_roles(['admin', 'recep'])
 def client_list(request):
     """Lista de clientes activos"""
     clients = Client.objects.filter(is_deleted=False)
     
-    # Filtrar por estado de pago si se especifica
+    # Filtrar por estado de pago si se especifica (un valor desconocido se ignora)
     status_filter = request.GET.get('status')
+    if status_filter not in dict(Client._meta.get_field('payment_status').choices):
+        status_filter = None
     if status_filter:
         clients = clients.filter(payment_status=status_filter)
     
     # Filtrar por búsqueda
     search_query = request.GET.get('search', '')
     if search_query:
-        clients = clients.filter(
-            Q(first_name__icontains=search_query) |
-            Q(last_name__icontains=search_query) |
-            Q(phone__icontains=search_query) |
-            Q(email__icontains=search_query)
-        )
+        clients = clients.filter(search_filter(search_query))
+    
+    # Paginación por cursor sobre el id (más recientes primero)
+    page = paginate_keyset(
+        clients,
+        ['-id'],
+        cursor=request.GET.get('cursor'),
+        backwards=request.GET.get('dir') == 'prev',
+        per_page=CLIENTS_PER_PAGE
+    )
     
-    # Contar clientes en papelera
-    deleted_count = Client.objects.filter(is_deleted=True).count()
+    # Totales: contadores incrementales salvo cuando hay búsqueda
+    counts = counters.get_counts()
+    if search_query:
+        total_count = clients.count()
+    elif status_filter:
+        total_count = counts.get(status_filter, 0)
+    else:
+        total_count = counts['total_clients']
+    
+    filter_query = urlencode({
+        key: value for key, value in (('status', status_filter), ('search', search_query)) if value
+    })
     
     context = {
-        'clients': clients,
+        'clients': page,
+        'page': page,
+        'total_count': total_count,
+        'filter_query': filter_query,
         'status_filter': status_filter,
         'search_query': search_query,
-        'deleted_count': deleted_count,
+        'deleted_count': counts['deleted'],
     }
     return render(request, 'clients/client_list.html', context)
 
+@login_required
+@allowed_roles(['admin', 'recep'])
+def client_search(request):
+    """Búsqueda rápida (type-ahead) de clientes para recepción, en JSON"""
+    query = request.GET.get('q', '').strip()
+    if len(query) < 2:
+        return JsonResponse({'results': []})
+    
+    clients = search_clients(
+        Client.objects.filter(is_deleted=False).only(
+            'id', 'first_name', 'last_name', 'phone', 'email', 'active', 'payment_status'
+        ),
+        query
+    )
+    
+    return JsonResponse({'results': [
+        {
+            'id': client.id,
+            'name': f'{client.first_name} {client.last_name}',
+            'phone': client.phone,
+            'email': client.email,
+            'active': client.active,
+            'payment_status': client.payment_status,
+        }
+        for client in clients
+    ]})
+
 @login_required
 @allowed_roles(['admin', 'recep'])
 def client_trash(request):
@@ -333,25 +343,16 @@ def send_client_sms(request, pk):
     if request.method == 'POST':
         message = request.POST['message']
         
-        try:
-            sid = send_sms(client.phone, message)
-            
-            SMSNotification.objects.create(
-                client=client,
-                message=message,
-                sid=sid,
-                status='sent'
-            )
-            
+        # Envío inmediato; si falla por un error transitorio queda en la cola de reintentos
+        notification_ids = queue_notifications([(client.id, message)])
+        result = deliver_notifications(notification_ids)[0]
+        
+        if result.error is None:
             messages.success(request, 'SMS enviado correctamente')
-            
-        except Exception as e:
-            SMSNotification.objects.create(
-                client=client,
-                message=message,
-                status='error'
-            )
-            messages.error(request, f'Error al enviar SMS: {e}')
+        elif SMSNotification.objects.filter(id=result.notification_id, status='queued').exists():
+            messages.warning(request, f'No se pudo enviar el SMS, se reintentará automáticamente: {result.error}')
+        else:
+            messages.error(request, f'Error al enviar SMS: {result.error}')
         
         return redirect('client_list')
     
@@ -384,33 +385,17 @@ def bulk_sms(request):
         message = request.POST['message']
         client_ids = request.POST.getlist('clients')
         
-        clients = Client.objects.filter(
+        ids = Client.objects.filter(
             id__in=client_ids,
             is_deleted=False
-        )
-        
-        success_count = 0
-        error_count = 0
+        ).values_list('id', flat=True)
         
-        for client in clients:
-            try:
-                sid = send_sms(client.phone, message)
-                SMSNotification.objects.create(
-                    client=client,
-                    message=message,
-                    sid=sid,
-                    status='sent'
-                )
-                success_count += 1
-            except Exception:
-                SMSNotification.objects.create(
-                    client=client,
-                    message=message,
-                    status='error'
-                )
-                error_count += 1
+        # Se encolan y se envían en segundo plano
+        with transaction.atomic():
+            notification_ids = queue_notifications((client_id, message) for client_id in ids)
+            enqueue_delivery(notification_ids)
         
-        messages.info(request, f'SMS enviados: {success_count} exitosos, {error_count} fallidos')
+        messages.info(request, f'{len(notification_ids)} SMS en cola de envío')
         return redirect('client_list')
     
     # Mostrar clientes con pago vencido o pendiente
@@ -425,18 +410,8 @@ def bulk_sms(request):
 @allowed_roles(['admin'])
 def check_overdue_payments(request):
     """Verificar y actualizar estados de pago vencidos"""
-    today = timezone.now().date()
-    overdue_clients = Client.objects.filter(
-        is_deleted=False,
-        next_payment_date__lt=today,
-        payment_status__in=['pending', 'paid']
-    )
-    
-    updated_count = 0
-    for client in overdue_clients:
-        client.update_payment_status()
-        if client.payment_status == 'overdue':
-            updated_count += 1
+    counts = apply_payment_status_transitions()
+    updated_count = sum(counts.values())
     
     messages.info(request, f'Se actualizaron {updated_count} clientes con pago vencido')
     return redirect('client_list')
\ No newline at end of file
@@ -0,0 +1,31 @@
+from django.core.cache import cache
+
+
+def get_version(scope):
+    """Versión actual de un grupo de claves de caché"""
+    return cache.get_or_set(f'version:{scope}', 1, None)
+
+
+def bump_version(scope):
+    """Invalida todas las claves del grupo cambiando su versión"""
+    key = f'version:{scope}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 2, None)
+
+
+def cached(scopes, key, timeout, compute):
+    """
+    Devuelve el valor cacheado para `key` o lo calcula con `compute()`.
+    La clave incluye la versión de cada grupo en `scopes`, así que basta
+    con bump_version(grupo) para invalidarla.
+    """
+    versions = ':'.join(f'{scope}{get_version(scope)}' for scope in scopes)
+    full_key = f'{key}:{versions}'
+
+    value = cache.get(full_key)
+    if value is None:
+        value = compute()
+        cache.set(full_key, value, timeout)
+    return value
@@ -0,0 +1,44 @@
+"""
+Aplicación Celery del proyecto.
+
+Topología de workers (ver CELERY_TASK_ROUTES en settings):
+    celery -A gym worker -Q sms -c 4                  # envío de SMS (E/S lenta)
+    celery -A gym worker -Q maintenance,default -c 2  # tareas de base de datos
+    celery -A gym beat                                # tareas periódicas
+
+Sin CELERY_BROKER_URL ni REDIS_URL las tareas se ejecutan en el mismo
+proceso (modo eager), así que el proyecto funciona sin Redis.
+"""
+import logging
+import os
+import time
+
+from celery import Celery
+from celery.signals import task_postrun, task_prerun
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'gym.settings')
+
+app = Celery('gym')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+
+# Las tareas de cada app viven en task.py
+app.autodiscover_tasks(related_name='task')
+
+logger = logging.getLogger('gym.celery')
+
+_started = {}
+
+
+@task_prerun.connect
+def record_task_start(task_id=None, **kwargs):
+    _started[task_id] = time.monotonic()
+
+
+@task_postrun.connect
+def record_task_duration(task_id=None, task=None, state=None, **kwargs):
+    """Registra cuánto tardó cada tarea (nombre, estado y milisegundos)"""
+    started = _started.pop(task_id, None)
+    if started is None:
+        return
+    elapsed_ms = (time.monotonic() - started) * 1000
+    logger.info(f'Tarea {task.name} [{task_id}] {state} en {elapsed_ms:.0f} ms')
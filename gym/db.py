@@ -0,0 +1,11 @@
+from django.db.models import Value
+
+
+def single_row(queryset, **aggregates):
+    """
+    Queryset de una sola fila con los agregados indicados, sin GROUP BY.
+
+    A diferencia de aggregate() es perezoso, así que puede anotarse con más
+    subconsultas o usarse como Subquery dentro de otra consulta.
+    """
+    return queryset.order_by().annotate(_row=Value(1)).values('_row').annotate(**aggregates)
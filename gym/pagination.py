@@ -0,0 +1,134 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+class KeysetPage:
+    """Página obtenida por cursor (keyset) en lugar de OFFSET"""
+
+    def __init__(self, object_list, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values, default=str).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Devuelve la lista de valores del cursor, o None si no es válido"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, ValueError, UnicodeDecodeError):
+        return None
+    return values if isinstance(values, list) else None
+
+
+def _model_field(model, path):
+    """Campo del modelo al que apunta `path` (p. ej. 'jumping_class__date')"""
+    *relations, name = path.split('__')
+    for relation in relations:
+        model = model._meta.get_field(relation).related_model
+    return model._meta.get_field(name)
+
+
+def _cursor_values(model, fields, cursor):
+    """
+    Valores del cursor convertidos al tipo de cada campo de ordenación, o
+    None si el cursor no sirve (manipulado, de otro listado o de una versión
+    anterior): en ese caso se vuelve a la primera página en lugar de fallar.
+    """
+    values = decode_cursor(cursor)
+    if values is None or len(values) != len(fields) or None in values:
+        return None
+    try:
+        return [
+            _model_field(model, field).to_python(value)
+            for field, value in zip(fields, values)
+        ]
+    except (ValidationError, ValueError, TypeError):
+        return None
+
+
+def _key_values(obj, fields):
+    values = []
+    for field in fields:
+        value = obj
+        for attr in field.split('__'):
+            value = getattr(value, attr)
+        values.append(value)
+    return values
+
+
+def _after(ordering, values):
+    """
+    Condición "fila posterior a `values`" según `ordering`:
+    (a > x) OR (a = x AND b > y) OR ... respetando el sentido de cada campo.
+    """
+    condition = Q()
+    for i, field in enumerate(ordering):
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        term = Q(**{f'{name}__{lookup}': values[i]})
+        for previous, value in zip(ordering[:i], values[:i]):
+            term &= Q(**{previous.lstrip('-'): value})
+        condition |= term
+    return condition
+
+
+def _reverse(ordering):
+    return [field[1:] if field.startswith('-') else f'-{field}' for field in ordering]
+
+
+def paginate_keyset(queryset, ordering, cursor=None, backwards=False, per_page=25):
+    """
+    Pagina `queryset` por cursor sobre `ordering` (lista de campos, el último
+    debe ser único, p. ej. 'id'). Cada página cuesta lo mismo que la primera:
+    se filtra por el último valor visto en lugar de saltar filas con OFFSET.
+
+    `cursor` es el valor de next_cursor/previous_cursor de la página anterior
+    (uno inválido muestra la primera página); con `backwards=True` se retrocede.
+    """
+    fields = [field.lstrip('-') for field in ordering]
+    values = _cursor_values(queryset.model, fields, cursor) if cursor else None
+
+    walk = _reverse(ordering) if backwards else list(ordering)
+    rows = queryset.order_by(*walk)
+    if values is not None:
+        rows = rows.filter(_after(walk, values))
+
+    rows = list(rows[:per_page + 1])
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+
+    first_cursor = encode_cursor(_key_values(rows[0], fields)) if rows else None
+    last_cursor = encode_cursor(_key_values(rows[-1], fields)) if rows else None
+
+    if backwards:
+        next_cursor = last_cursor if values is not None else None
+        previous_cursor = first_cursor if has_more else None
+    else:
+        next_cursor = last_cursor if has_more else None
+        previous_cursor = first_cursor if values is not None else None
+
+    return KeysetPage(rows, next_cursor, previous_cursor)
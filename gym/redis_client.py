@@ -0,0 +1,37 @@
+import logging
+import time
+
+import redis
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Tras un fallo de conexión no se reintenta hasta pasado este tiempo (segundos)
+RETRY_AFTER = 30
+
+_client = None
+_unavailable_until = 0
+
+
+def get_redis():
+    """
+    Cliente Redis compartido del proceso, o None si REDIS_URL no está
+    configurado o el servidor no responde. El pool de conexiones de redis-py
+    ya se reinicia solo en los hijos de prefork.
+    """
+    global _client, _unavailable_until
+
+    if not settings.REDIS_URL or time.monotonic() < _unavailable_until:
+        return None
+
+    if _client is None:
+        try:
+            client = redis.Redis.from_url(settings.REDIS_URL, socket_timeout=5)
+            client.ping()
+            _client = client
+        except redis.RedisError as e:
+            _unavailable_until = time.monotonic() + RETRY_AFTER
+            logger.warning(f'Redis no disponible, usando alternativa local: {e}')
+            return None
+
+    return _client
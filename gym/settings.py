@@ -3,6 +3,7 @@ Django settings for gym project.
 """
 
 from pathlib import Path
+from celery.schedules import crontab
 from dotenv import load_dotenv
 import os
 
@@ -25,6 +26,11 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
+    
+    # Third-party apps
+    'django_celery_beat',
+    'django_celery_results',
     
     # Local apps
     'users',
@@ -75,6 +81,47 @@ DATABASES = {
     }
 }
 
+# Redis (caché, rate limit y buffer de callbacks de SMS); sin valor se usa memoria local
+REDIS_URL = os.getenv('REDIS_URL')
+
+# Cache
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Sesiones: 'cached_db' (caché + BD), 'db' o 'cache' (solo Redis). Sin Redis
+# la caché es por proceso: un logout en un worker no borraría la sesión
+# cacheada en los demás, así que solo se usa la BD.
+SESSION_BACKEND = os.getenv('SESSION_BACKEND', 'cached_db' if REDIS_URL else 'db')
+if SESSION_BACKEND in ('cache', 'cached_db') and not REDIS_URL:
+    SESSION_BACKEND = 'db'
+SESSION_ENGINE = f'django.contrib.sessions.backends.{SESSION_BACKEND}'
+
+# Usuario de la sesión en caché (ver users.backends). Sin Redis la caché es
+# por proceso y no se invalidaría en los demás workers, así que se desactiva.
+USER_CACHE_TTL = int(os.getenv('USER_CACHE_TTL', '300' if REDIS_URL else '0'))
+
+DASHBOARD_CACHE_TTL = int(os.getenv('DASHBOARD_CACHE_TTL', '60'))
+SCHEDULE_CACHE_TTL = int(os.getenv('SCHEDULE_CACHE_TTL', '300'))
+
+# Reportes: días cerrados que se vuelven a resumir cada noche
+REPORT_ROLLUP_LOOKBACK_DAYS = int(os.getenv('REPORT_ROLLUP_LOOKBACK_DAYS', '7'))
+
+# Papelera de clientes: días antes de borrar definitivamente y tamaño de lote de la purga
+RECYCLE_BIN_RETENTION_DAYS = int(os.getenv('RECYCLE_BIN_RETENTION_DAYS', '30'))
+PURGE_CHUNK_SIZE = int(os.getenv('PURGE_CHUNK_SIZE', '500'))
+PURGE_TIME_BUDGET = int(os.getenv('PURGE_TIME_BUDGET', '300'))
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -105,6 +152,12 @@ STATICFILES_DIRS = [BASE_DIR / 'static']
 
 # Authentication
 AUTH_USER_MODEL = 'users.User'
+# Los inicios de sesión nuevos usan el backend cacheado; ModelBackend queda
+# para las sesiones abiertas antes del cambio
+AUTHENTICATION_BACKENDS = [
+    'users.backends.CachedModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/accounts/login/'
 LOGIN_URL = '/accounts/login/'
@@ -112,4 +165,91 @@ LOGIN_URL = '/accounts/login/'
 # Twilio Configuration
 TWILIO_ACCOUNT_SID = os.getenv('TWILIO_ACCOUNT_SID')
 TWILIO_AUTH_TOKEN = os.getenv('TWILIO_AUTH_TOKEN')
-TWILIO_PHONE_NUMBER = os.getenv('TWILIO_PHONE_NUMBER')
\ No newline at end of file
+TWILIO_PHONE_NUMBER = os.getenv('TWILIO_PHONE_NUMBER')
+
+# SMS
+# Backends: notifications.transport.TwilioBackend | HTTPBackend (servidor falso) | LocMemBackend
+SMS_BACKEND = os.getenv('SMS_BACKEND', 'notifications.transport.TwilioBackend')
+SMS_FAKE_SERVER_URL = os.getenv('SMS_FAKE_SERVER_URL', 'http://127.0.0.1:8025/messages')
+SMS_STATUS_CALLBACK_URL = os.getenv('SMS_STATUS_CALLBACK_URL', 'https://TU_DOMINIO/notifications/sms/status/')
+SMS_HTTP_POOL_SIZE = int(os.getenv('SMS_HTTP_POOL_SIZE', '10'))
+SMS_HTTP_TIMEOUT = float(os.getenv('SMS_HTTP_TIMEOUT', '10'))
+SMS_DELIVERY_CHUNK_SIZE = int(os.getenv('SMS_DELIVERY_CHUNK_SIZE', '50'))
+SMS_MAX_IN_FLIGHT = int(os.getenv('SMS_MAX_IN_FLIGHT', '8'))
+SMS_RATE_PER_SECOND = float(os.getenv('SMS_RATE_PER_SECOND', '10'))
+SMS_RATE_BURST = int(os.getenv('SMS_RATE_BURST', '10'))
+SMS_MAX_ATTEMPTS = int(os.getenv('SMS_MAX_ATTEMPTS', '5'))
+SMS_RETRY_BASE_DELAY = int(os.getenv('SMS_RETRY_BASE_DELAY', '30'))
+SMS_RETRY_LEASE = int(os.getenv('SMS_RETRY_LEASE', '600'))
+SMS_RETRY_BATCH_SIZE = int(os.getenv('SMS_RETRY_BATCH_SIZE', '500'))
+SMS_STATUS_BATCH_SIZE = int(os.getenv('SMS_STATUS_BATCH_SIZE', '200'))
+
+# Celery
+# Sin broker configurado las tareas corren en el mismo proceso (modo eager)
+CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL', REDIS_URL or 'memory://')
+CELERY_TASK_ALWAYS_EAGER = os.getenv(
+    'CELERY_TASK_ALWAYS_EAGER', str(CELERY_BROKER_URL == 'memory://')
+) == 'True'
+CELERY_RESULT_BACKEND = 'django-db'
+CELERY_RESULT_EXTENDED = True
+CELERY_TIMEZONE = TIME_ZONE
+CELERY_TASK_TRACK_STARTED = True
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
+
+# Colas: 'sms' para el envío (E/S lenta), 'maintenance' para trabajos de base de datos
+CELERY_TASK_DEFAULT_QUEUE = 'default'
+CELERY_TASK_ROUTES = {
+    'notifications.task.flush_sms_status_events_task': {'queue': 'maintenance'},
+    'notifications.task.*': {'queue': 'sms'},
+    'clients.task.*': {'queue': 'maintenance'},
+    'jumping.task.*': {'queue': 'maintenance'},
+}
+
+# Tareas periódicas (Celery beat)
+CELERY_BEAT_SCHEDULE = {
+    'check-overdue-payments': {
+        'task': 'clients.task.check_overdue_payments_task',
+        'schedule': crontab(hour=0, minute=30),
+    },
+    'deactivate-unpaid-clients': {
+        'task': 'clients.task.deactivate_unpaid_clients_task',
+        'schedule': crontab(hour=1, minute=0),
+    },
+    'cleanup-recycle-bin': {
+        'task': 'clients.task.cleanup_recycle_bin_task',
+        'schedule': crontab(hour=3, minute=0),
+    },
+    'send-payment-reminders': {
+        'task': 'clients.task.send_payment_reminders_task',
+        'schedule': crontab(hour=10, minute=0),
+    },
+    'retry-queued-sms': {
+        'task': 'notifications.task.retry_queued_sms_task',
+        'schedule': 60.0,
+    },
+    'flush-sms-status-events': {
+        'task': 'notifications.task.flush_sms_status_events_task',
+        'schedule': 5.0,
+    },
+    'reconcile-membership-counters': {
+        'task': 'clients.task.reconcile_membership_counters_task',
+        'schedule': 60.0 * 60,
+    },
+    'update-class-status': {
+        'task': 'jumping.task.update_class_status_task',
+        'schedule': 60.0,
+    },
+    'mark-no-shows': {
+        'task': 'jumping.task.mark_no_shows_task',
+        'schedule': 60.0 * 5,
+    },
+    'reconcile-class-occupancy': {
+        'task': 'jumping.task.reconcile_occupancy_task',
+        'schedule': 60.0 * 60,
+    },
+    'rollup-daily-class-stats': {
+        'task': 'jumping.task.rollup_daily_class_stats_task',
+        'schedule': crontab(hour=2, minute=0),
+    },
+}
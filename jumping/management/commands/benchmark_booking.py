@@ -0,0 +1,100 @@
+import threading
+import time
+from datetime import time as dtime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from clients.models import Client
+from jumping.models import ClassBooking, Instructor, JumpingClass, Location
+from jumping.services import BookingError, book_class
+
+
+class Command(BaseCommand):
+    help = (
+        'Prueba de contención: N hilos reservan la misma clase a la vez y se '
+        'verifica que no haya sobrecupo. Crea datos temporales y los borra al final.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=50, help='Reservas simultáneas')
+        parser.add_argument('--capacity', type=int, default=20, help='Cupo de la clase')
+        parser.add_argument('--keep', action='store_true', help='No borrar los datos de prueba')
+
+    def handle(self, *args, **options):
+        threads_count = options['threads']
+        capacity = options['capacity']
+
+        instructor = Instructor.objects.create(first_name='Benchmark', last_name='Reservas', phone='0000000000')
+        location = Location.objects.create(name='Benchmark', address='-', phone='0000000000')
+        jumping_class = JumpingClass.objects.create(
+            name='Benchmark reservas',
+            instructor=instructor,
+            location=location,
+            date=timezone.now().date(),
+            start_time=dtime(23, 0),
+            end_time=dtime(23, 59),
+            capacity=capacity,
+        )
+        clients = [
+            Client.objects.create(first_name='Benchmark', last_name=str(i), phone='0000000000')
+            for i in range(threads_count)
+        ]
+
+        results = {'booked': 0, 'rejected': 0, 'errors': 0}
+        results_lock = threading.Lock()
+        barrier = threading.Barrier(threads_count)
+
+        def worker(client):
+            outcome = 'booked'
+            try:
+                barrier.wait()
+                book_class(jumping_class, client)
+            except BookingError:
+                outcome = 'rejected'
+            except Exception as e:
+                outcome = 'errors'
+                self.stderr.write(f'Error inesperado: {e}')
+            finally:
+                connection.close()
+            with results_lock:
+                results[outcome] += 1
+
+        workers = [threading.Thread(target=worker, args=(client,)) for client in clients]
+        start = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        jumping_class.refresh_from_db()
+        bookings = ClassBooking.objects.filter(jumping_class=jumping_class).count()
+
+        self.stdout.write(
+            f'{threads_count} intentos en {elapsed:.3f}s ({threads_count / elapsed:.1f} reservas/s): '
+            f'{results["booked"]} reservadas, {results["rejected"]} rechazadas, {results["errors"]} errores'
+        )
+        self.stdout.write(
+            f'Cupo {capacity}, participantes {jumping_class.current_participants}, '
+            f'reservas en BD {bookings}, estado {jumping_class.status}'
+        )
+
+        overbooked = (
+            jumping_class.current_participants > capacity or
+            bookings != jumping_class.current_participants or
+            results['booked'] != bookings
+        )
+
+        if not options['keep']:
+            ClassBooking.objects.filter(jumping_class=jumping_class).delete()
+            jumping_class.delete()
+            location.delete()
+            instructor.delete()
+            for client in clients:
+                client.delete()
+
+        if overbooked:
+            raise CommandError('Sobrecupo o contador inconsistente')
+        self.stdout.write(self.style.SUCCESS('Sin sobrecupo'))
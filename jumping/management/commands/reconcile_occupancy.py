@@ -0,0 +1,29 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from jumping.services import reconcile_occupancy
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula la ocupación (current_participants) de las clases desde hoy '
+        'a partir de sus reservas y corrige en bloque las que no coinciden.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help='Fecha inicial AAAA-MM-DD (por defecto, hoy)')
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            try:
+                since = date.fromisoformat(options['since'])
+            except ValueError:
+                raise CommandError(f'Fecha inválida: {options["since"]}')
+
+        drift = reconcile_occupancy(since)
+
+        for class_id, (stored, actual) in sorted(drift.items()):
+            self.stdout.write(f'Clase {class_id}: {stored} -> {actual}')
+        self.stdout.write(self.style.SUCCESS(f'{len(drift)} clases corregidas'))
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:07
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('clients', '0006_client_phone_digits_client_client_first_name_trgm_and_more'),
+        ('jumping', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WaitlistEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField(verbose_name='Posición')),
+                ('status', models.CharField(choices=[('waiting', 'En espera'), ('promoted', 'Promovido'), ('cancelled', 'Cancelado')], default='waiting', max_length=20, verbose_name='Estado')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('promoted_at', models.DateTimeField(blank=True, null=True, verbose_name='Fecha promoción')),
+                ('booking', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='waitlist_entries', to='jumping.classbooking', verbose_name='Reserva asignada')),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='jumping_waitlist', to='clients.client', verbose_name='Cliente')),
+                ('created_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='created_waitlist_entries', to=settings.AUTH_USER_MODEL, verbose_name='Registrado por')),
+                ('jumping_class', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist', to='jumping.jumpingclass', verbose_name='Clase')),
+            ],
+            options={
+                'verbose_name': 'Lista de espera',
+                'verbose_name_plural': 'Listas de espera',
+                'ordering': ['position'],
+                'indexes': [models.Index(fields=['jumping_class', 'status', 'position'], name='jumping_wai_jumping_7171e1_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='waitlistentry',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'waiting')), fields=('jumping_class', 'client'), name='waitlist_unique_waiting_client'),
+        ),
+    ]
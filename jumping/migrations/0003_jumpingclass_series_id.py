@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jumping', '0002_waitlistentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='jumpingclass',
+            name='series_id',
+            field=models.UUIDField(blank=True, db_index=True, null=True, verbose_name='Serie'),
+        ),
+    ]
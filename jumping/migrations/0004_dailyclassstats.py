@@ -0,0 +1,36 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:14
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jumping', '0003_jumpingclass_series_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyClassStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Fecha')),
+                ('classes', models.PositiveIntegerField(default=0)),
+                ('bookings', models.PositiveIntegerField(default=0)),
+                ('attended', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('instructor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='jumping.instructor')),
+                ('location', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='jumping.location')),
+            ],
+            options={
+                'verbose_name': 'Resumen diario',
+                'verbose_name_plural': 'Resúmenes diarios',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dailyclassstats',
+            constraint=models.UniqueConstraint(fields=('date', 'instructor', 'location'), name='daily_class_stats_unique_day'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jumping', '0004_dailyclassstats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='classbooking',
+            index=models.Index(fields=['booking_date', 'id'], name='jumping_cla_booking_7f6dea_idx'),
+        ),
+    ]
@@ -1,8 +1,9 @@
-from django.db import models
+from django.db import models, transaction
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
 from clients.models import Client
 from users.models import User
+from gym.cache import bump_version
 
 class Instructor(models.Model):
     """Modelo para instructores/profesores"""
@@ -41,6 +42,7 @@ class Location(models.Model):
     opening_time = models.TimeField(default="06:00", verbose_name="Hora apertura")
     closing_time = models.TimeField(default="22:00", verbose_name="Hora cierre")
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         verbose_name = "Ubicación"
@@ -126,6 +128,8 @@ class JumpingClass(models.Model):
     recurring = models.BooleanField(default=False, verbose_name="Clase recurrente")
     recurring_days = models.JSONField(default=list, blank=True, verbose_name="Días de repetición")
     recurring_until = models.DateField(blank=True, null=True, verbose_name="Repetir hasta")
+    # Todas las ocurrencias de una clase recurrente comparten este identificador
+    series_id = models.UUIDField(blank=True, null=True, db_index=True, verbose_name="Serie")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -139,9 +143,34 @@ class JumpingClass(models.Model):
             models.Index(fields=['instructor', 'date']),
         ]
     
+    # Solo los cambian los UPDATE con F() de la ocupación (ver services)
+    OCCUPANCY_FIELDS = ['current_participants', 'status']
+    
     def __str__(self):
         return f"{self.name} - {self.date} {self.start_time} ({self.location})"
     
+    def save(self, *args, **kwargs):
+        """
+        Al editar una clase existente no se reescriben current_participants
+        ni status tal como se leyeron (formulario, admin): pisarían las
+        reservas confirmadas entre tanto. Para cambiarlos hay que pedirlos
+        en update_fields.
+        """
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.OCCUPANCY_FIELDS
+            ]
+        super().save(*args, **kwargs)
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Semana y ubicación tal como se leyeron, para invalidar también las de antes
+        if not instance.get_deferred_fields() & {'date', 'location_id'}:
+            instance._schedule_slot = (instance.date, instance.location_id)
+        return instance
+    
     @property
     def available_spots(self):
         """Calcula lugares disponibles"""
@@ -156,21 +185,6 @@ class JumpingClass(models.Model):
     def can_cancel(self):
         """Verifica si la clase puede cancelarse"""
         return self.status in ['scheduled', 'full'] and self.date >= timezone.now().date()
-    
-    def update_status(self):
-        """Actualiza estado automático"""
-        now = timezone.now()
-        if self.date < now.date():
-            self.status = 'completed'
-        elif self.date == now.date() and self.start_time <= now.time() <= self.end_time:
-            self.status = 'in_progress'
-        elif self.is_full:
-            self.status = 'full'
-        elif self.status == 'cancelled':
-            pass  # Mantener cancelado
-        else:
-            self.status = 'scheduled'
-        self.save()
 
 class ClassBooking(models.Model):
     """Modelo para reservas de clases"""
@@ -227,27 +241,116 @@ class ClassBooking(models.Model):
         indexes = [
             models.Index(fields=['status', 'payment_status']),
             models.Index(fields=['jumping_class', 'status']),
+            # Paginación por cursor de booking_list
+            models.Index(fields=['booking_date', 'id']),
         ]
     
     def __str__(self):
         return f"{self.client} - {self.jumping_class}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Recordar qué lugar ocupaba tal como se leyó de la BD (ver signals)
+        if not instance.get_deferred_fields() & {'jumping_class_id', 'status'}:
+            instance._occupied_class_id = instance.occupied_class_id
+        return instance
+    
+    @property
+    def occupied_class_id(self):
+        """Clase en la que la reserva ocupa un lugar (None si está cancelada)"""
+        return None if self.status == 'cancelled' else self.jumping_class_id
+    
     def confirm_attendance(self):
         """Confirma asistencia"""
         self.attended = True
         self.status = 'attended'
         self.check_in_time = timezone.now()
-        self.save()
+        self.save(update_fields=['attended', 'status', 'check_in_time'])
     
     def cancel_booking(self):
-        """Cancela la reserva"""
-        self.status = 'cancelled'
-        self.save()
+        """
+        Cancela la reserva y libera su lugar (una sola vez aunque se llame
+        dos veces); si hay lista de espera, el lugar se asigna en la misma
+        transacción.
+        """
+        from .services import promote_from_waitlist, release_seat
         
-        # Liberar cupo
-        class_obj = self.jumping_class
-        class_obj.current_participants -= 1
-        class_obj.save()
+        with transaction.atomic():
+            cancelled = ClassBooking.objects.filter(
+                pk=self.pk
+            ).exclude(status='cancelled').update(status='cancelled')
+            if cancelled:
+                release_seat(self.jumping_class_id)
+                # El lugar liberado pasa directamente al primero en espera
+                promote_from_waitlist(self.jumping_class_id)
+        self.status = 'cancelled'
+        self._occupied_class_id = None
+        bump_version('jumping')
+
+class WaitlistEntry(models.Model):
+    """Lista de espera de una clase llena (FIFO por posición)"""
+    STATUS_CHOICES = (
+        ('waiting', 'En espera'),
+        ('promoted', 'Promovido'),
+        ('cancelled', 'Cancelado'),
+    )
+    
+    jumping_class = models.ForeignKey(
+        JumpingClass,
+        on_delete=models.CASCADE,
+        related_name='waitlist',
+        verbose_name="Clase"
+    )
+    client = models.ForeignKey(
+        Client,
+        on_delete=models.CASCADE,
+        related_name='jumping_waitlist',
+        verbose_name="Cliente"
+    )
+    position = models.PositiveIntegerField(verbose_name="Posición")
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='waiting',
+        verbose_name="Estado"
+    )
+    booking = models.ForeignKey(
+        ClassBooking,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='waitlist_entries',
+        verbose_name="Reserva asignada"
+    )
+    created_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='created_waitlist_entries',
+        verbose_name="Registrado por"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    promoted_at = models.DateTimeField(blank=True, null=True, verbose_name="Fecha promoción")
+    
+    class Meta:
+        verbose_name = "Lista de espera"
+        verbose_name_plural = "Listas de espera"
+        ordering = ['position']
+        constraints = [
+            # Un cliente solo puede esperar una vez por clase
+            models.UniqueConstraint(
+                fields=['jumping_class', 'client'],
+                condition=models.Q(status='waiting'),
+                name='waitlist_unique_waiting_client'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['jumping_class', 'status', 'position']),
+        ]
+    
+    def __str__(self):
+        return f"{self.client} - {self.jumping_class} (#{self.position})"
 
 class Equipment(models.Model):
     """Modelo para equipamiento"""
@@ -296,4 +399,29 @@ class Equipment(models.Model):
     
     @property
     def is_available(self):
-        return self.available_quantity > 0
\ No newline at end of file
+        return self.available_quantity > 0
+
+
+class DailyClassStats(models.Model):
+    """Resumen diario de clases y reservas por instructor y ubicación (para reportes)"""
+    date = models.DateField(verbose_name="Fecha")
+    instructor = models.ForeignKey(Instructor, on_delete=models.CASCADE, related_name='+')
+    location = models.ForeignKey(Location, on_delete=models.CASCADE, related_name='+')
+    classes = models.PositiveIntegerField(default=0)
+    bookings = models.PositiveIntegerField(default=0)
+    attended = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = "Resumen diario"
+        verbose_name_plural = "Resúmenes diarios"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['date', 'instructor', 'location'],
+                name='daily_class_stats_unique_day'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.date} - {self.instructor_id}/{self.location_id}"
@@ -0,0 +1,221 @@
+import uuid
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
+
+from gym.cache import bump_version
+from .models import JumpingClass
+from .services import bump_schedule_caches, cancel_classes, promote_waitlists
+
+# Campos que se copian de la clase base a cada repetición
+SERIES_COPY_FIELDS = [
+    'name', 'description', 'instructor_id', 'location_id', 'start_time',
+    'end_time', 'duration', 'capacity', 'difficulty', 'price',
+    'requires_equipment', 'equipment_available', 'recurring_days',
+    'recurring_until',
+]
+
+# Campos que se pueden cambiar para toda la serie de una vez
+SERIES_EDIT_FIELDS = [
+    'name', 'description', 'instructor', 'location', 'start_time', 'end_time',
+    'duration', 'capacity', 'difficulty', 'price', 'requires_equipment',
+    'equipment_available',
+]
+
+# Solo se editan o cancelan ocurrencias que aún no se han impartido
+OPEN_STATUSES = ['scheduled', 'full']
+
+
+class ScheduleConflictError(Exception):
+    """Alguna ocurrencia choca con otra clase del instructor o de la ubicación"""
+
+    def __init__(self, conflicts):
+        self.conflicts = conflicts
+        super().__init__(
+            'Conflicto de horario con: ' +
+            ', '.join(f'{c.name} {c.date:%d/%m/%Y} {c.start_time:%H:%M}' for c in conflicts[:5]) +
+            (f' y {len(conflicts) - 5} más' if len(conflicts) > 5 else '')
+        )
+
+
+class SeriesCapacityError(Exception):
+    """El nuevo cupo es menor que las reservas de alguna ocurrencia"""
+
+    def __init__(self, classes):
+        self.classes = classes
+        super().__init__(
+            'El cupo es menor que las reservas de: ' +
+            ', '.join(f'{c.date:%d/%m/%Y} ({c.current_participants})' for c in classes[:5]) +
+            (f' y {len(classes) - 5} más' if len(classes) > 5 else '')
+        )
+
+
+def expand_dates(start, until, weekdays):
+    """
+    Fechas entre `start` y `until` (inclusive) que caen en `weekdays`
+    (0 = lunes). Por cada día de la semana se calcula la primera fecha y
+    se avanza de 7 en 7, sin recorrer el calendario día por día.
+    """
+    dates = []
+    for weekday in {int(day) for day in weekdays}:
+        first = start + timedelta(days=(weekday - start.weekday()) % 7)
+        weeks = (until - first).days // 7 + 1 if first <= until else 0
+        dates.extend(first + timedelta(weeks=n) for n in range(weeks))
+    return sorted(dates)
+
+
+def find_conflicts(dates, start_time, end_time, instructor_id, location_id, exclude=None):
+    """
+    Clases que se solapan en horario con alguna de `dates` y comparten
+    instructor o ubicación. Una sola consulta por rango de fechas que usa
+    los índices (instructor, date) y (location, date).
+    """
+    if not dates:
+        return []
+
+    conflicts = JumpingClass.objects.filter(
+        Q(instructor_id=instructor_id) | Q(location_id=location_id),
+        date__range=[dates[0], dates[-1]],
+        start_time__lt=end_time,
+        end_time__gt=start_time,
+    ).exclude(status='cancelled').order_by('date', 'start_time')
+    if exclude is not None:
+        conflicts = conflicts.exclude(exclude)
+
+    wanted = set(dates)
+    return [jumping_class for jumping_class in conflicts if jumping_class.date in wanted]
+
+
+def create_series(base_class):
+    """
+    Genera las repeticiones de `base_class` según recurring_days y
+    recurring_until con un único bulk_create. Todas las clases de la serie
+    comparten series_id. Lanza ScheduleConflictError (sin crear nada) si
+    alguna fecha choca con otra clase. Devuelve las clases creadas.
+    """
+    if not (base_class.recurring_until and base_class.recurring_days):
+        return []
+
+    dates = expand_dates(base_class.date, base_class.recurring_until, base_class.recurring_days)
+    conflicts = find_conflicts(
+        sorted(set(dates) | {base_class.date}),
+        base_class.start_time,
+        base_class.end_time,
+        base_class.instructor_id,
+        base_class.location_id,
+        exclude=Q(pk=base_class.pk)
+    )
+    if conflicts:
+        raise ScheduleConflictError(conflicts)
+
+    series_id = base_class.series_id or uuid.uuid4()
+    values = {field: getattr(base_class, field) for field in SERIES_COPY_FIELDS}
+
+    with transaction.atomic():
+        JumpingClass.objects.filter(pk=base_class.pk).update(series_id=series_id, recurring=True)
+        base_class.series_id = series_id
+        created = JumpingClass.objects.bulk_create([
+            JumpingClass(date=date, series_id=series_id, recurring=True, **values)
+            for date in dates
+            if date != base_class.date
+        ])
+        bump_schedule_caches((date, base_class.location_id) for date in dates)
+
+    bump_version('jumping')
+    return created
+
+
+def series_queryset(series_id, from_date=None):
+    """Ocurrencias abiertas de la serie a partir de `from_date` (hoy por defecto)"""
+    return JumpingClass.objects.filter(
+        series_id=series_id,
+        date__gte=from_date or timezone.now().date(),
+        status__in=OPEN_STATUSES
+    )
+
+
+def update_series(series_id, changes, from_date=None):
+    """
+    Aplica `changes` ({campo: valor}, de SERIES_EDIT_FIELDS) a todas las
+    ocurrencias abiertas de la serie con un único UPDATE. Si cambian horario,
+    instructor o ubicación se revisan antes los conflictos. Un cupo nuevo
+    no puede quedar por debajo de las reservas de ninguna ocurrencia
+    (SeriesCapacityError) y en el mismo UPDATE se recalcula llena/programada;
+    los lugares que añada pasan a la lista de espera.
+    Devuelve el número de clases actualizadas.
+    """
+    changes = {field: value for field, value in changes.items() if field in SERIES_EDIT_FIELDS}
+    if not changes:
+        return 0
+
+    occurrences = series_queryset(series_id, from_date)
+
+    with transaction.atomic():
+        if {'start_time', 'end_time', 'instructor', 'location'} & changes.keys():
+            # Con los valores nuevos, cada ocurrencia debe seguir libre
+            current = occurrences.values_list(
+                'date', 'start_time', 'end_time', 'instructor_id', 'location_id'
+            )
+            conflicts = []
+            for key, group in _group_by_slot(current, changes).items():
+                start_time, end_time, instructor_id, location_id = key
+                conflicts += find_conflicts(
+                    group, start_time, end_time, instructor_id, location_id,
+                    exclude=Q(series_id=series_id)
+                )
+            if conflicts:
+                raise ScheduleConflictError(conflicts)
+
+        if 'capacity' in changes:
+            capacity = changes['capacity']
+            # Bloqueadas: una reserva concurrente no puede colarse entre la revisión y el UPDATE
+            overbooked = list(
+                occurrences.select_for_update().filter(current_participants__gt=capacity).order_by('date')
+            )
+            if overbooked:
+                raise SeriesCapacityError(overbooked)
+            changes['status'] = Case(
+                When(current_participants__gte=capacity, then=Value('full')),
+                When(status='full', then=Value('scheduled')),
+                default=F('status')
+            )
+
+        # Semanas y meses de antes y después del cambio (puede cambiar la ubicación)
+        bump_schedule_caches(occurrences.values_list('date', 'location_id'))
+        updated = occurrences.update(updated_at=timezone.now(), **changes)
+        bump_schedule_caches(occurrences.values_list('date', 'location_id'))
+
+        if 'capacity' in changes:
+            # Un cupo mayor deja lugares para la lista de espera
+            promote_waitlists(occurrences.values_list('id', flat=True))
+
+    bump_version('jumping')
+    return updated
+
+
+def _group_by_slot(occurrences, changes):
+    """Agrupa las fechas por (inicio, fin, instructor, ubicación) resultantes del cambio"""
+    instructor = changes.get('instructor')
+    location = changes.get('location')
+    slots = {}
+    for date, start_time, end_time, instructor_id, location_id in occurrences:
+        key = (
+            changes.get('start_time', start_time),
+            changes.get('end_time', end_time),
+            instructor.pk if instructor else instructor_id,
+            location.pk if location else location_id,
+        )
+        slots.setdefault(key, []).append(date)
+    return {key: sorted(dates) for key, dates in slots.items()}
+
+
+def cancel_series(series_id, from_date=None):
+    """
+    Cancela las ocurrencias abiertas de la serie desde `from_date` con sus
+    reservas confirmadas (ver cancel_classes; cada cliente recibe un solo aviso).
+    Devuelve (clases canceladas, reservas canceladas).
+    """
+    class_ids = series_queryset(series_id, from_date).values_list('id', flat=True)
+    return cancel_classes(class_ids)
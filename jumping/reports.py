@@ -0,0 +1,146 @@
+from django.db import transaction
+from django.db.models import Count, DecimalField, Max, Min, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from datetime import timedelta
+import logging
+
+from .models import DailyClassStats, JumpingClass
+
+logger = logging.getLogger(__name__)
+
+# Claves de agrupación de los reportes (instructor y ubicación con su nombre)
+GROUP_FIELDS = [
+    'instructor_id', 'instructor__first_name', 'instructor__last_name',
+    'location_id', 'location__name',
+]
+
+ZERO = Value(0, output_field=DecimalField(max_digits=12, decimal_places=2))
+
+
+def _live_metrics(start, end, group_by):
+    """
+    Métricas calculadas directamente sobre clases y reservas, agrupadas por
+    `group_by`, en una sola consulta con agregados condicionales.
+    """
+    return JumpingClass.objects.filter(date__range=[start, end]).values(*group_by).annotate(
+        total_classes=Count('id', distinct=True),
+        total_bookings=Count('bookings'),
+        total_attended=Count('bookings', filter=Q(bookings__status='attended')),
+        total_revenue=Coalesce(
+            Sum('bookings__amount_paid', filter=Q(bookings__payment_status=True)), ZERO
+        ),
+    ).order_by()
+
+
+def _rollup_metrics(start, end):
+    return DailyClassStats.objects.filter(date__range=[start, end]).values(*GROUP_FIELDS).annotate(
+        total_classes=Sum('classes'),
+        total_bookings=Sum('bookings'),
+        total_attended=Sum('attended'),
+        total_revenue=Coalesce(Sum('revenue'), ZERO),
+    ).order_by()
+
+
+def rollup_watermark():
+    """Último día resumido en DailyClassStats (None si aún no hay resumen)"""
+    return DailyClassStats.objects.aggregate(last=Max('date'))['last']
+
+
+def class_report(start, end):
+    """
+    Métricas del reporte de clases entre `start` y `end`.
+
+    Los días ya resumidos se leen de DailyClassStats y el resto (hoy y
+    posteriores, o todo si no hay resumen) se calcula en vivo: como mucho
+    dos consultas agregadas, sin importar cuántas reservas haya.
+    """
+    rows = []
+    live_start = start
+
+    watermark = rollup_watermark()
+    if watermark and start <= watermark:
+        rows += list(_rollup_metrics(start, min(end, watermark)))
+        live_start = watermark + timedelta(days=1)
+
+    if live_start <= end:
+        rows += list(_live_metrics(live_start, end, GROUP_FIELDS))
+
+    totals = {'total_classes': 0, 'total_bookings': 0, 'total_attended': 0, 'total_revenue': 0}
+    by_instructor, by_location = {}, {}
+    for row in rows:
+        for key in totals:
+            totals[key] += row[key]
+
+        instructor = by_instructor.setdefault(row['instructor_id'], {
+            'instructor__first_name': row['instructor__first_name'],
+            'instructor__last_name': row['instructor__last_name'],
+            'count': 0,
+        })
+        instructor['count'] += row['total_classes']
+
+        location = by_location.setdefault(row['location_id'], {
+            'location__name': row['location__name'],
+            'count': 0,
+        })
+        location['count'] += row['total_classes']
+
+    attendance_rate = (
+        totals['total_attended'] / totals['total_bookings'] * 100 if totals['total_bookings'] else 0
+    )
+
+    return {
+        'total_classes': totals['total_classes'],
+        'total_bookings': totals['total_bookings'],
+        'total_revenue': totals['total_revenue'],
+        'classes_by_instructor': sorted(by_instructor.values(), key=lambda item: -item['count']),
+        'classes_by_location': sorted(by_location.values(), key=lambda item: -item['count']),
+        'attendance_rate': round(attendance_rate, 2),
+    }
+
+
+def rollup_daily_stats(start, end):
+    """
+    Recalcula DailyClassStats para los días entre `start` y `end`: borra el
+    rango y lo vuelve a insertar con una consulta agrupada y un bulk_create,
+    en una transacción. Devuelve las filas escritas.
+    """
+    rows = _live_metrics(start, end, ['date', 'instructor_id', 'location_id'])
+
+    with transaction.atomic():
+        DailyClassStats.objects.filter(date__range=[start, end]).delete()
+        created = DailyClassStats.objects.bulk_create([
+            DailyClassStats(
+                date=row['date'],
+                instructor_id=row['instructor_id'],
+                location_id=row['location_id'],
+                classes=row['total_classes'],
+                bookings=row['total_bookings'],
+                attended=row['total_attended'],
+                revenue=row['total_revenue'],
+            )
+            for row in rows
+        ])
+
+    logger.info(f'Resumen diario de clases {start} - {end}: {len(created)} filas')
+    return len(created)
+
+
+def rollup_closed_days(lookback_days=7, today=None):
+    """
+    Resume los días ya cerrados (hasta ayer). Se rehacen también los últimos
+    `lookback_days` días para recoger pagos o asistencias registrados tarde;
+    la primera vez se resume todo el historial.
+    """
+    today = today or timezone.now().date()
+    end = today - timedelta(days=1)
+
+    watermark = rollup_watermark()
+    if watermark:
+        start = watermark - timedelta(days=lookback_days)
+    else:
+        start = JumpingClass.objects.aggregate(first=Min('date'))['first']
+    if start is None or start > end:
+        return 0
+
+    return rollup_daily_stats(start, end)
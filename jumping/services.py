@@ -0,0 +1,814 @@
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, F, Max, Q, Subquery, Sum, Value, When, Window
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from datetime import date, timedelta
+from itertools import groupby
+from operator import itemgetter
+import logging
+
+from gym.cache import bump_version, cached
+from gym.db import single_row
+from notifications.services import queue_notifications
+from notifications.task import enqueue_delivery
+from .models import JumpingClass, ClassBooking, Instructor, Location, WaitlistEntry
+
+logger = logging.getLogger(__name__)
+
+
+def _compute_jumping_stats(today):
+    today_classes = JumpingClass.objects.filter(
+        date=today,
+        status__in=['scheduled', 'in_progress']
+    )
+
+    # Todas las métricas en una sola consulta (subconsultas escalares)
+    stats = single_row(
+        today_classes,
+        classes_today=Count('id'),
+        capacity_today=Sum('capacity'),
+        booked_today=Sum('current_participants'),
+    ).annotate(
+        bookings_today=Subquery(single_row(
+            ClassBooking.objects.filter(jumping_class__date=today, status='confirmed'),
+            total=Count('id')
+        ).values('total')),
+        active_instructors=Subquery(single_row(
+            Instructor.objects.filter(active=True), total=Count('id')
+        ).values('total')),
+        active_locations=Subquery(single_row(
+            Location.objects.filter(is_active=True), total=Count('id')
+        ).values('total')),
+    ).values(
+        'classes_today', 'capacity_today', 'booked_today', 'bookings_today',
+        'active_instructors', 'active_locations'
+    )[0]
+
+    stats['capacity_today'] = stats['capacity_today'] or 0
+    stats['booked_today'] = stats['booked_today'] or 0
+
+    stats['today_classes'] = list(
+        today_classes.select_related('instructor', 'location')[:5]
+    )
+    stats['upcoming_classes'] = list(
+        JumpingClass.objects.filter(
+            date__gte=today,
+            date__lte=today + timedelta(days=7),
+            status='scheduled'
+        ).select_related('instructor', 'location').order_by('date', 'start_time')[:5]
+    )
+    stats['recent_bookings'] = list(
+        ClassBooking.objects.select_related(
+            'client', 'jumping_class', 'created_by'
+        ).order_by('-booking_date')[:3]
+    )
+    return stats
+
+
+def get_jumping_stats(today=None):
+    """
+    Métricas de Jumping para el dashboard, calculadas con una sola consulta
+    y cacheadas hasta la siguiente escritura sobre clases, reservas,
+    instructores o ubicaciones (o DASHBOARD_CACHE_TTL).
+    """
+    today = today or timezone.now().date()
+    return cached(
+        ['jumping'], f'dashboard:jumping:{today}', settings.DASHBOARD_CACHE_TTL,
+        lambda: _compute_jumping_stats(today)
+    )
+
+
+# Estados de clase que aparecen en el horario semanal
+SCHEDULE_STATUSES = ['scheduled', 'in_progress', 'full']
+
+# Nombres de instructores y ubicaciones que muestran el horario y el calendario
+CATALOG_SCOPE = 'jumping:catalog'
+
+
+def _week_scope(start_of_week, location_id):
+    return f'schedule:{start_of_week}:{location_id or "all"}'
+
+
+def _month_scope(year, month):
+    return f'calendar:{year}-{month:02d}'
+
+
+def bump_schedule_caches(slots):
+    """
+    Invalida solo las semanas (de la ubicación y de todas) y los meses
+    cacheados en los que aparecen las clases `slots`, pares (fecha,
+    location_id). Se aplica al confirmar la transacción, para que una
+    lectura concurrente no vuelva a cachear los datos anteriores.
+    """
+    scopes = set()
+    for day, location_id in slots:
+        start_of_week = day - timedelta(days=day.weekday())
+        scopes.add(_week_scope(start_of_week, location_id))
+        scopes.add(_week_scope(start_of_week, None))
+        scopes.add(_month_scope(day.year, day.month))
+
+    def bump():
+        for scope in scopes:
+            bump_version(scope)
+
+    if scopes:
+        transaction.on_commit(bump)
+
+
+def bump_class_caches(class_ids):
+    """bump_schedule_caches para las clases indicadas (una consulta)"""
+    bump_schedule_caches(
+        JumpingClass.objects.filter(pk__in=class_ids).values_list('date', 'location_id').order_by().distinct()
+    )
+
+
+def _compute_week_schedule(start_of_week, location_id):
+    classes = JumpingClass.objects.filter(
+        date__range=[start_of_week, start_of_week + timedelta(days=6)],
+        status__in=SCHEDULE_STATUSES
+    )
+    if location_id:
+        classes = classes.filter(location_id=location_id)
+
+    # Una sola consulta: las clases de la semana y, por ventana, los totales de su día
+    day = {'partition_by': [F('date')]}
+    classes = classes.select_related('instructor', 'location').annotate(
+        day_classes=Window(Count('id'), **day),
+        day_capacity=Window(Sum('capacity'), **day),
+        day_booked=Window(Sum('current_participants'), **day),
+    ).order_by('date', 'start_time')
+
+    by_date = {}
+    for jumping_class in classes:
+        by_date.setdefault(jumping_class.date, []).append(jumping_class)
+
+    week_days = []
+    for i in range(7):
+        day_date = start_of_week + timedelta(days=i)
+        day_classes = by_date.get(day_date, [])
+        first = day_classes[0] if day_classes else None
+        week_days.append({
+            'date': day_date,
+            'day_name': day_date.strftime('%A').capitalize(),
+            'classes': day_classes,
+            'total_classes': first.day_classes if first else 0,
+            'total_capacity': first.day_capacity if first else 0,
+            'total_booked': first.day_booked if first else 0,
+        })
+    return week_days
+
+
+def get_week_schedule(start_of_week, location_id=None):
+    """
+    Horario de la semana que empieza en `start_of_week` (lunes), opcionalmente
+    de una sola ubicación: una entrada por día con sus clases y totales.
+    Se cachea por (semana, ubicación) hasta que cambia una clase de esa
+    semana (también su ocupación), un instructor o una ubicación, o
+    SCHEDULE_CACHE_TTL.
+    """
+    return cached(
+        [CATALOG_SCOPE, _week_scope(start_of_week, location_id)],
+        f'schedule:week:{start_of_week}:{location_id or "all"}',
+        settings.SCHEDULE_CACHE_TTL,
+        lambda: _compute_week_schedule(start_of_week, location_id)
+    )
+
+
+# Estados de clase que aparecen en el calendario
+CALENDAR_STATUSES = ['scheduled', 'in_progress', 'full']
+
+
+def _month_bounds(year, month):
+    first = date(year, month, 1)
+    last = date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+    return first, last
+
+
+def _compute_month_calendar(year, month):
+    first, last = _month_bounds(year, month)
+    return [
+        {
+            'id': row['id'],
+            'name': row['name'],
+            'date': row['date'].isoformat(),
+            'start': row['start_time'].strftime('%H:%M'),
+            'end': row['end_time'].strftime('%H:%M'),
+            'status': row['status'],
+            'capacity': row['capacity'],
+            'booked': row['current_participants'],
+            'instructor_id': row['instructor_id'],
+            'instructor': f"{row['instructor__first_name']} {row['instructor__last_name']}",
+            'location_id': row['location_id'],
+            'location': row['location__name'],
+        }
+        for row in JumpingClass.objects.filter(
+            date__range=[first, last],
+            status__in=CALENDAR_STATUSES
+        ).order_by('date', 'start_time').values(
+            'id', 'name', 'date', 'start_time', 'end_time', 'status', 'capacity',
+            'current_participants', 'instructor_id', 'instructor__first_name',
+            'instructor__last_name', 'location_id', 'location__name'
+        )
+    ]
+
+
+def get_month_calendar(year, month):
+    """
+    Clases del mes ya serializadas para el calendario (una sola consulta con
+    values(), sin instanciar modelos). Se cachea por mes y se recalcula
+    cuando cambia una clase de ese mes, un instructor o una ubicación.
+    """
+    return cached(
+        [CATALOG_SCOPE, _month_scope(year, month)], f'calendar:month:{year}-{month:02d}',
+        settings.SCHEDULE_CACHE_TTL,
+        lambda: _compute_month_calendar(year, month)
+    )
+
+
+def get_calendar_feed(start, end, location_id=None, instructor_id=None):
+    """Clases entre `start` y `end` (inclusive) a partir de los meses cacheados"""
+    entries = []
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        entries.extend(get_month_calendar(year, month))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+    start_iso, end_iso = start.isoformat(), end.isoformat()
+    return [
+        entry for entry in entries
+        if start_iso <= entry['date'] <= end_iso
+        and (not location_id or entry['location_id'] == location_id)
+        and (not instructor_id or entry['instructor_id'] == instructor_id)
+    ]
+
+
+def calendar_state(start, end, location_id=None, instructor_id=None):
+    """
+    (última modificación, número de clases) del rango: base del ETag y
+    Last-Modified del feed. Los UPDATE en bloque de Jumping también fijan
+    updated_at, y el conteo cambia cuando se borra una clase. El feed
+    muestra los nombres de instructor y ubicación, así que también cuenta
+    su updated_at.
+    """
+    classes = JumpingClass.objects.filter(date__range=[start, end])
+    if location_id:
+        classes = classes.filter(location_id=location_id)
+    if instructor_id:
+        classes = classes.filter(instructor_id=instructor_id)
+    state = classes.aggregate(
+        classes_modified=Max('updated_at'),
+        instructors_modified=Max('instructor__updated_at'),
+        locations_modified=Max('location__updated_at'),
+        total=Count('id'),
+    )
+    modified = [
+        state[key] for key in ('classes_modified', 'instructors_modified', 'locations_modified')
+        if state[key] is not None
+    ]
+    return max(modified, default=None), state['total']
+
+
+def booking_stats(bookings):
+    """
+    Resumen de un listado de reservas en una sola consulta agregada:
+    totales por estado, cobrado, pendiente de cobro y tasa de asistencia.
+    """
+    active = ~Q(status='cancelled')
+    stats = bookings.order_by().aggregate(
+        total_count=Count('id'),
+        confirmed_count=Count('id', filter=Q(status='confirmed')),
+        attended_count=Count('id', filter=Q(status='attended')),
+        cancelled_count=Count('id', filter=Q(status='cancelled')),
+        total_paid=Sum('amount_paid', filter=Q(payment_status=True)),
+        total_pending=Sum('jumping_class__price', filter=active & Q(payment_status=False)),
+    )
+    effective = stats['total_count'] - stats['cancelled_count']
+    stats['attendance_rate'] = stats['attended_count'] / effective * 100 if effective else 0
+    stats['total_paid'] = stats['total_paid'] or 0
+    stats['total_pending'] = stats['total_pending'] or 0
+    return stats
+
+
+class BookingError(Exception):
+    """No se pudo reservar la clase"""
+
+
+class ClassFullError(BookingError):
+    pass
+
+
+class DuplicateBookingError(BookingError):
+    pass
+
+
+class ClassNotBookableError(BookingError):
+    """La clase está cancelada, en curso o completada"""
+
+
+# Estados de clase que aceptan reservas ('full' puede tener lugares tras una cancelación)
+BOOKABLE_STATUSES = ['scheduled', 'full']
+
+
+def reserve_seat(class_id):
+    """
+    Ocupa un lugar con un único UPDATE condicional:
+    current_participants = current_participants + 1 solo si aún hay cupo.
+    La fila queda bloqueada hasta el final de la transacción, así que dos
+    recepciones no pueden llevarse el último lugar a la vez.
+    Devuelve True si se obtuvo el lugar.
+    """
+    reserved = JumpingClass.objects.filter(
+        pk=class_id,
+        status__in=BOOKABLE_STATUSES,
+        current_participants__lt=F('capacity')
+    ).update(
+        current_participants=F('current_participants') + 1,
+        status=Case(
+            When(current_participants__gte=F('capacity') - 1, then=Value('full')),
+            default=F('status')
+        ),
+        updated_at=timezone.now()
+    ) == 1
+    if reserved:
+        bump_class_caches([class_id])
+    return reserved
+
+
+def release_seat(class_id):
+    """Libera un lugar (nunca por debajo de cero) y reabre la clase si estaba llena"""
+    released = JumpingClass.objects.filter(
+        pk=class_id,
+        current_participants__gt=0
+    ).update(
+        current_participants=F('current_participants') - 1,
+        status=Case(
+            When(status='full', then=Value('scheduled')),
+            default=F('status')
+        ),
+        updated_at=timezone.now()
+    ) == 1
+    if released:
+        bump_class_caches([class_id])
+    return released
+
+
+def release_seats(seats_by_class):
+    """
+    Libera en bloque {class_id: lugares} (p. ej. reservas borradas en crudo,
+    sin señales), nunca por debajo de cero, y reabre las clases llenas que
+    queden con cupo. Un UPDATE por cada cantidad distinta de lugares.
+    Devuelve las clases actualizadas.
+    """
+    class_ids_by_seats = {}
+    for class_id, seats in seats_by_class.items():
+        if seats:
+            class_ids_by_seats.setdefault(seats, []).append(class_id)
+
+    updated = 0
+    for seats, class_ids in class_ids_by_seats.items():
+        updated += JumpingClass.objects.filter(pk__in=class_ids).update(
+            current_participants=Greatest(F('current_participants') - seats, 0),
+            status=Case(
+                When(status='full', current_participants__lt=F('capacity') + seats, then=Value('scheduled')),
+                default=F('status')
+            ),
+            updated_at=timezone.now()
+        )
+
+    if updated:
+        bump_version('jumping')
+        bump_class_caches(list(seats_by_class))
+    return updated
+
+
+def occupy_seat(class_id):
+    """
+    Suma un lugar sin comprobar cupo, para reservas que ya existen (p. ej.
+    guardadas desde el admin); marca la clase llena si la completa.
+    """
+    occupied = JumpingClass.objects.filter(pk=class_id).update(
+        current_participants=F('current_participants') + 1,
+        status=Case(
+            When(status='scheduled', current_participants__gte=F('capacity') - 1, then=Value('full')),
+            default=F('status')
+        ),
+        updated_at=timezone.now()
+    ) == 1
+    if occupied:
+        bump_class_caches([class_id])
+    return occupied
+
+
+def sync_full_status(class_ids):
+    """
+    Recalcula llena/programada tras cambiar el cupo de las clases, con un
+    UPDATE condicional sobre la ocupación actual (no la leída al editar).
+    Devuelve las clases que cambiaron de estado.
+    """
+    updated = JumpingClass.objects.filter(
+        Q(status='scheduled', current_participants__gte=F('capacity')) |
+        Q(status='full', current_participants__lt=F('capacity')),
+        pk__in=class_ids
+    ).update(
+        status=Case(
+            When(status='scheduled', then=Value('full')),
+            default=Value('scheduled')
+        ),
+        updated_at=timezone.now()
+    )
+    if updated:
+        bump_class_caches(class_ids)
+    return updated
+
+
+def reconcile_occupancy(from_date=None):
+    """
+    Recalcula la ocupación de las clases desde `from_date` (hoy por defecto)
+    con una consulta agrupada y corrige en bloque las que derivaron, junto
+    con su estado llena/programada. Las clases se bloquean mientras se
+    recuenta para no pisar reservas concurrentes.
+    Devuelve {class_id: (guardado, real)}.
+    """
+    from_date = from_date or timezone.localdate()
+    classes = JumpingClass.objects.filter(date__gte=from_date)
+
+    with transaction.atomic():
+        # FOR UPDATE no admite GROUP BY: primero se bloquea, luego se cuenta
+        list(classes.select_for_update().values_list('id', flat=True))
+        drifted = list(
+            classes.annotate(
+                actual=Count('bookings', filter=~Q(bookings__status='cancelled'))
+            ).exclude(
+                current_participants=F('actual')
+            ).only('id', 'date', 'location_id', 'status', 'capacity', 'current_participants')
+        )
+
+        drift = {}
+        now = timezone.now()
+        for jumping_class in drifted:
+            drift[jumping_class.pk] = (jumping_class.current_participants, jumping_class.actual)
+            jumping_class.current_participants = jumping_class.actual
+            if jumping_class.status == 'scheduled' and jumping_class.actual >= jumping_class.capacity:
+                jumping_class.status = 'full'
+            elif jumping_class.status == 'full' and jumping_class.actual < jumping_class.capacity:
+                jumping_class.status = 'scheduled'
+            jumping_class.updated_at = now
+
+        JumpingClass.objects.bulk_update(
+            drifted, ['current_participants', 'status', 'updated_at'], batch_size=500
+        )
+        bump_schedule_caches((c.date, c.location_id) for c in drifted)
+
+        # Las clases que tenían lugares de más contados ahora pueden atender su lista de espera
+        promote_waitlists([class_id for class_id, (stored, actual) in drift.items() if actual < stored])
+
+    if drift:
+        bump_version('jumping')
+        logger.warning(f'Ocupación de clases corregida: {drift}')
+    return drift
+
+
+def book_class(jumping_class, client, created_by=None, **fields):
+    """
+    Reserva `jumping_class` para `client` de forma atómica.
+
+    Lanza ClassFullError si no queda cupo, ClassNotBookableError si la clase
+    ya no acepta reservas y DuplicateBookingError si el cliente ya tiene
+    reserva (lo detecta el índice único, no una consulta previa). Una
+    reserva cancelada del mismo cliente se reactiva.
+    `fields` son los datos extra de la reserva (pago, notas).
+    """
+    with transaction.atomic():
+        if not reserve_seat(jumping_class.pk):
+            if not JumpingClass.objects.filter(pk=jumping_class.pk, status__in=BOOKABLE_STATUSES).exists():
+                raise ClassNotBookableError(f'La clase {jumping_class} ya no acepta reservas')
+            raise ClassFullError(f'La clase {jumping_class} está completa')
+
+        # Reactivar una reserva cancelada en lugar de chocar con el índice único
+        reactivated = ClassBooking.objects.filter(
+            client=client,
+            jumping_class=jumping_class,
+            status='cancelled'
+        ).update(status='confirmed', created_by=created_by, **fields)
+        if reactivated:
+            booking = ClassBooking.objects.get(client=client, jumping_class=jumping_class)
+        else:
+            booking = ClassBooking(
+                client=client,
+                jumping_class=jumping_class,
+                created_by=created_by,
+                **fields
+            )
+            # El lugar ya se tomó con reserve_seat: la señal no debe volver a contarlo
+            booking._occupied_class_id = jumping_class.pk
+            try:
+                with transaction.atomic():
+                    booking.save(force_insert=True)
+            except IntegrityError:
+                # Al salir la excepción se revierte también el lugar reservado
+                raise DuplicateBookingError(
+                    f'{client} ya tiene reserva para esta clase'
+                )
+
+    bump_version('jumping')
+    return booking
+
+
+PROMOTION_MESSAGE = (
+    "Hola {first_name}, se liberó un lugar en la clase {class_name} del "
+    "{date:%d/%m} a las {start_time:%H:%M}. Tu reserva quedó confirmada."
+)
+
+
+def join_waitlist(jumping_class, client, created_by=None, **fields):
+    """
+    Agrega al cliente al final de la lista de espera de la clase.
+
+    La fila de la clase se bloquea para que dos altas simultáneas no reciban
+    la misma posición. Con el bloqueo tomado se vuelve a intentar la reserva:
+    si entre tanto se liberó un lugar, el cliente lo ocupa y se devuelve la
+    ClassBooking en lugar de la WaitlistEntry (`fields` son los datos extra
+    de esa reserva). Lanza ClassNotBookableError si la clase ya no acepta
+    reservas y DuplicateBookingError si el cliente ya tiene reserva
+    confirmada o ya está esperando.
+    """
+    with transaction.atomic():
+        status = JumpingClass.objects.select_for_update().filter(
+            pk=jumping_class.pk
+        ).values_list('status', flat=True).first()
+        if status not in BOOKABLE_STATUSES:
+            raise ClassNotBookableError(f'La clase {jumping_class} ya no acepta reservas')
+
+        if ClassBooking.objects.filter(
+            client=client, jumping_class=jumping_class
+        ).exclude(status='cancelled').exists():
+            raise DuplicateBookingError(f'{client} ya tiene reserva para esta clase')
+
+        try:
+            return book_class(jumping_class, client, created_by=created_by, **fields)
+        except ClassFullError:
+            pass
+
+        last_position = WaitlistEntry.objects.filter(
+            jumping_class=jumping_class
+        ).aggregate(last=Max('position'))['last'] or 0
+
+        try:
+            with transaction.atomic():
+                return WaitlistEntry.objects.create(
+                    jumping_class=jumping_class,
+                    client=client,
+                    position=last_position + 1,
+                    created_by=created_by
+                )
+        except IntegrityError:
+            raise DuplicateBookingError(f'{client} ya está en la lista de espera')
+
+
+def promote_from_waitlist(class_id):
+    """
+    Asigna los lugares libres de la clase a los primeros de la lista de
+    espera (FIFO). Cada lugar se toma con reserve_seat, así que nunca se
+    promueve a más clientes que lugares. Debe llamarse dentro de la misma
+    transacción que liberó el lugar; el aviso por SMS se envía de forma
+    asíncrona al confirmar. Devuelve las reservas creadas.
+    """
+    promoted = []
+    with transaction.atomic():
+        # Solo se bloquean las entradas: un cliente o una clase bloqueados por
+        # otra transacción no deben saltarse a nadie en la fila
+        entries = WaitlistEntry.objects.select_for_update(skip_locked=True, of=('self',)).filter(
+            jumping_class_id=class_id,
+            status='waiting'
+        ).select_related('client', 'jumping_class').order_by('position')
+
+        for entry in entries:
+            try:
+                booking = book_class(entry.jumping_class, entry.client, created_by=entry.created_by)
+            except (ClassFullError, ClassNotBookableError):
+                break
+            except DuplicateBookingError:
+                # Ya reservó por otra vía: se descarta su lugar en la lista
+                entry.status = 'cancelled'
+                entry.save(update_fields=['status'])
+                continue
+
+            entry.status = 'promoted'
+            entry.booking = booking
+            entry.promoted_at = timezone.now()
+            entry.save(update_fields=['status', 'booking', 'promoted_at'])
+            promoted.append(entry)
+
+        if promoted:
+            notification_ids = queue_notifications([
+                (entry.client_id, PROMOTION_MESSAGE.format(
+                    first_name=entry.client.first_name,
+                    class_name=entry.jumping_class.name,
+                    date=entry.jumping_class.date,
+                    start_time=entry.jumping_class.start_time,
+                ))
+                for entry in promoted
+            ])
+            enqueue_delivery(notification_ids)
+
+    return [entry.booking for entry in promoted]
+
+
+def promote_waitlists(class_ids):
+    """
+    promote_from_waitlist para las clases indicadas que tienen a alguien
+    esperando (una consulta descarta el resto). Se llama, en la misma
+    transacción, tras cualquier escritura que libere lugares o aumente el
+    cupo. Devuelve las reservas creadas.
+    """
+    waiting_class_ids = WaitlistEntry.objects.filter(
+        jumping_class_id__in=class_ids,
+        status='waiting'
+    ).values_list('jumping_class_id', flat=True).order_by('jumping_class_id').distinct()
+
+    promoted = []
+    for class_id in waiting_class_ids:
+        promoted += promote_from_waitlist(class_id)
+    return promoted
+
+
+def leave_waitlist(entry):
+    """Saca al cliente de la lista de espera"""
+    return WaitlistEntry.objects.filter(pk=entry.pk, status='waiting').update(status='cancelled') == 1
+
+
+CANCELLATION_MESSAGE = (
+    "Hola {first_name}, la clase {class_name} del {date:%d/%m} a las "
+    "{start_time:%H:%M} fue cancelada. Disculpa las molestias."
+)
+
+SERIES_CANCELLATION_MESSAGE = (
+    "Hola {first_name}, se cancelaron {count} clases de {class_name} a partir "
+    "del {date:%d/%m}. Disculpa las molestias."
+)
+
+
+def _cancellation_messages(bookings):
+    """Un mensaje por cliente aunque pierda varias clases (p. ej. una serie)"""
+    client_messages = []
+    for client_id, rows in groupby(bookings, key=itemgetter('client_id')):
+        rows = list(rows)
+        first = rows[0]
+        template = CANCELLATION_MESSAGE if len(rows) == 1 else SERIES_CANCELLATION_MESSAGE
+        client_messages.append((client_id, template.format(
+            first_name=first['client__first_name'],
+            class_name=first['jumping_class__name'],
+            date=first['jumping_class__date'],
+            start_time=first['jumping_class__start_time'],
+            count=len(rows),
+        )))
+    return client_messages
+
+
+def cancel_classes(class_ids):
+    """
+    Cancela las clases indicadas junto con sus reservas confirmadas y su
+    lista de espera: un UPDATE por tabla, el cupo vuelve a 0 en la misma
+    transacción y los avisos se registran en bloque. El envío de los SMS
+    queda para el worker tras confirmar, así que la llamada no espera a
+    Twilio. Devuelve (clases canceladas, reservas canceladas).
+    """
+    with transaction.atomic():
+        class_ids = list(
+            JumpingClass.objects.select_for_update().filter(
+                id__in=class_ids
+            ).exclude(status='cancelled').values_list('id', flat=True)
+        )
+        if not class_ids:
+            return 0, 0
+
+        bookings = list(
+            ClassBooking.objects.select_for_update(of=('self',)).filter(
+                jumping_class_id__in=class_ids,
+                status='confirmed'
+            ).values(
+                'id', 'client_id', 'client__first_name', 'jumping_class__name',
+                'jumping_class__date', 'jumping_class__start_time'
+            ).order_by('client_id', 'jumping_class__date', 'jumping_class__start_time')
+        )
+
+        cancelled_bookings = ClassBooking.objects.filter(
+            id__in=[booking['id'] for booking in bookings]
+        ).update(status='cancelled')
+        WaitlistEntry.objects.filter(
+            jumping_class_id__in=class_ids,
+            status='waiting'
+        ).update(status='cancelled')
+        cancelled_classes = JumpingClass.objects.filter(id__in=class_ids).update(
+            status='cancelled',
+            current_participants=0,
+            updated_at=timezone.now()
+        )
+        bump_class_caches(class_ids)
+
+        notification_ids = queue_notifications(_cancellation_messages(bookings))
+        enqueue_delivery(notification_ids)
+
+    bump_version('jumping')
+    logger.info(
+        f'Clases canceladas: {cancelled_classes}, reservas canceladas: {cancelled_bookings}, '
+        f'avisos en cola: {len(notification_ids)}'
+    )
+    return cancelled_classes, cancelled_bookings
+
+
+# Reservas a las que se puede registrar llegada ('no_show' por si llegó tarde)
+CHECK_IN_STATUSES = ['confirmed', 'no_show']
+
+
+def check_in_bookings(class_id, booking_ids, now=None):
+    """
+    Registra la llegada de varias reservas de la clase en un único UPDATE.
+    Las canceladas y las ya registradas no se tocan, así que repetir la
+    petición no cambia la hora de llegada. Devuelve las reservas marcadas.
+    """
+    now = now or timezone.now()
+    checked_in = ClassBooking.objects.filter(
+        jumping_class_id=class_id,
+        pk__in=booking_ids,
+        status__in=CHECK_IN_STATUSES
+    ).update(status='attended', attended=True, check_in_time=now)
+
+    if checked_in:
+        bump_version('jumping')
+    return checked_in
+
+
+def mark_no_shows(now=None):
+    """
+    Marca 'no_show' en bloque las reservas confirmadas sin llegada de las
+    clases ya terminadas (un único UPDATE). Devuelve las reservas marcadas.
+    """
+    now = now or timezone.localtime()
+    today, current_time = now.date(), now.time()
+
+    marked = ClassBooking.objects.filter(
+        Q(jumping_class__date__lt=today) |
+        Q(jumping_class__date=today, jumping_class__end_time__lte=current_time),
+        status='confirmed'
+    ).exclude(jumping_class__status='cancelled').update(status='no_show')
+
+    if marked:
+        bump_version('jumping')
+    logger.info(f'Reservas marcadas como no asistidas: {marked}')
+    return marked
+
+
+def class_status_transitions(now):
+    """
+    Transiciones automáticas de estado de clase para el instante `now`
+    (hora local): (estados origen, estado destino, condición). Se aplican en
+    orden y cada una es un único UPDATE condicional sobre el índice (date, status).
+    """
+    today, current_time = now.date(), now.time()
+    return [
+        (
+            ['scheduled', 'full', 'in_progress'], 'completed',
+            Q(date__lt=today) | Q(date=today, end_time__lte=current_time)
+        ),
+        (
+            ['scheduled', 'full'], 'in_progress',
+            Q(date=today, start_time__lte=current_time, end_time__gt=current_time)
+        ),
+        (
+            ['scheduled'], 'full',
+            Q(date__gte=today, current_participants__gte=F('capacity'))
+        ),
+        (
+            ['full'], 'scheduled',
+            Q(date__gte=today, current_participants__lt=F('capacity'))
+        ),
+    ]
+
+
+def apply_class_status_transitions(now=None):
+    """
+    Avanza en bloque el estado de todas las clases según la hora:
+    programada/llena -> en curso -> completada, y llena <-> programada
+    según el cupo. Las clases canceladas no se tocan.
+    Devuelve un diccionario {'origen->destino': filas}.
+    """
+    now = now or timezone.localtime()
+    counts = {}
+
+    with transaction.atomic():
+        for source_statuses, target_status, condition in class_status_transitions(now):
+            # Se leen antes las clases afectadas para invalidar solo sus semanas y meses
+            matching = JumpingClass.objects.filter(condition, status__in=source_statuses)
+            slots = list(matching.values_list('id', 'date', 'location_id'))
+            updated = matching.filter(
+                id__in=[class_id for class_id, _, _ in slots]
+            ).update(status=target_status, updated_at=timezone.now())
+            counts[f'{"/".join(source_statuses)}->{target_status}'] = updated
+            bump_schedule_caches((day, location_id) for _, day, location_id in slots)
+
+    if any(counts.values()):
+        bump_version('jumping')
+    logger.info(f'Transiciones de estado de clases aplicadas: {counts}')
+    return counts
@@ -0,0 +1,68 @@
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from gym.cache import bump_version
+from .models import JumpingClass, ClassBooking, Instructor, Location
+from clients.models import Client
+from .services import CATALOG_SCOPE, bump_schedule_caches, occupy_seat, promote_from_waitlist, release_seat
+
+
+@receiver([post_save, post_delete], sender=JumpingClass)
+@receiver([post_save, post_delete], sender=ClassBooking)
+@receiver([post_save, post_delete], sender=Instructor)
+@receiver([post_save, post_delete], sender=Location)
+def invalidate_jumping_cache(sender, **kwargs):
+    """Cualquier escritura en Jumping invalida las métricas cacheadas"""
+    bump_version('jumping')
+
+
+@receiver([post_save, post_delete], sender=JumpingClass)
+def invalidate_class_schedule(sender, instance, **kwargs):
+    """Semanas y meses donde está (y estaba) la clase"""
+    slots = {(instance.date, instance.location_id)}
+    if hasattr(instance, '_schedule_slot'):
+        slots.add(instance._schedule_slot)
+    bump_schedule_caches(slots)
+    instance._schedule_slot = (instance.date, instance.location_id)
+
+
+@receiver([post_save, post_delete], sender=Instructor)
+@receiver([post_save, post_delete], sender=Location)
+def invalidate_schedule_catalog(sender, **kwargs):
+    """Los nombres de instructores y ubicaciones aparecen en todo el horario"""
+    transaction.on_commit(lambda: bump_version(CATALOG_SCOPE))
+
+
+@receiver(post_save, sender=ClassBooking)
+def update_class_occupancy(sender, instance, created, raw=False, **kwargs):
+    """Mueve el lugar ocupado si la reserva cambió de estado o de clase"""
+    if raw:
+        return
+    if created:
+        old_class_id = getattr(instance, '_occupied_class_id', None)
+    elif hasattr(instance, '_occupied_class_id'):
+        old_class_id = instance._occupied_class_id
+    else:
+        # Estado previo desconocido: lo corregirá la reconciliación
+        return
+
+    new_class_id = instance.occupied_class_id
+    if old_class_id != new_class_id:
+        if old_class_id and release_seat(old_class_id):
+            promote_from_waitlist(old_class_id)
+        if new_class_id:
+            occupy_seat(new_class_id)
+    instance._occupied_class_id = new_class_id
+
+
+@receiver(post_delete, sender=ClassBooking)
+def release_class_occupancy(sender, instance, origin=None, **kwargs):
+    class_id = getattr(instance, '_occupied_class_id', instance.occupied_class_id)
+    if class_id and release_seat(class_id):
+        # Solo si se borra la reserva o su cliente: cuando se borra la clase
+        # (o su instructor o ubicación) no hay a quién darle el lugar
+        origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+        if origin_model in (ClassBooking, Client):
+            promote_from_waitlist(class_id)
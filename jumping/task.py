@@ -0,0 +1,61 @@
+from celery import shared_task
+from django.conf import settings
+import logging
+
+from .reports import rollup_closed_days
+from .services import apply_class_status_transitions, mark_no_shows, reconcile_occupancy
+
+logger = logging.getLogger(__name__)
+
+@shared_task
+def update_class_status_task():
+    """Actualizar el estado de las clases según la hora (en curso, completada, llena)"""
+    try:
+        counts = apply_class_status_transitions()
+        updated_count = sum(counts.values())
+        
+        logger.info(f'Tarea update_class_status: {updated_count} clases actualizadas {counts}')
+        return f'{updated_count} clases actualizadas'
+        
+    except Exception as e:
+        logger.error(f'Error en update_class_status_task: {e}')
+        return f'Error: {e}'
+
+@shared_task
+def rollup_daily_class_stats_task():
+    """Resumir las métricas diarias de clases para los reportes"""
+    try:
+        rows = rollup_closed_days(settings.REPORT_ROLLUP_LOOKBACK_DAYS)
+        
+        logger.info(f'Tarea rollup_daily_class_stats: {rows} filas de resumen')
+        return f'{rows} filas de resumen'
+        
+    except Exception as e:
+        logger.error(f'Error en rollup_daily_class_stats_task: {e}')
+        return f'Error: {e}'
+
+@shared_task
+def mark_no_shows_task():
+    """Marcar como no asistidas las reservas confirmadas de clases terminadas"""
+    try:
+        marked = mark_no_shows()
+        
+        logger.info(f'Tarea mark_no_shows: {marked} reservas sin asistencia')
+        return f'{marked} reservas marcadas como no asistidas'
+        
+    except Exception as e:
+        logger.error(f'Error en mark_no_shows_task: {e}')
+        return f'Error: {e}'
+
+@shared_task
+def reconcile_occupancy_task():
+    """Corregir la deriva de la ocupación de las clases futuras"""
+    try:
+        drift = reconcile_occupancy()
+        
+        logger.info(f'Tarea reconcile_occupancy: {len(drift)} clases corregidas')
+        return f'{len(drift)} clases corregidas'
+        
+    except Exception as e:
+        logger.error(f'Error en reconcile_occupancy_task: {e}')
+        return f'Error: {e}'
@@ -1,3 +1,667 @@
+import uuid
+from datetime import date, time, timedelta
+from unittest import mock
+
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from clients.models import Client
+from clients.purge import purge_chunk, purge_queryset
+from notifications.models import SMSNotification
+from users.models import User
+from .models import ClassBooking, Instructor, JumpingClass, Location, WaitlistEntry
+from .recurrence import (
+    ScheduleConflictError, SeriesCapacityError, create_series, expand_dates, update_series
+)
+from .reports import class_report, rollup_closed_days, rollup_watermark
+from .services import (
+    ClassFullError, ClassNotBookableError, DuplicateBookingError, book_class, cancel_classes,
+    check_in_bookings, join_waitlist, mark_no_shows, reconcile_occupancy, release_seat, release_seats,
+    reserve_seat
+)
+
+
+class JumpingTestCase(TestCase):
+    """Instructor, ubicación y clientes comunes a las pruebas de reservas"""
+
+    def setUp(self):
+        self.instructor = Instructor.objects.create(first_name='Ana', last_name='López', phone='5550000000')
+        self.location = Location.objects.create(name='Centro', address='Calle 1', phone='5550000001')
+        self.clients = [
+            Client.objects.create(first_name=f'Cliente{i}', last_name='Prueba', phone=f'55512345{i:02d}')
+            for i in range(5)
+        ]
+        self.tomorrow = timezone.localdate() + timedelta(days=1)
+
+    def create_class(self, capacity=2, **fields):
+        values = {
+            'name': 'Jumping',
+            'instructor': self.instructor,
+            'location': self.location,
+            'date': self.tomorrow,
+            'start_time': time(8, 0),
+            'end_time': time(9, 0),
+            'capacity': capacity,
+        }
+        values.update(fields)
+        return JumpingClass.objects.create(**values)
+
+    def login(self):
+        user = User.objects.create_user(username='recepcion', password='secreto', role='recep')
+        self.client.force_login(user)
+        return user
+
+    def edit_data(self, jumping_class, **changes):
+        """Datos del formulario de edición de la clase con `changes` aplicados"""
+        data = {
+            'name': jumping_class.name,
+            'description': jumping_class.description,
+            'instructor': jumping_class.instructor_id,
+            'location': jumping_class.location_id,
+            'date': jumping_class.date.isoformat(),
+            'start_time': jumping_class.start_time.strftime('%H:%M'),
+            'end_time': jumping_class.end_time.strftime('%H:%M'),
+            'duration': jumping_class.duration,
+            'capacity': jumping_class.capacity,
+            'difficulty': jumping_class.difficulty,
+            'price': jumping_class.price,
+            'requires_equipment': 'on',
+            'equipment_available': jumping_class.equipment_available,
+        }
+        data.update(changes)
+        return data
+
+    def assertOccupancy(self, jumping_class, participants, status):
+        jumping_class.refresh_from_db()
+        self.assertEqual(jumping_class.current_participants, participants)
+        self.assertEqual(jumping_class.status, status)
+
+
+class SeatTests(JumpingTestCase):
+
+    def test_reserve_seat_never_exceeds_capacity(self):
+        jumping_class = self.create_class(capacity=2)
+
+        self.assertTrue(reserve_seat(jumping_class.pk))
+        self.assertTrue(reserve_seat(jumping_class.pk))
+        self.assertFalse(reserve_seat(jumping_class.pk))
+        self.assertOccupancy(jumping_class, 2, 'full')
+
+    def test_reserve_seat_rejects_closed_classes(self):
+        jumping_class = self.create_class(status='completed')
+
+        self.assertFalse(reserve_seat(jumping_class.pk))
+        self.assertOccupancy(jumping_class, 0, 'completed')
+
+    def test_release_seat_reopens_full_class_and_stops_at_zero(self):
+        jumping_class = self.create_class(capacity=1)
+        reserve_seat(jumping_class.pk)
+
+        self.assertTrue(release_seat(jumping_class.pk))
+        self.assertOccupancy(jumping_class, 0, 'scheduled')
+        self.assertFalse(release_seat(jumping_class.pk))
+        self.assertOccupancy(jumping_class, 0, 'scheduled')
+
+    def test_release_seats_in_bulk(self):
+        first = self.create_class(capacity=2)
+        second = self.create_class(capacity=3, start_time=time(10, 0), end_time=time(11, 0))
+        for client in self.clients[:2]:
+            book_class(first, client)
+        for client in self.clients[:3]:
+            book_class(second, client)
+
+        release_seats({first.pk: 1, second.pk: 5})
+
+        self.assertOccupancy(first, 1, 'scheduled')
+        self.assertOccupancy(second, 0, 'scheduled')
+
+
+class BookClassTests(JumpingTestCase):
+
+    def test_duplicate_booking_does_not_consume_a_seat(self):
+        jumping_class = self.create_class(capacity=3)
+        book_class(jumping_class, self.clients[0])
+
+        with self.assertRaises(DuplicateBookingError):
+            book_class(jumping_class, self.clients[0])
+        self.assertOccupancy(jumping_class, 1, 'scheduled')
+
+    def test_cancelled_booking_is_reactivated(self):
+        jumping_class = self.create_class(capacity=3)
+        booking = book_class(jumping_class, self.clients[0])
+        booking.cancel_booking()
+        self.assertOccupancy(jumping_class, 0, 'scheduled')
+
+        reactivated = book_class(jumping_class, self.clients[0], notes='Regresa')
+
+        self.assertEqual(reactivated.pk, booking.pk)
+        self.assertEqual(reactivated.status, 'confirmed')
+        self.assertEqual(reactivated.notes, 'Regresa')
+        self.assertOccupancy(jumping_class, 1, 'scheduled')
+
+    def test_full_and_closed_classes_raise_different_errors(self):
+        full_class = self.create_class(capacity=1)
+        book_class(full_class, self.clients[0])
+        closed_class = self.create_class(status='cancelled', start_time=time(10, 0), end_time=time(11, 0))
+
+        with self.assertRaises(ClassFullError):
+            book_class(full_class, self.clients[1])
+        with self.assertRaises(ClassNotBookableError):
+            book_class(closed_class, self.clients[1])
+
+
+class WaitlistTests(JumpingTestCase):
+
+    def test_cancellation_promotes_first_in_line(self):
+        jumping_class = self.create_class(capacity=1)
+        booking = book_class(jumping_class, self.clients[0])
+        first = join_waitlist(jumping_class, self.clients[1])
+        second = join_waitlist(jumping_class, self.clients[2])
+        self.assertEqual((first.position, second.position), (1, 2))
+
+        booking.cancel_booking()
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.status, 'promoted')
+        self.assertEqual(first.booking.client, self.clients[1])
+        self.assertEqual(second.status, 'waiting')
+        self.assertOccupancy(jumping_class, 1, 'full')
+        self.assertEqual(SMSNotification.objects.filter(client=self.clients[1]).count(), 1)
+
+    def test_join_waitlist_takes_a_freed_seat(self):
+        jumping_class = self.create_class(capacity=1)
+
+        result = join_waitlist(jumping_class, self.clients[0], notes='Directo')
+
+        self.assertIsInstance(result, ClassBooking)
+        self.assertEqual(result.notes, 'Directo')
+        self.assertFalse(WaitlistEntry.objects.exists())
+        self.assertOccupancy(jumping_class, 1, 'full')
+
+    def test_join_waitlist_rejects_closed_class_and_duplicates(self):
+        jumping_class = self.create_class(capacity=1)
+        book_class(jumping_class, self.clients[0])
+
+        with self.assertRaises(DuplicateBookingError):
+            join_waitlist(jumping_class, self.clients[0])
+
+        JumpingClass.objects.filter(pk=jumping_class.pk).update(status='completed')
+        with self.assertRaises(ClassNotBookableError):
+            join_waitlist(jumping_class, self.clients[1])
+        self.assertFalse(WaitlistEntry.objects.exists())
+
+
+class PromotionPathTests(JumpingTestCase):
+    """Todo lo que libera lugares o aumenta el cupo atiende la lista de espera"""
+
+    def setUp(self):
+        super().setUp()
+        self.jumping_class = self.create_class(capacity=1)
+        self.booking = book_class(self.jumping_class, self.clients[0])
+        self.entry = join_waitlist(self.jumping_class, self.clients[1])
+
+    def assertPromoted(self, participants=1, status='full'):
+        self.entry.refresh_from_db()
+        self.assertEqual(self.entry.status, 'promoted')
+        self.assertEqual(self.entry.booking.client, self.clients[1])
+        self.assertOccupancy(self.jumping_class, participants, status)
+
+    def test_deleting_booking(self):
+        ClassBooking.objects.get(pk=self.booking.pk).delete()
+
+        self.assertPromoted()
+
+    def test_cancelling_with_a_plain_save(self):
+        booking = ClassBooking.objects.get(pk=self.booking.pk)
+        booking.status = 'cancelled'
+        booking.save()
+
+        self.assertPromoted()
+
+    def test_deleting_the_client(self):
+        self.clients[0].delete()
+
+        self.assertPromoted()
+
+    def test_deleting_the_class_promotes_no_one(self):
+        self.jumping_class.delete()
+
+        self.assertFalse(ClassBooking.objects.exists())
+        self.assertFalse(WaitlistEntry.objects.exists())
+
+    def test_purge(self):
+        Client.objects.filter(pk=self.clients[0].pk).update(
+            is_deleted=True, deleted_at=timezone.now() - timedelta(days=60)
+        )
+
+        self.assertEqual(purge_chunk([self.clients[0].pk], purge_queryset()), 1)
+
+        self.assertPromoted()
+
+    def test_reconcile_lowering_the_counter(self):
+        ClassBooking.objects.filter(pk=self.booking.pk).update(status='cancelled')
+
+        reconcile_occupancy()
+
+        self.assertPromoted()
+
+    def test_capacity_edit(self):
+        self.login()
+
+        self.client.post(
+            reverse('jumping:class_edit', args=[self.jumping_class.pk]),
+            self.edit_data(self.jumping_class, capacity=2)
+        )
+
+        self.assertPromoted(participants=2)
+
+    def test_series_capacity_change(self):
+        series_id = uuid.uuid4()
+        JumpingClass.objects.filter(pk=self.jumping_class.pk).update(series_id=series_id)
+
+        update_series(series_id, {'capacity': 3})
+
+        self.assertPromoted(participants=2, status='scheduled')
+
+
+class CancelClassesTests(JumpingTestCase):
+
+    def test_cancels_bookings_waitlist_and_resets_occupancy(self):
+        jumping_class = self.create_class(capacity=2)
+        for client in self.clients[:2]:
+            book_class(jumping_class, client)
+        join_waitlist(jumping_class, self.clients[2])
+
+        classes, bookings = cancel_classes([jumping_class.pk])
+
+        self.assertEqual((classes, bookings), (1, 2))
+        self.assertOccupancy(jumping_class, 0, 'cancelled')
+        self.assertFalse(ClassBooking.objects.filter(status='confirmed').exists())
+        self.assertFalse(WaitlistEntry.objects.filter(status='waiting').exists())
+        self.assertEqual(SMSNotification.objects.filter(status='queued').count(), 2)
+
+        # Repetir no vuelve a notificar
+        self.assertEqual(cancel_classes([jumping_class.pk]), (0, 0))
+        self.assertEqual(SMSNotification.objects.count(), 2)
+
+    def test_one_message_per_client_for_several_classes(self):
+        classes = [
+            self.create_class(start_time=time(8 + i, 0), end_time=time(9 + i, 0))
+            for i in range(3)
+        ]
+        for jumping_class in classes:
+            book_class(jumping_class, self.clients[0])
+
+        cancel_classes([jumping_class.pk for jumping_class in classes])
+
+        notification = SMSNotification.objects.get()
+        self.assertIn('3 clases', notification.message)
+
+    def test_other_classes_are_untouched_and_delivery_is_enqueued(self):
+        cancelled = self.create_class(capacity=3)
+        kept = self.create_class(capacity=3, start_time=time(10, 0), end_time=time(11, 0))
+        for client in self.clients[:2]:
+            book_class(cancelled, client)
+        kept_booking = book_class(kept, self.clients[0])
+
+        with mock.patch('jumping.services.enqueue_delivery') as enqueue_delivery:
+            cancel_classes([cancelled.pk])
+
+        notification_ids = enqueue_delivery.call_args.args[0]
+        self.assertEqual(
+            sorted(SMSNotification.objects.filter(id__in=notification_ids).values_list('client_id', flat=True)),
+            [self.clients[0].pk, self.clients[1].pk]
+        )
+        kept_booking.refresh_from_db()
+        self.assertEqual(kept_booking.status, 'confirmed')
+        self.assertOccupancy(kept, 1, 'scheduled')
+
+    def test_cancel_series_from_a_date(self):
+        base = self.create_class(
+            recurring=True,
+            recurring_days=[str(day) for day in range(7)],
+            recurring_until=self.tomorrow + timedelta(days=3),
+        )
+        create_series(base)
+        occurrences = list(JumpingClass.objects.filter(series_id=base.series_id).order_by('date'))
+        for jumping_class in occurrences:
+            book_class(jumping_class, self.clients[0])
+        self.login()
+
+        self.client.post(reverse('jumping:class_cancel', args=[occurrences[1].pk]), {'scope': 'series'})
+
+        self.assertEqual(
+            [c.status for c in JumpingClass.objects.filter(series_id=base.series_id).order_by('date')],
+            ['scheduled', 'cancelled', 'cancelled', 'cancelled']
+        )
+        notification = SMSNotification.objects.get()
+        self.assertIn('3 clases', notification.message)
+
+
+class OccupancySignalTests(JumpingTestCase):
+
+    def test_book_class_is_not_counted_twice(self):
+        jumping_class = self.create_class(capacity=3)
+        book_class(jumping_class, self.clients[0])
+
+        self.assertOccupancy(jumping_class, 1, 'scheduled')
+
+    def test_delete_releases_seat(self):
+        jumping_class = self.create_class(capacity=1)
+        booking = book_class(jumping_class, self.clients[0])
+
+        ClassBooking.objects.get(pk=booking.pk).delete()
+
+        self.assertOccupancy(jumping_class, 0, 'scheduled')
+
+    def test_queryset_delete_releases_seats(self):
+        jumping_class = self.create_class(capacity=2)
+        for client in self.clients[:2]:
+            book_class(jumping_class, client)
+
+        ClassBooking.objects.filter(jumping_class=jumping_class).delete()
+
+        self.assertOccupancy(jumping_class, 0, 'scheduled')
+
+    def test_plain_saves_move_the_seat(self):
+        jumping_class = self.create_class(capacity=1)
+        other_class = self.create_class(capacity=1, start_time=time(10, 0), end_time=time(11, 0))
+
+        booking = ClassBooking.objects.create(client=self.clients[0], jumping_class=jumping_class)
+        self.assertOccupancy(jumping_class, 1, 'full')
+
+        booking = ClassBooking.objects.get(pk=booking.pk)
+        booking.jumping_class = other_class
+        booking.save()
+        self.assertOccupancy(jumping_class, 0, 'scheduled')
+        self.assertOccupancy(other_class, 1, 'full')
+
+        booking.status = 'cancelled'
+        booking.save()
+        self.assertOccupancy(other_class, 0, 'scheduled')
+
+    def test_cancel_booking_then_save_does_not_release_twice(self):
+        jumping_class = self.create_class(capacity=3)
+        first = book_class(jumping_class, self.clients[0])
+        book_class(jumping_class, self.clients[1])
+
+        first.cancel_booking()
+        first.save()
+
+        self.assertOccupancy(jumping_class, 1, 'scheduled')
+
+    def test_attendance_keeps_the_seat(self):
+        jumping_class = self.create_class(capacity=2)
+        booking = book_class(jumping_class, self.clients[0])
+
+        booking.confirm_attendance()
+
+        self.assertOccupancy(jumping_class, 1, 'scheduled')
+
+    def test_reconcile_fixes_drift(self):
+        jumping_class = self.create_class(capacity=2)
+        book_class(jumping_class, self.clients[0])
+        JumpingClass.objects.filter(pk=jumping_class.pk).update(current_participants=2, status='full')
+
+        drift = reconcile_occupancy()
+
+        self.assertEqual(drift, {jumping_class.pk: (2, 1)})
+        self.assertOccupancy(jumping_class, 1, 'scheduled')
+        self.assertEqual(reconcile_occupancy(), {})
+
+
+class SeriesTests(JumpingTestCase):
+
+    def create_series(self, days=3, capacity=5):
+        base = self.create_class(
+            capacity=capacity,
+            recurring=True,
+            recurring_days=[str(day) for day in range(7)],
+            recurring_until=self.tomorrow + timedelta(days=days - 1),
+        )
+        create_series(base)
+        return base, list(JumpingClass.objects.filter(series_id=base.series_id).order_by('date'))
+
+    def test_expand_dates_by_weekday(self):
+        monday = date(2026, 1, 5)
+
+        self.assertEqual(
+            expand_dates(monday, monday + timedelta(days=13), ['0', '2']),
+            [monday, monday + timedelta(days=2), monday + timedelta(days=7), monday + timedelta(days=9)]
+        )
+        self.assertEqual(expand_dates(monday, monday - timedelta(days=1), ['0']), [])
+
+    def test_create_series_copies_the_base_class(self):
+        base, occurrences = self.create_series(days=4, capacity=7)
+
+        self.assertEqual([c.date for c in occurrences], [self.tomorrow + timedelta(days=i) for i in range(4)])
+        self.assertEqual({c.capacity for c in occurrences}, {7})
+        self.assertTrue(all(c.recurring for c in occurrences))
+
+    def test_conflicting_date_creates_nothing(self):
+        other_instructor = Instructor.objects.create(first_name='Luis', last_name='Pérez', phone='5550000002')
+        busy = self.create_class(
+            date=self.tomorrow + timedelta(days=2), start_time=time(8, 30), end_time=time(9, 30),
+            instructor=other_instructor
+        )
+        base = self.create_class(
+            recurring=True,
+            recurring_days=[str(day) for day in range(7)],
+            recurring_until=self.tomorrow + timedelta(days=3),
+        )
+
+        with self.assertRaises(ScheduleConflictError) as raised:
+            create_series(base)
+
+        self.assertEqual(raised.exception.conflicts, [busy])
+        self.assertEqual(JumpingClass.objects.count(), 2)
+
+    def test_update_series_checks_the_new_slot(self):
+        base, occurrences = self.create_series()
+        busy = self.create_class(date=occurrences[1].date, start_time=time(10, 0), end_time=time(11, 0))
+
+        with self.assertRaises(ScheduleConflictError) as raised:
+            update_series(base.series_id, {'start_time': time(10, 0), 'end_time': time(11, 0)})
+        self.assertEqual(raised.exception.conflicts, [busy])
+
+        self.assertEqual(update_series(base.series_id, {'start_time': time(7, 0)}), 3)
+        self.assertEqual(
+            set(JumpingClass.objects.filter(series_id=base.series_id).values_list('start_time', flat=True)),
+            {time(7, 0)}
+        )
+
+    def test_capacity_below_bookings_is_rejected(self):
+        base, occurrences = self.create_series()
+        for client in self.clients[:3]:
+            book_class(occurrences[1], client)
+
+        with self.assertRaises(SeriesCapacityError):
+            update_series(base.series_id, {'capacity': 2})
+        self.assertFalse(JumpingClass.objects.filter(series_id=base.series_id, capacity=2).exists())
+
+    def test_capacity_change_recomputes_full(self):
+        base, occurrences = self.create_series()
+        for client in self.clients[:3]:
+            book_class(occurrences[1], client)
+
+        update_series(base.series_id, {'capacity': 3})
+        self.assertOccupancy(occurrences[0], 0, 'scheduled')
+        self.assertOccupancy(occurrences[1], 3, 'full')
+
+        update_series(base.series_id, {'capacity': 4})
+        self.assertOccupancy(occurrences[1], 3, 'scheduled')
+
+
+class ClassEditTests(JumpingTestCase):
+
+    def test_full_save_keeps_concurrent_bookings(self):
+        jumping_class = self.create_class(capacity=1)
+        stale = JumpingClass.objects.get(pk=jumping_class.pk)
+        book_class(jumping_class, self.clients[0])
+
+        stale.name = 'Jumping avanzado'
+        stale.save()
+
+        self.assertOccupancy(jumping_class, 1, 'full')
+        self.assertEqual(jumping_class.name, 'Jumping avanzado')
+
+    def test_capacity_edit_reopens_full_class(self):
+        self.login()
+        jumping_class = self.create_class(capacity=1)
+        book_class(jumping_class, self.clients[0])
+
+        response = self.client.post(
+            reverse('jumping:class_edit', args=[jumping_class.pk]),
+            self.edit_data(jumping_class, capacity=3)
+        )
+
+        self.assertRedirects(response, reverse('jumping:class_detail', args=[jumping_class.pk]), fetch_redirect_response=False)
+        self.assertOccupancy(jumping_class, 1, 'scheduled')
+        self.assertEqual(jumping_class.capacity, 3)
+
+
+class BookingListTests(JumpingTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.login()
+        self.jumping_class = self.create_class(capacity=5)
+        self.bookings = [book_class(self.jumping_class, client) for client in self.clients[:3]]
+
+    @mock.patch('jumping.views.BOOKINGS_PER_PAGE', 2)
+    def test_next_cursor_continues_after_the_last_booking(self):
+        url = reverse('jumping:booking_list')
+        first = self.client.get(url).context['page']
+        second = self.client.get(url, {'cursor': first.next_cursor}).context['page']
+
+        newest_first = [booking.pk for booking in reversed(self.bookings)]
+        self.assertEqual([booking.pk for booking in first], newest_first[:2])
+        self.assertEqual([booking.pk for booking in second], newest_first[2:])
+        self.assertFalse(second.has_next)
+
+    def test_malformed_cursor_shows_the_first_page(self):
+        response = self.client.get(reverse('jumping:booking_list'), {'cursor': 'WyJ4IiwgIjEiXQ=='})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['page']), 3)
+        self.assertFalse(response.context['page'].has_previous)
+
+
+class CheckInTests(JumpingTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.jumping_class = self.create_class(capacity=5)
+        self.bookings = [book_class(self.jumping_class, client) for client in self.clients[:3]]
+
+    def test_check_in_skips_cancelled_other_classes_and_repeats(self):
+        confirmed, no_show, cancelled = self.bookings
+        ClassBooking.objects.filter(pk=no_show.pk).update(status='no_show')
+        cancelled.cancel_booking()
+        other_class = self.create_class(start_time=time(10, 0), end_time=time(11, 0))
+        other = book_class(other_class, self.clients[3])
+        now = timezone.now()
+
+        checked_in = check_in_bookings(
+            self.jumping_class.pk, [confirmed.pk, no_show.pk, cancelled.pk, other.pk], now=now
+        )
+
+        self.assertEqual(checked_in, 2)
+        self.assertEqual(
+            set(ClassBooking.objects.filter(status='attended').values_list('pk', flat=True)),
+            {confirmed.pk, no_show.pk}
+        )
+        self.assertEqual(check_in_bookings(self.jumping_class.pk, [confirmed.pk], now=now + timedelta(hours=1)), 0)
+        confirmed.refresh_from_db()
+        self.assertEqual(confirmed.check_in_time, now)
+
+    def test_mark_no_shows_only_for_finished_classes(self):
+        yesterday = self.create_class(date=self.tomorrow - timedelta(days=2))
+        cancelled_class = self.create_class(date=self.tomorrow - timedelta(days=2), start_time=time(10, 0), end_time=time(11, 0))
+        missed = book_class(yesterday, self.clients[0])
+        attended = book_class(yesterday, self.clients[1])
+        attended.confirm_attendance()
+        book_class(cancelled_class, self.clients[2])
+        cancel_classes([cancelled_class.pk])
+
+        self.assertEqual(mark_no_shows(), 1)
+
+        missed.refresh_from_db()
+        self.assertEqual(missed.status, 'no_show')
+        self.assertEqual(ClassBooking.objects.filter(jumping_class=self.jumping_class, status='confirmed').count(), 3)
+
+    def test_mark_attendance_reports_when_nothing_changed(self):
+        self.login()
+        url = reverse('jumping:mark_attendance', args=[self.bookings[0].pk])
+
+        response = self.client.post(url, follow=True)
+        self.assertEqual([m.level_tag for m in response.context['messages']], ['success'])
+
+        response = self.client.post(url, follow=True)
+        self.assertEqual([m.level_tag for m in response.context['messages']], ['warning'])
+
+        response = self.client.post(url, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(response.status_code, 409)
+
+    def test_class_check_in_json(self):
+        self.login()
+
+        response = self.client.post(
+            reverse('jumping:class_check_in', args=[self.jumping_class.pk]),
+            {'booking_ids': [booking.pk for booking in self.bookings[:2]]},
+            content_type='application/json'
+        )
+
+        self.assertEqual(response.json()['checked_in'], 2)
+        self.assertEqual({b['status'] for b in response.json()['bookings']}, {'attended'})
+
+
+class ReportRollupTests(JumpingTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.today = timezone.localdate()
+        other_instructor = Instructor.objects.create(first_name='Luis', last_name='Pérez', phone='5550000002')
+        other_location = Location.objects.create(name='Norte', address='Calle 2', phone='5550000003')
+
+        # Tres días cerrados, hoy y mañana; el instructor y la ubicación principales con más clases
+        self.classes = [
+            self.create_class(
+                capacity=5, date=self.today - timedelta(days=days), start_time=time(8 + i, 0), end_time=time(9 + i, 0)
+            )
+            for days in (3, 2, 1, 0, -1) for i in range(2)
+        ] + [
+            self.create_class(
+                capacity=5, date=self.today - timedelta(days=2), start_time=time(18, 0), end_time=time(19, 0),
+                instructor=other_instructor, location=other_location
+            )
+        ]
+        for n, jumping_class in enumerate(self.classes):
+            for client in self.clients[:n % 4 + 1]:
+                booking = book_class(jumping_class, client, payment_status=client.pk % 2 == 0, amount_paid=150)
+                if client.pk % 3 == 0:
+                    booking.confirm_attendance()
+
+        self.start, self.end = self.today - timedelta(days=5), self.today + timedelta(days=1)
+
+    def test_rollup_matches_live_metrics(self):
+        live = class_report(self.start, self.end)
+
+        self.assertGreater(rollup_closed_days(today=self.today), 0)
+        self.assertEqual(rollup_watermark(), self.today - timedelta(days=1))
+        self.assertEqual(class_report(self.start, self.end), live)
+
+    def test_rerun_picks_up_late_changes(self):
+        rollup_closed_days(today=self.today)
+        ClassBooking.objects.filter(
+            jumping_class__date=self.today - timedelta(days=2), status='confirmed'
+        ).update(status='attended', payment_status=True)
+        with mock.patch('jumping.reports.rollup_watermark', return_value=None):
+            live = class_report(self.start, self.end)
+        self.assertNotEqual(class_report(self.start, self.end), live)
+
+        rollup_closed_days(today=self.today)
 
-# Create your tests here.
+        self.assertEqual(class_report(self.start, self.end), live)
@@ -20,7 +20,9 @@ urlpatterns = [
     path('classes/<int:pk>/book/', views.create_booking, name='create_booking'),
     path('bookings/<int:pk>/cancel/', views.cancel_booking, name='cancel_booking'),
     path('bookings/<int:pk>/attendance/', views.mark_attendance, name='mark_attendance'),
+    path('classes/<int:pk>/check-in/', views.class_check_in, name='class_check_in'),
     path('bookings/', views.booking_list, name='booking_list'),
+    path('waitlist/<int:pk>/cancel/', views.waitlist_cancel, name='waitlist_cancel'),
     
     # Instructores
     path('instructors/', views.instructor_list, name='instructor_list'),
@@ -36,6 +38,7 @@ urlpatterns = [
     
     # Calendario y reportes
     path('calendar/', views.class_calendar, name='class_calendar'),
+    path('calendar/feed/', views.calendar_feed, name='calendar_feed'),
     path('report/', views.class_report, name='class_report'),
     path('schedule/', views.weekly_schedule, name='weekly_schedule'),
 ]
\ No newline at end of file
@@ -1,16 +1,30 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.db import transaction
 from django.db.models import Q, Count, Sum
 from django.utils import timezone
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from django.http import JsonResponse
+from django.views.decorators.http import condition
 from django.core.paginator import Paginator
+from urllib.parse import urlencode
+import json
 
+from gym.pagination import paginate_keyset
 from users.decorators import allowed_roles
 from clients.models import Client
-from .models import JumpingClass, Location, Instructor, ClassBooking, Equipment
+from .models import JumpingClass, Location, Instructor, ClassBooking, Equipment, WaitlistEntry
 from .forms import JumpingClassForm, ClassBookingForm, InstructorForm, LocationForm
+from .recurrence import (
+    ScheduleConflictError, SeriesCapacityError, cancel_series, create_series, update_series
+)
+from .reports import class_report as build_class_report
+from .services import (
+    ClassFullError, ClassNotBookableError, DuplicateBookingError, book_class, booking_stats, calendar_state,
+    cancel_classes, check_in_bookings, get_calendar_feed, get_week_schedule, join_waitlist, leave_waitlist,
+    promote_waitlists, sync_full_status
+)
 
 # ============================================
 # DASHBOARD
@@ -127,12 +141,15 @@ def class_detail(request, pk):
         jumping_class=jumping_class
     ).select_related('client').order_by('booking_date')
     
-    # Actualizar estado automáticamente
-    jumping_class.update_status()
+    waitlist = WaitlistEntry.objects.filter(
+        jumping_class=jumping_class,
+        status='waiting'
+    ).select_related('client').order_by('position')
     
     context = {
         'class': jumping_class,
         'bookings': bookings,
+        'waitlist': waitlist,
         'available_spots': jumping_class.available_spots,
         'is_full': jumping_class.is_full,
     }
@@ -145,14 +162,23 @@ def class_create(request):
     if request.method == 'POST':
         form = JumpingClassForm(request.POST)
         if form.is_valid():
-            jumping_class = form.save()
-            
-            # Si es recurrente, crear las clases repetidas
-            if form.cleaned_data.get('recurring'):
-                create_recurring_classes(jumping_class, form.cleaned_data)
-            
-            messages.success(request, f'Clase {jumping_class.name} creada exitosamente')
-            return redirect('jumping:class_detail', pk=jumping_class.pk)
+            try:
+                with transaction.atomic():
+                    jumping_class = form.save()
+                    
+                    # Si es recurrente, crear las clases repetidas
+                    repeated = []
+                    if jumping_class.recurring:
+                        repeated = create_series(jumping_class)
+            except ScheduleConflictError as e:
+                messages.error(request, str(e))
+            else:
+                messages.success(
+                    request,
+                    f'Clase {jumping_class.name} creada exitosamente'
+                    + (f' con {len(repeated)} repeticiones' if repeated else '')
+                )
+                return redirect('jumping:class_detail', pk=jumping_class.pk)
     else:
         form = JumpingClassForm(initial={
             'date': timezone.now().date(),
@@ -166,35 +192,6 @@ def class_create(request):
     }
     return render(request, 'jumping/class_form.html', context)
 
-def create_recurring_classes(base_class, cleaned_data):
-    """Crea clases recurrentes"""
-    current_date = base_class.date
-    end_date = cleaned_data.get('recurring_until')
-    recurring_days = cleaned_data.get('recurring_days', [])
-    
-    if not end_date:
-        return
-    
-    while current_date <= end_date:
-        if current_date.weekday() in recurring_days and current_date != base_class.date:
-            JumpingClass.objects.create(
-                name=base_class.name,
-                description=base_class.description,
-                instructor=base_class.instructor,
-                location=base_class.location,
-                date=current_date,
-                start_time=base_class.start_time,
-                end_time=base_class.end_time,
-                duration=base_class.duration,
-                capacity=base_class.capacity,
-                difficulty=base_class.difficulty,
-                price=base_class.price,
-                requires_equipment=base_class.requires_equipment,
-                equipment_available=base_class.equipment_available,
-                recurring=True
-            )
-        current_date += timedelta(days=1)
-
 @login_required
 @allowed_roles(['admin', 'recep'])
 def class_edit(request, pk):
@@ -204,9 +201,31 @@ def class_edit(request, pk):
     if request.method == 'POST':
         form = JumpingClassForm(request.POST, instance=jumping_class)
         if form.is_valid():
-            form.save()
-            messages.success(request, f'Clase {jumping_class.name} actualizada')
-            return redirect('jumping:class_detail', pk=jumping_class.pk)
+            apply_to_series = jumping_class.series_id and request.POST.get('apply_to_series')
+            try:
+                with transaction.atomic():
+                    form.save()
+                    if 'capacity' in form.changed_data:
+                        sync_full_status([jumping_class.pk])
+                        promote_waitlists([jumping_class.pk])
+                    
+                    # Propagar los cambios a las siguientes clases de la serie
+                    updated = 0
+                    if apply_to_series:
+                        updated = update_series(
+                            jumping_class.series_id,
+                            {field: form.cleaned_data[field] for field in form.changed_data},
+                            from_date=jumping_class.date
+                        )
+            except (ScheduleConflictError, SeriesCapacityError) as e:
+                messages.error(request, str(e))
+            else:
+                messages.success(
+                    request,
+                    f'Clase {jumping_class.name} actualizada'
+                    + (f' ({updated} clases de la serie)' if updated else '')
+                )
+                return redirect('jumping:class_detail', pk=jumping_class.pk)
     else:
         form = JumpingClassForm(instance=jumping_class)
     
@@ -238,14 +257,17 @@ def class_cancel(request, pk):
     jumping_class = get_object_or_404(JumpingClass, pk=pk)
     
     if request.method == 'POST':
-        if jumping_class.can_cancel:
-            jumping_class.status = 'cancelled'
-            jumping_class.save()
-            
-            # Notificar a clientes con reservas
-            notify_cancelled_class(jumping_class)
+        if jumping_class.series_id and request.POST.get('scope') == 'series':
+            classes, bookings = cancel_series(jumping_class.series_id, from_date=jumping_class.date)
+            messages.warning(
+                request,
+                f'{classes} clases de la serie {jumping_class.name} canceladas ({bookings} reservas)'
+            )
+        elif jumping_class.can_cancel:
+            # Cancela reservas y lista de espera; los avisos se envían en segundo plano
+            _, bookings = cancel_classes([jumping_class.pk])
             
-            messages.warning(request, f'Clase {jumping_class.name} cancelada')
+            messages.warning(request, f'Clase {jumping_class.name} cancelada ({bookings} reservas notificadas)')
         else:
             messages.error(request, 'No se puede cancelar esta clase')
         
@@ -263,33 +285,48 @@ def create_booking(request, pk):
     """Crear reserva para una clase"""
     jumping_class = get_object_or_404(JumpingClass, pk=pk)
     
-    if jumping_class.is_full:
-        messages.error(request, 'La clase está completa')
-        return redirect('jumping:class_detail', pk=pk)
-    
     if request.method == 'POST':
         form = ClassBookingForm(request.POST)
         if form.is_valid():
-            booking = form.save(commit=False)
-            booking.jumping_class = jumping_class
-            booking.created_by = request.user
-            
-            # Verificar si ya tiene reserva
-            existing_booking = ClassBooking.objects.filter(
-                client=booking.client,
-                jumping_class=jumping_class
-            ).first()
-            
-            if existing_booking:
+            data = form.cleaned_data
+            try:
+                booking = book_class(
+                    jumping_class,
+                    data['client'],
+                    created_by=request.user,
+                    payment_status=data['payment_status'],
+                    amount_paid=data['amount_paid'],
+                    notes=data['notes'],
+                )
+            except ClassFullError:
+                # Sin cupo: el cliente pasa a la lista de espera
+                try:
+                    entry = join_waitlist(
+                        jumping_class,
+                        data['client'],
+                        created_by=request.user,
+                        payment_status=data['payment_status'],
+                        amount_paid=data['amount_paid'],
+                        notes=data['notes'],
+                    )
+                except (ClassNotBookableError, DuplicateBookingError) as e:
+                    messages.error(request, str(e))
+                    return redirect('jumping:class_detail', pk=pk)
+                if isinstance(entry, WaitlistEntry):
+                    messages.warning(
+                        request,
+                        f'La clase está completa: {entry.client} quedó en lista de espera (posición {entry.position})'
+                    )
+                    return redirect('jumping:class_detail', pk=pk)
+                # Se liberó un lugar mientras tanto: quedó reservado
+                booking = entry
+            except ClassNotBookableError:
+                messages.error(request, 'Esta clase ya no acepta reservas')
+                return redirect('jumping:class_detail', pk=pk)
+            except DuplicateBookingError:
                 messages.error(request, 'Este cliente ya tiene reserva para esta clase')
                 return redirect('jumping:class_detail', pk=pk)
             
-            booking.save()
-            
-            # Actualizar contador de participantes
-            jumping_class.current_participants += 1
-            jumping_class.save()
-            
             messages.success(request, f'Reserva creada para {booking.client}')
             return redirect('jumping:class_detail', pk=pk)
     else:
@@ -300,34 +337,56 @@ def create_booking(request, pk):
     
     context = {
         'form': form,
-        'class': jumping_class
+        'class': jumping_class,
+        'waitlist': jumping_class.is_full,
     }
     return render(request, 'jumping/booking_form.html', context)
 
+BOOKINGS_PER_PAGE = 50
+
 @login_required
 @allowed_roles(['admin', 'recep'])
 def booking_list(request):
     """Lista de reservas"""
-    date_from = request.GET.get('from', timezone.now().date())
-    date_to = request.GET.get('to', timezone.now().date() + timedelta(days=30))
+    today = timezone.now().date()
+    try:
+        date_from = date.fromisoformat(request.GET.get('from') or '')
+    except ValueError:
+        date_from = today
+    try:
+        date_to = date.fromisoformat(request.GET.get('to') or '')
+    except ValueError:
+        date_to = today + timedelta(days=30)
     status = request.GET.get('status', '')
     
-    bookings = ClassBooking.objects.select_related(
-        'client', 'jumping_class', 'jumping_class__location'
-    ).filter(
+    bookings = ClassBooking.objects.filter(
         jumping_class__date__range=[date_from, date_to]
     )
     
     if status:
         bookings = bookings.filter(status=status)
     
-    bookings = bookings.order_by('-booking_date')
+    # Paginación por cursor sobre (booking_date, id), más recientes primero
+    page = paginate_keyset(
+        bookings.select_related(
+            'client', 'jumping_class', 'jumping_class__instructor', 'jumping_class__location'
+        ),
+        ['-booking_date', '-id'],
+        cursor=request.GET.get('cursor'),
+        backwards=request.GET.get('dir') == 'prev',
+        per_page=BOOKINGS_PER_PAGE
+    )
+    
+    filter_query = urlencode({'from': date_from, 'to': date_to, 'status': status})
     
     context = {
-        'bookings': bookings,
+        'bookings': page,
+        'page': page,
+        'filter_query': filter_query,
         'date_from': date_from,
         'date_to': date_to,
-        'status': status
+        'status': status,
+        **booking_stats(bookings),
     }
     return render(request, 'jumping/booking_list.html', context)
 
@@ -346,23 +405,88 @@ def cancel_booking(request, pk):
     
     return render(request, 'jumping/booking_confirm_cancel.html', {'booking': booking})
 
+@login_required
+@allowed_roles(['admin', 'recep'])
+def waitlist_cancel(request, pk):
+    """Sacar a un cliente de la lista de espera"""
+    entry = get_object_or_404(WaitlistEntry, pk=pk)
+    
+    if request.method == 'POST':
+        if leave_waitlist(entry):
+            messages.warning(request, f'{entry.client} salió de la lista de espera')
+    
+    return redirect('jumping:class_detail', pk=entry.jumping_class_id)
+
 @login_required
 @allowed_roles(['admin', 'recep'])
 def mark_attendance(request, pk):
     """Marcar asistencia"""
-    booking = get_object_or_404(ClassBooking, pk=pk)
+    booking = get_object_or_404(ClassBooking.objects.select_related('client'), pk=pk)
     
     if request.method == 'POST':
-        booking.confirm_attendance()
-        messages.success(request, f'Asistencia confirmada para {booking.client}')
+        # Las canceladas y las que ya tienen llegada no cambian
+        checked_in = check_in_bookings(booking.jumping_class_id, [booking.pk])
+        if checked_in:
+            message = f'Asistencia confirmada para {booking.client}'
+            messages.success(request, message)
+        else:
+            message = f'No se registró la asistencia de {booking.client}: la reserva está cancelada o ya tenía llegada'
+            messages.warning(request, message)
         
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+            if not checked_in:
+                return JsonResponse({'status': 'error', 'message': message}, status=409)
             return JsonResponse({'status': 'success'})
         
-        return redirect('jumping:class_detail', pk=booking.jumping_class.pk)
+        return redirect('jumping:class_detail', pk=booking.jumping_class_id)
     
     return JsonResponse({'status': 'error'}, status=400)
 
+@login_required
+@allowed_roles(['admin', 'recep'])
+def class_check_in(request, pk):
+    """
+    Registrar la llegada de varias reservas de la clase a la vez. Acepta
+    `booking_ids` como campos de formulario o en un cuerpo JSON y devuelve
+    el estado resultante de esas reservas.
+    """
+    jumping_class = get_object_or_404(JumpingClass, pk=pk)
+    
+    if request.method != 'POST':
+        return JsonResponse({'status': 'error'}, status=400)
+    
+    if request.content_type == 'application/json':
+        try:
+            raw_ids = json.loads(request.body).get('booking_ids', [])
+        except (ValueError, AttributeError):
+            return JsonResponse({'status': 'error', 'message': 'JSON inválido'}, status=400)
+    else:
+        raw_ids = request.POST.getlist('booking_ids')
+    
+    try:
+        booking_ids = {int(booking_id) for booking_id in raw_ids}
+    except (TypeError, ValueError):
+        return JsonResponse({'status': 'error', 'message': 'IDs de reserva inválidos'}, status=400)
+    
+    checked_in = check_in_bookings(jumping_class.pk, booking_ids)
+    
+    if request.headers.get('X-Requested-With') == 'XMLHttpRequest' or request.content_type == 'application/json':
+        bookings = ClassBooking.objects.filter(
+            jumping_class=jumping_class,
+            pk__in=booking_ids
+        ).values('id', 'status', 'attended', 'check_in_time')
+        return JsonResponse({
+            'status': 'success',
+            'checked_in': checked_in,
+            'bookings': list(bookings),
+        })
+    
+    if checked_in:
+        messages.success(request, f'Asistencia registrada para {checked_in} reserva(s)')
+    else:
+        messages.info(request, 'No había reservas pendientes de registrar')
+    return redirect('jumping:class_detail', pk=jumping_class.pk)
+
 # ============================================
 # INSTRUCTORES
 # ============================================
@@ -537,53 +661,87 @@ def class_calendar(request):
     }
     return render(request, 'jumping/calendar.html', context)
 
+# Rango máximo del feed del calendario (días)
+CALENDAR_FEED_MAX_DAYS = 93
+
+def _calendar_feed_query(request):
+    """
+    Parámetros del feed (start, end, location, instructor) y su estado
+    (última modificación, total), calculados una vez por petición.
+    Devuelve None si los parámetros no son válidos.
+    """
+    if not hasattr(request, '_calendar_feed_query'):
+        query = None
+        try:
+            today = timezone.now().date()
+            start = date.fromisoformat(request.GET.get('start') or today.replace(day=1).isoformat())
+            end = date.fromisoformat(request.GET.get('end') or (start + timedelta(days=41)).isoformat())
+            location_id = int(request.GET.get('location') or 0) or None
+            instructor_id = int(request.GET.get('instructor') or 0) or None
+        except ValueError:
+            pass
+        else:
+            if start <= end and (end - start).days <= CALENDAR_FEED_MAX_DAYS:
+                params = (start, end, location_id, instructor_id)
+                query = (params, calendar_state(*params))
+        request._calendar_feed_query = query
+    return request._calendar_feed_query
+
+def _calendar_feed_etag(request):
+    query = _calendar_feed_query(request)
+    if query is None:
+        return None
+    last_modified, total = query[1]
+    return f'{last_modified.timestamp() if last_modified else 0}-{total}'
+
+def _calendar_feed_last_modified(request):
+    query = _calendar_feed_query(request)
+    return query[1][0] if query else None
+
+@login_required
+@allowed_roles(['admin', 'recep'])
+@condition(etag_func=_calendar_feed_etag, last_modified_func=_calendar_feed_last_modified)
+def calendar_feed(request):
+    """
+    Clases de un rango de fechas en JSON compacto para el calendario.
+    Parámetros: start, end (YYYY-MM-DD), location, instructor.
+    Con ETag/Last-Modified el navegador revalida y recibe 304 si nada cambió.
+    """
+    query = _calendar_feed_query(request)
+    if query is None:
+        return JsonResponse(
+            {'error': f'Rango de fechas inválido (máximo {CALENDAR_FEED_MAX_DAYS} días)'},
+            status=400
+        )
+    
+    start, end, location_id, instructor_id = query[0]
+    response = JsonResponse({
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'classes': get_calendar_feed(start, end, location_id, instructor_id),
+    })
+    # Siempre revalidar: el 304 es barato y los cupos cambian con cada reserva
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
 @login_required
 @allowed_roles(['admin'])
 def class_report(request):
     """Reporte de clases"""
-    start_date = request.GET.get('start', timezone.now().date() - timedelta(days=30))
-    end_date = request.GET.get('end', timezone.now().date())
-    
-    classes = JumpingClass.objects.filter(date__range=[start_date, end_date])
-    
-    # Estadísticas
-    total_classes = classes.count()
-    total_bookings = ClassBooking.objects.filter(
-        jumping_class__in=classes
-    ).count()
-    total_revenue = ClassBooking.objects.filter(
-        jumping_class__in=classes,
-        payment_status=True
-    ).aggregate(Sum('amount_paid'))['amount_paid__sum'] or 0
-    
-    # Clases por instructor
-    classes_by_instructor = classes.values(
-        'instructor__first_name', 'instructor__last_name'
-    ).annotate(count=Count('id')).order_by('-count')
-    
-    # Clases por ubicación
-    classes_by_location = classes.values(
-        'location__name'
-    ).annotate(count=Count('id')).order_by('-count')
-    
-    # Asistencia
-    attendance_rate = 0
-    if total_bookings > 0:
-        attended = ClassBooking.objects.filter(
-            jumping_class__in=classes,
-            status='attended'
-        ).count()
-        attendance_rate = (attended / total_bookings) * 100 if total_bookings > 0 else 0
+    today = timezone.now().date()
+    try:
+        start_date = date.fromisoformat(request.GET.get('start') or '')
+    except ValueError:
+        start_date = today - timedelta(days=30)
+    try:
+        end_date = date.fromisoformat(request.GET.get('end') or '')
+    except ValueError:
+        end_date = today
     
     context = {
         'start_date': start_date,
         'end_date': end_date,
-        'total_classes': total_classes,
-        'total_bookings': total_bookings,
-        'total_revenue': total_revenue,
-        'classes_by_instructor': classes_by_instructor,
-        'classes_by_location': classes_by_location,
-        'attendance_rate': round(attendance_rate, 2),
+        **build_class_report(start_date, end_date),
     }
     return render(request, 'jumping/report.html', context)
 
@@ -592,49 +750,22 @@ def class_report(request):
 def weekly_schedule(request):
     """Horario semanal"""
     week_offset = int(request.GET.get('week', 0))
-    start_date = timezone.now().date() + timedelta(weeks=week_offset)
+    location_filter = request.GET.get('location', '')
+    today = timezone.now().date()
+    start_date = today + timedelta(weeks=week_offset)
     start_of_week = start_date - timedelta(days=start_date.weekday())
     
-    week_days = []
-    for i in range(7):
-        day_date = start_of_week + timedelta(days=i)
-        day_classes = JumpingClass.objects.filter(
-            date=day_date,
-            status__in=['scheduled', 'in_progress', 'full']
-        ).select_related('instructor', 'location').order_by('start_time')
-        
-        week_days.append({
-            'date': day_date,
-            'day_name': day_date.strftime('%A').capitalize(),
-            'classes': day_classes,
-            'total_classes': day_classes.count(),
-            'total_capacity': sum(c.capacity for c in day_classes),
-            'total_booked': sum(c.current_participants for c in day_classes),
-        })
+    week_days = get_week_schedule(
+        start_of_week,
+        int(location_filter) if location_filter.isdigit() else None
+    )
     
     context = {
         'week_days': week_days,
         'week_offset': week_offset,
         'week_range': f"{start_of_week.strftime('%d/%m')} - {(start_of_week + timedelta(days=6)).strftime('%d/%m/%Y')}",
         'locations': Location.objects.filter(is_active=True),
+        'location_filter': location_filter,
+        'today': today,
     }
     return render(request, 'jumping/weekly_schedule.html', context)
-
-# ============================================
-# FUNCIONES AUXILIARES
-# ============================================
-
-def notify_cancelled_class(jumping_class):
-    """Notifica a los clientes sobre la cancelación"""
-    bookings = ClassBooking.objects.filter(
-        jumping_class=jumping_class,
-        status='confirmed'
-    ).select_related('client')
-    
-    for booking in bookings:
-        # Aquí implementarías el envío de SMS/Email
-        # Por ahora solo marcamos la reserva como cancelada
-        booking.status = 'cancelled'
-        booking.save()
-        
-        print(f"Notificación enviada a {booking.client.phone} - Clase cancelada")
\ No newline at end of file
@@ -0,0 +1,38 @@
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+from .ratelimit import get_rate_limiter
+
+# Resultado por mensaje: sid si se envió, error (excepción) si falló
+DispatchResult = namedtuple('DispatchResult', ['notification_id', 'sid', 'error'])
+
+
+def dispatch(messages, send, max_in_flight=None, limiter=None):
+    """
+    Envía mensajes en paralelo con un pool de hilos.
+
+    `messages` es una lista de tuplas (notification_id, teléfono, texto) y
+    `send` la función de envío (teléfono, texto) -> sid. Como máximo hay
+    `max_in_flight` peticiones abiertas a la vez y cada envío toma antes un
+    token del limitador compartido. Devuelve un DispatchResult por mensaje,
+    en el mismo orden; un fallo (también del limitador) solo afecta a su
+    mensaje, nunca al lote.
+    """
+    max_in_flight = max_in_flight or settings.SMS_MAX_IN_FLIGHT
+    limiter = limiter or get_rate_limiter()
+
+    def send_one(item):
+        notification_id, to_phone, message = item
+        try:
+            limiter.acquire()
+            return DispatchResult(notification_id, send(to_phone, message), None)
+        except Exception as e:
+            return DispatchResult(notification_id, None, e)
+
+    if not messages:
+        return []
+
+    with ThreadPoolExecutor(max_workers=min(max_in_flight, len(messages))) as executor:
+        return list(executor.map(send_one, messages))
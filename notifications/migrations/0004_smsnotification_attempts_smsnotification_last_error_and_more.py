@@ -0,0 +1,32 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0003_alter_smsnotification_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='smsnotification',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='smsnotification',
+            name='last_error',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='smsnotification',
+            name='next_attempt_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='smsnotification',
+            index=models.Index(fields=['status', 'next_attempt_at'], name='notificatio_status_d55eb6_idx'),
+        ),
+    ]
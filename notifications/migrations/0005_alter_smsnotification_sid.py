@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0004_smsnotification_attempts_smsnotification_last_error_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='smsnotification',
+            name='sid',
+            field=models.CharField(blank=True, db_index=True, max_length=100, null=True),
+        ),
+    ]
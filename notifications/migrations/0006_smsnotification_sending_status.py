@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0005_alter_smsnotification_sid'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='smsnotification',
+            name='status',
+            field=models.CharField(choices=[('queued', 'En cola'), ('sending', 'Enviando'), ('sent', 'Enviado'), ('delivered', 'Entregado'), ('failed', 'Fallido'), ('undelivered', 'No entregado')], max_length=20),
+        ),
+    ]
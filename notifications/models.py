@@ -4,6 +4,7 @@ from clients.models import Client
 class SMSNotification(models.Model):
     STATUS_CHOICES = (
         ('queued', 'En cola'),
+        ('sending', 'Enviando'),
         ('sent', 'Enviado'),
         ('delivered', 'Entregado'),
         ('failed', 'Fallido'),
@@ -12,9 +13,19 @@ class SMSNotification(models.Model):
 
     client = models.ForeignKey(Client, on_delete=models.CASCADE)
     message = models.TextField()
-    sid = models.CharField(max_length=100, blank=True, null=True)
+    sid = models.CharField(max_length=100, blank=True, null=True, db_index=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Cola de reintentos
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
     def __str__(self):
         return f"{self.client} - {self.status}"
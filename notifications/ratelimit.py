@@ -0,0 +1,120 @@
+import logging
+import os
+import threading
+import time
+
+import redis
+from django.conf import settings
+
+from gym.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+
+class LocalTokenBucket:
+    """Token bucket en memoria; solo limita dentro del proceso actual"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self):
+        """Toma un token si hay; si no, devuelve los segundos a esperar"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0
+            return (1 - self._tokens) / self.rate
+
+
+class RedisTokenBucket:
+    """Token bucket compartido por todos los workers a través de Redis"""
+
+    # Recarga y consumo atómicos; devuelve los milisegundos a esperar (0 = concedido)
+    SCRIPT = """
+    local rate = tonumber(ARGV[1])
+    local capacity = tonumber(ARGV[2])
+    local now = redis.call('TIME')
+    now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+    local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+    local tokens = tonumber(state[1]) or capacity
+    local updated = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + (now - updated) * rate)
+    local wait = 0
+    if tokens >= 1 then
+        tokens = tokens - 1
+    else
+        wait = math.ceil((1 - tokens) / rate * 1000)
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+    redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+    return wait
+    """
+
+    def __init__(self, client, key, rate, capacity):
+        self.key = key
+        self.rate = rate
+        self.capacity = capacity
+        self._script = client.register_script(self.SCRIPT)
+        # Si Redis cae a mitad de un lote se limita al menos dentro del proceso
+        self._fallback = LocalTokenBucket(rate, capacity)
+
+    def try_acquire(self):
+        try:
+            return self._script(keys=[self.key], args=[self.rate, self.capacity]) / 1000
+        except redis.RedisError as e:
+            logger.warning(f'Redis no disponible para el rate limit, usando bucket local: {e}')
+            return self._fallback.try_acquire()
+
+
+class RateLimiter:
+    """Bloquea hasta obtener un token del bucket configurado"""
+
+    def __init__(self, bucket):
+        self.bucket = bucket
+
+    def acquire(self):
+        if self.bucket is None:
+            return
+        while True:
+            wait = self.bucket.try_acquire()
+            if not wait:
+                return
+            time.sleep(wait)
+
+
+def _build_bucket():
+    rate = settings.SMS_RATE_PER_SECOND
+    capacity = settings.SMS_RATE_BURST
+    if not rate:
+        return None
+
+    client = get_redis()
+    if client is not None:
+        return RedisTokenBucket(client, 'sms:ratelimit', rate, capacity)
+
+    return LocalTokenBucket(rate, capacity)
+
+
+_limiter = None
+_limiter_pid = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """Devuelve el limitador de SMS del proceso actual (compartido vía Redis si existe)"""
+    global _limiter, _limiter_pid
+
+    pid = os.getpid()
+    if _limiter is None or _limiter_pid != pid:
+        with _limiter_lock:
+            if _limiter is None or _limiter_pid != pid:
+                _limiter = RateLimiter(_build_bucket())
+                _limiter_pid = pid
+    return _limiter
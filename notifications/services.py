@@ -1,18 +1,297 @@
-from twilio.rest import Client
 from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from datetime import timedelta
+import logging
+import random
+import time
+
+import redis
+
+from .dispatch import dispatch
+from .models import SMSNotification
+from .transport import get_backend
+from gym.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
 
 def send_sms(to_phone, message):
-    client = Client(
-        settings.TWILIO_ACCOUNT_SID,
-        settings.TWILIO_AUTH_TOKEN
+    """Enviar un SMS con el backend configurado y devolver su sid"""
+    return get_backend().send(
+        to_phone,
+        message,
+        status_callback=settings.SMS_STATUS_CALLBACK_URL
+    )
+
+
+def queue_notifications(client_messages):
+    """
+    Registra en bloque notificaciones en estado 'queued'.
+
+    `client_messages` es un iterable de tuplas (client_id, mensaje).
+    Devuelve la lista de ids creados para pasarlos a la etapa de envío.
+    Las filas quedan reservadas durante SMS_RETRY_LEASE segundos para el
+    envío inmediato; si nadie las procesa, el barrido de reintentos las toma.
+    """
+    lease_until = timezone.now() + timedelta(seconds=settings.SMS_RETRY_LEASE)
+    notifications = SMSNotification.objects.bulk_create([
+        SMSNotification(
+            client_id=client_id,
+            message=message,
+            status='queued',
+            next_attempt_at=lease_until
+        )
+        for client_id, message in client_messages
+    ])
+    return [notification.id for notification in notifications]
+
+
+def retry_delay(attempts):
+    """Espera exponencial (con jitter) antes del siguiente intento"""
+    delay = settings.SMS_RETRY_BASE_DELAY * (2 ** (attempts - 1))
+    return timedelta(seconds=delay * random.uniform(1, 1.25))
+
+
+def claim_for_delivery(notification_ids):
+    """
+    Reserva para esta llamada las notificaciones en cola indicadas: pasan a
+    'sending' con un nuevo plazo SMS_RETRY_LEASE. Las que otro proceso ya
+    tomó (bloqueadas, 'sending' o enviadas) se omiten, así que un chunk que
+    llega tarde, una redelivery de Celery o el barrido de reintentos no
+    vuelven a enviarlas. Devuelve los ids reservados.
+    """
+    with transaction.atomic():
+        ids = list(
+            SMSNotification.objects.select_for_update(skip_locked=True).filter(
+                id__in=notification_ids,
+                status='queued'
+            ).values_list('id', flat=True)
+        )
+        SMSNotification.objects.filter(id__in=ids).update(
+            status='sending',
+            next_attempt_at=timezone.now() + timedelta(seconds=settings.SMS_RETRY_LEASE)
+        )
+    return ids
+
+
+def deliver_notifications(notification_ids):
+    """
+    Etapa de envío: reserva las notificaciones indicadas, las manda en
+    paralelo y guarda el resultado de las reservadas con un único bulk_update.
+
+    Los errores transitorios (throttling, red) vuelven a la cola con espera
+    exponencial hasta SMS_MAX_ATTEMPTS intentos; el resto pasa a 'failed'.
+    Devuelve la lista de DispatchResult.
+    """
+    claimed_ids = claim_for_delivery(notification_ids)
+    notifications = {
+        notification.id: notification
+        for notification in SMSNotification.objects.filter(
+            id__in=claimed_ids
+        ).select_related('client')
+    }
+
+    results = dispatch(
+        [(n.id, n.client.phone, n.message) for n in notifications.values()],
+        send_sms
     )
 
-    sms = client.messages.create(
-    body=message,
-    from_=settings.TWILIO_PHONE_NUMBER,
-    to=to_phone,
-    status_callback='https://TU_DOMINIO/notifications/sms/status/'
-)
+    backend = get_backend()
+    now = timezone.now()
+    for result in results:
+        notification = notifications[result.notification_id]
+        notification.attempts += 1
+        if result.error is None:
+            notification.sid = result.sid
+            notification.status = 'sent'
+            notification.next_attempt_at = None
+            notification.last_error = ''
+            continue
+
+        notification.last_error = str(result.error)
+        if backend.is_retryable(result.error) and notification.attempts < settings.SMS_MAX_ATTEMPTS:
+            notification.status = 'queued'
+            notification.next_attempt_at = now + retry_delay(notification.attempts)
+            logger.warning(f'Reintento {notification.attempts} de SMS a {notification.client.phone}: {result.error}')
+        else:
+            notification.status = 'failed'
+            notification.next_attempt_at = None
+            logger.error(f'Error enviando SMS a {notification.client.phone}: {result.error}')
+
+    with transaction.atomic():
+        # Solo se escriben las que siguen en 'sending': si el plazo venció y el
+        # barrido las recuperó, o ya llegó un estado más avanzado, no se pisan
+        still_sending = set(
+            SMSNotification.objects.select_for_update().filter(
+                id__in=claimed_ids,
+                status='sending'
+            ).values_list('id', flat=True)
+        )
+        SMSNotification.objects.bulk_update(
+            [n for n in notifications.values() if n.id in still_sending],
+            ['sid', 'status', 'attempts', 'next_attempt_at', 'last_error']
+        )
+    return results
+
+
+def claim_due_notifications(limit):
+    """
+    Toma las notificaciones en cola cuyo siguiente intento ya venció, y las
+    'sending' cuyo plazo expiró (el worker que las tenía murió), y las
+    reserva durante SMS_RETRY_LEASE para reenviarlas a la etapa de envío.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            SMSNotification.objects.select_for_update(skip_locked=True).filter(
+                status__in=['queued', 'sending'],
+                next_attempt_at__lte=now
+            ).order_by('next_attempt_at').values_list('id', flat=True)[:limit]
+        )
+        SMSNotification.objects.filter(id__in=ids).update(
+            status='queued',
+            next_attempt_at=now + timedelta(seconds=settings.SMS_RETRY_LEASE)
+        )
+    return ids
+
+
+# Orden de los estados de entrega: un evento solo se aplica si avanza el estado
+STATUS_RANK = {
+    'queued': 0,
+    'sent': 1,
+    'delivered': 2,
+    'undelivered': 2,
+    'failed': 2,
+}
+
+STATUS_EVENTS_KEY = 'sms:status:events'
+
+
+def apply_status_events(events):
+    """
+    Aplica en bloque eventos (sid, estado) de Twilio.
+
+    Por cada sid se conserva el evento más avanzado y se lanza un UPDATE por
+    estado destino que solo toca filas en un estado anterior, de modo que
+    repetir eventos o recibirlos desordenados (p. ej. 'sent' tras
+    'delivered') no tiene efecto.
+
+    Devuelve (filas actualizadas, eventos pendientes). Los pendientes son
+    los de sids que aún no existen: el callback llegó antes de que
+    deliver_notifications guardara el sid, y hay que reintentarlos.
+    """
+    latest = {}
+    for sid, status in events:
+        if status not in STATUS_RANK:
+            continue
+        if sid not in latest or STATUS_RANK[status] > STATUS_RANK[latest[sid]]:
+            latest[sid] = status
+
+    sids_by_status = {}
+    for sid, status in latest.items():
+        sids_by_status.setdefault(status, []).append(sid)
+
+    updated = 0
+    with transaction.atomic():
+        known = set(
+            SMSNotification.objects.filter(sid__in=list(latest)).values_list('sid', flat=True)
+        )
+        for status, sids in sids_by_status.items():
+            previous_statuses = [s for s, rank in STATUS_RANK.items() if rank < STATUS_RANK[status]]
+            updated += SMSNotification.objects.filter(
+                sid__in=sids,
+                status__in=previous_statuses
+            ).update(status=status)
+
+    pending = [(sid, status) for sid, status in latest.items() if sid not in known]
+    return updated, pending
+
+
+def _encode_event(sid, status, received_at):
+    return f'{sid}:{status}:{received_at:.0f}'
+
+
+def _decode_event(raw):
+    """(sid, estado, recibido) de una entrada del buffer"""
+    parts = raw.decode().split(':')
+    received_at = float(parts[2]) if len(parts) > 2 else time.time()
+    return parts[0], parts[1], received_at
+
+
+def _apply_now(sid, status):
+    _, pending = apply_status_events([(sid, status)])
+    if pending:
+        # Sin buffer no hay dónde esperar a que se guarde el sid
+        logger.warning(f'Evento de SMS {sid}:{status} sin notificación registrada; se descarta')
+
+
+def record_status_event(sid, status):
+    """
+    Guarda un evento de estado en el buffer de Redis y devuelve su longitud.
+    Sin Redis (o si falla) el evento se aplica directamente (0).
+    """
+    if status not in STATUS_RANK:
+        return 0
+
+    client = get_redis()
+    if client is not None:
+        try:
+            return client.rpush(STATUS_EVENTS_KEY, _encode_event(sid, status, time.time()))
+        except redis.RedisError as e:
+            logger.warning(f'Redis no disponible, evento de SMS aplicado directamente: {e}')
+
+    _apply_now(sid, status)
+    return 0
+
+
+def flush_status_events(batch_size):
+    """
+    Vacía el buffer de eventos por lotes. Cada lote se aplica antes de
+    recortarse de la lista, así que una caída a medias solo provoca que se
+    reaplique (sin efecto, las actualizaciones son idempotentes).
+
+    Los eventos cuyo sid aún no existe vuelven al final de la lista y se
+    reintentan en la siguiente pasada, hasta SMS_RETRY_LEASE segundos
+    (lo más que puede tardar un envío antes de que se recupere).
+    """
+    client = get_redis()
+    if client is None:
+        return 0
+
+    lock = client.lock(f'{STATUS_EVENTS_KEY}:flush', timeout=60)
+    if not lock.acquire(blocking=False):
+        return 0
+
+    updated = 0
+    try:
+        # Solo lo que había al empezar: los reencolados esperan a la siguiente pasada
+        remaining = client.llen(STATUS_EVENTS_KEY)
+        while remaining > 0:
+            raw_events = client.lrange(STATUS_EVENTS_KEY, 0, min(batch_size, remaining) - 1)
+            if not raw_events:
+                break
+            events = [_decode_event(raw) for raw in raw_events]
+            batch_updated, pending = apply_status_events((sid, status) for sid, status, _ in events)
+            updated += batch_updated
 
+            received = {}
+            for sid, status, received_at in events:
+                received[sid] = min(received_at, received.get(sid, received_at))
+            expired_before = time.time() - settings.SMS_RETRY_LEASE
+            retry = [
+                _encode_event(sid, status, received[sid])
+                for sid, status in pending
+                if received[sid] > expired_before
+            ]
+            if len(retry) < len(pending):
+                logger.warning(f'{len(pending) - len(retry)} eventos de SMS descartados sin notificación')
 
-    return sms.sid
+            pipe = client.pipeline()
+            if retry:
+                pipe.rpush(STATUS_EVENTS_KEY, *retry)
+            pipe.ltrim(STATUS_EVENTS_KEY, len(raw_events), -1)
+            pipe.execute()
+            remaining -= len(raw_events)
+    finally:
+        lock.release()
+    return updated
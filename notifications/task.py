@@ -0,0 +1,70 @@
+from celery import group, shared_task
+from django.conf import settings
+from django.db import transaction
+import logging
+
+from .services import claim_due_notifications, deliver_notifications, flush_status_events
+
+logger = logging.getLogger(__name__)
+
+@shared_task
+def send_queued_sms_task(notification_ids):
+    """Enviar un lote de notificaciones SMS en cola"""
+    try:
+        results = deliver_notifications(notification_ids)
+        failed_count = sum(1 for result in results if result.error is not None)
+        sent_count = len(results) - failed_count
+
+        logger.info(f'Tarea send_queued_sms: {sent_count} enviados, {failed_count} con error')
+        return f'{sent_count} enviados, {failed_count} con error'
+
+    except Exception as e:
+        logger.error(f'Error en send_queued_sms_task: {e}')
+        return f'Error: {e}'
+
+
+@shared_task
+def retry_queued_sms_task():
+    """Reintentar las notificaciones en cola cuyo turno ya llegó"""
+    try:
+        notification_ids = claim_due_notifications(settings.SMS_RETRY_BATCH_SIZE)
+        enqueue_delivery(notification_ids)
+
+        logger.info(f'Tarea retry_queued_sms: {len(notification_ids)} SMS reenviados a la cola')
+        return f'{len(notification_ids)} SMS reintentados'
+
+    except Exception as e:
+        logger.error(f'Error en retry_queued_sms_task: {e}')
+        return f'Error: {e}'
+
+
+@shared_task
+def flush_sms_status_events_task():
+    """Aplicar en bloque los eventos de estado de SMS acumulados"""
+    try:
+        updated_count = flush_status_events(settings.SMS_STATUS_BATCH_SIZE)
+
+        logger.info(f'Tarea flush_sms_status_events: {updated_count} notificaciones actualizadas')
+        return f'{updated_count} notificaciones actualizadas'
+
+    except Exception as e:
+        logger.error(f'Error en flush_sms_status_events_task: {e}')
+        return f'Error: {e}'
+
+
+def enqueue_delivery(notification_ids):
+    """
+    Reparte las notificaciones en lotes y los despacha en paralelo una vez
+    confirmada la transacción actual (las filas deben ser visibles para el worker).
+    """
+    chunk_size = settings.SMS_DELIVERY_CHUNK_SIZE
+    chunks = [
+        notification_ids[i:i + chunk_size]
+        for i in range(0, len(notification_ids), chunk_size)
+    ]
+    if not chunks:
+        return
+
+    transaction.on_commit(
+        lambda: group(send_queued_sms_task.s(chunk) for chunk in chunks).apply_async()
+    )
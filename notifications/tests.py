@@ -1,3 +1,375 @@
-from django.test import TestCase
+import time
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+import redis
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from clients.models import Client
+from .dispatch import dispatch
+from .models import SMSNotification
+from .ratelimit import LocalTokenBucket, RateLimiter, RedisTokenBucket
+from .services import (
+    STATUS_EVENTS_KEY, _encode_event, apply_status_events, claim_due_notifications,
+    deliver_notifications, flush_status_events, queue_notifications, record_status_event
+)
+
+
+class RetryableError(Exception):
+    pass
+
+
+class FakeBackend:
+    """Backend de prueba: solo decide qué errores se reintentan"""
+
+    def is_retryable(self, error):
+        return isinstance(error, RetryableError)
+
+
+class InlineExecutor:
+    """Ejecutor sin hilos: los envíos usan la misma conexión (y transacción) de la prueba"""
+
+    def __init__(self, max_workers=None):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def map(self, fn, items):
+        return map(fn, items)
+
+
+class FakeLock:
+
+    def acquire(self, blocking=True):
+        return True
+
+    def release(self):
+        pass
+
+
+class FakePipeline:
+
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    def rpush(self, *args):
+        self.calls.append(('rpush', args))
+
+    def ltrim(self, *args):
+        self.calls.append(('ltrim', args))
+
+    def execute(self):
+        for name, args in self.calls:
+            getattr(self.client, name)(*args)
+
+
+class FakeRedis:
+    """Lista de Redis en memoria con las operaciones que usa el buffer de eventos"""
+
+    def __init__(self):
+        self.items = []
+
+    def rpush(self, key, *values):
+        self.items.extend(value.encode() for value in values)
+        return len(self.items)
+
+    def llen(self, key):
+        return len(self.items)
+
+    def lrange(self, key, start, end):
+        return self.items[start:end + 1]
+
+    def ltrim(self, key, start, end):
+        self.items = self.items[start:]
+
+    def lock(self, name, timeout=None):
+        return FakeLock()
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+
+class DeliveryTestCase(TestCase):
+    """Cliente, backend y limitador de prueba para la etapa de envío"""
+
+    def setUp(self):
+        self.client_obj = Client.objects.create(first_name='Ana', last_name='López', phone='5551234567')
+        self.sent = []
+        self.send_side_effect = None
+
+        patches = [
+            mock.patch('notifications.services.send_sms', side_effect=self.fake_send),
+            mock.patch('notifications.services.get_backend', return_value=FakeBackend()),
+            mock.patch('notifications.dispatch.get_rate_limiter', return_value=RateLimiter(None)),
+            mock.patch('notifications.dispatch.ThreadPoolExecutor', InlineExecutor),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def fake_send(self, to_phone, message):
+        self.sent.append((to_phone, message))
+        if self.send_side_effect:
+            self.send_side_effect()
+        return f'SM{len(self.sent)}'
+
+    def queue(self, count=1):
+        return queue_notifications([(self.client_obj.id, f'Mensaje {i}') for i in range(count)])
+
+
+class QueueTests(DeliveryTestCase):
+
+    def test_queued_rows_are_leased_for_immediate_delivery(self):
+        ids = self.queue(2)
+
+        self.assertEqual(SMSNotification.objects.filter(id__in=ids, status='queued').count(), 2)
+        self.assertFalse(SMSNotification.objects.filter(next_attempt_at__lte=timezone.now()).exists())
+        self.assertEqual(claim_due_notifications(10), [])
+
+    def test_expired_lease_is_taken_by_the_sweep(self):
+        ids = self.queue()
+        SMSNotification.objects.update(next_attempt_at=timezone.now() - timedelta(seconds=1))
+
+        self.assertEqual(claim_due_notifications(10), ids)
+        notification = SMSNotification.objects.get()
+        self.assertEqual(notification.status, 'queued')
+        self.assertGreater(notification.next_attempt_at, timezone.now())
+
+
+class DeliverTests(DeliveryTestCase):
+
+    def test_successful_delivery_stores_sid(self):
+        ids = self.queue()
+
+        deliver_notifications(ids)
+
+        notification = SMSNotification.objects.get()
+        self.assertEqual((notification.status, notification.sid, notification.attempts), ('sent', 'SM1', 1))
+        self.assertIsNone(notification.next_attempt_at)
+
+    def test_redelivered_chunk_is_not_sent_twice(self):
+        ids = self.queue()
+
+        deliver_notifications(ids)
+        deliver_notifications(ids)
+
+        self.assertEqual(len(self.sent), 1)
+
+    def test_concurrent_redelivery_and_sweep_skip_rows_being_sent(self):
+        ids = self.queue()
+        swept = []
+
+        def redeliver():
+            # Mientras se envía: otra entrega del mismo chunk y el barrido
+            self.send_side_effect = None
+            deliver_notifications(ids)
+            swept.extend(claim_due_notifications(10))
+        self.send_side_effect = redeliver
+
+        deliver_notifications(ids)
+
+        self.assertEqual(len(self.sent), 1)
+        self.assertEqual(swept, [])
+        self.assertEqual(SMSNotification.objects.get().status, 'sent')
+
+    def test_expired_sending_row_is_recovered_and_not_overwritten(self):
+        ids = self.queue()
+
+        def worker_stalls():
+            SMSNotification.objects.update(next_attempt_at=timezone.now() - timedelta(seconds=1))
+            self.assertEqual(claim_due_notifications(10), ids)
+        self.send_side_effect = worker_stalls
+
+        deliver_notifications(ids)
+
+        notification = SMSNotification.objects.get()
+        self.assertEqual(notification.status, 'queued')
+        self.assertIsNone(notification.sid)
+
+    def test_retryable_error_goes_back_to_the_queue(self):
+        ids = self.queue()
+        self.send_side_effect = mock.Mock(side_effect=RetryableError('429'))
+
+        deliver_notifications(ids)
+
+        notification = SMSNotification.objects.get()
+        self.assertEqual((notification.status, notification.attempts), ('queued', 1))
+        self.assertEqual(notification.last_error, '429')
+        self.assertGreater(notification.next_attempt_at, timezone.now())
+
+    @override_settings(SMS_MAX_ATTEMPTS=1)
+    def test_retryable_error_fails_after_max_attempts(self):
+        ids = self.queue()
+        self.send_side_effect = mock.Mock(side_effect=RetryableError('503'))
+
+        deliver_notifications(ids)
+
+        self.assertEqual(SMSNotification.objects.get().status, 'failed')
+
+    def test_permanent_error_fails(self):
+        ids = self.queue()
+        self.send_side_effect = mock.Mock(side_effect=ValueError('número inválido'))
+
+        deliver_notifications(ids)
+
+        notification = SMSNotification.objects.get()
+        self.assertEqual(notification.status, 'failed')
+        self.assertIsNone(notification.next_attempt_at)
+
+
+class StatusEventTests(DeliveryTestCase):
+
+    def create_sent(self, sid, status='sent'):
+        return SMSNotification.objects.create(client=self.client_obj, message='Hola', sid=sid, status=status)
+
+    def test_out_of_order_events_keep_the_most_advanced(self):
+        notification = self.create_sent('SM1')
+
+        updated, pending = apply_status_events([('SM1', 'delivered'), ('SM1', 'sent'), ('SM1', 'queued')])
+        self.assertEqual((updated, pending), (1, []))
+        notification.refresh_from_db()
+        self.assertEqual(notification.status, 'delivered')
+
+        # Un 'sent' tardío en otro lote tampoco retrocede el estado
+        self.assertEqual(apply_status_events([('SM1', 'sent')]), (0, []))
+        notification.refresh_from_db()
+        self.assertEqual(notification.status, 'delivered')
+
+    def test_unknown_statuses_are_ignored(self):
+        self.create_sent('SM1')
+
+        self.assertEqual(apply_status_events([('SM1', 'accepted')]), (0, []))
+
+    def test_event_before_sid_is_stored_is_pending(self):
+        ids = self.queue()
+
+        # El callback de Twilio llega antes de que se guarde el sid
+        updated, pending = apply_status_events([('SM1', 'delivered')])
+        self.assertEqual((updated, pending), (0, [('SM1', 'delivered')]))
+
+        deliver_notifications(ids)
+        self.assertEqual(apply_status_events(pending), (1, []))
+        self.assertEqual(SMSNotification.objects.get().status, 'delivered')
+
+    def test_flush_requeues_late_events_until_the_sid_exists(self):
+        fake_redis = FakeRedis()
+        ids = self.queue()
+        with mock.patch('notifications.services.get_redis', return_value=fake_redis):
+            record_status_event('SM1', 'delivered')
+
+            self.assertEqual(flush_status_events(10), 0)
+            self.assertEqual(len(fake_redis.items), 1)
+
+            deliver_notifications(ids)
+            self.assertEqual(flush_status_events(10), 1)
+
+        self.assertEqual(fake_redis.items, [])
+        self.assertEqual(SMSNotification.objects.get().status, 'delivered')
+
+    def test_flush_drops_events_older_than_the_lease(self):
+        fake_redis = FakeRedis()
+        self.create_sent('SM1')
+        old = time.time() - 700
+        fake_redis.rpush(STATUS_EVENTS_KEY, _encode_event('SM9', 'delivered', old), 'SM1:delivered')
+
+        with mock.patch('notifications.services.get_redis', return_value=fake_redis):
+            self.assertEqual(flush_status_events(1), 1)
+
+        self.assertEqual(fake_redis.items, [])
+        self.assertEqual(SMSNotification.objects.get().status, 'delivered')
+
+    def test_record_falls_back_when_redis_fails(self):
+        self.create_sent('SM1')
+        failing_redis = mock.Mock()
+        failing_redis.rpush.side_effect = redis.ConnectionError('caído')
+
+        with mock.patch('notifications.services.get_redis', return_value=failing_redis):
+            self.assertEqual(record_status_event('SM1', 'delivered'), 0)
+
+        self.assertEqual(SMSNotification.objects.get().status, 'delivered')
+
+
+class StatusCallbackTests(DeliveryTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.notifications = [
+            SMSNotification.objects.create(client=self.client_obj, message='Hola', sid=f'SM{i}', status='sent')
+            for i in range(3)
+        ]
+        self.url = reverse('sms_status_callback')
+
+    def post_status(self, sid, status):
+        return self.client.post(self.url, {'MessageSid': sid, 'MessageStatus': status})
+
+    def test_without_redis_the_event_is_applied_at_once(self):
+        with mock.patch('notifications.services.get_redis', return_value=None):
+            self.assertEqual(self.post_status('SM0', 'delivered').status_code, 200)
+
+        self.assertEqual(SMSNotification.objects.get(sid='SM0').status, 'delivered')
+
+    @override_settings(SMS_STATUS_BATCH_SIZE=2)
+    def test_events_are_buffered_and_flushed_in_batches(self):
+        fake_redis = FakeRedis()
+        with mock.patch('notifications.services.get_redis', return_value=fake_redis), \
+                mock.patch('notifications.views.flush_sms_status_events_task') as flush_task:
+            self.post_status('SM0', 'delivered')
+            flush_task.delay.assert_not_called()
+            self.post_status('SM1', 'undelivered')
+            flush_task.delay.assert_called_once_with()
+
+            # Repetido y desordenado: no cambia el resultado
+            self.post_status('SM0', 'sent')
+            self.post_status('SM2', 'delivered')
+            self.assertEqual(SMSNotification.objects.filter(status='sent').count(), 3)
+
+            self.assertEqual(flush_status_events(1), 3)
+
+        self.assertEqual(fake_redis.items, [])
+        self.assertEqual(
+            dict(SMSNotification.objects.values_list('sid', 'status')),
+            {'SM0': 'delivered', 'SM1': 'undelivered', 'SM2': 'delivered'}
+        )
+
+class RateLimitTests(TestCase):
+
+    def test_local_bucket_allows_burst_then_waits(self):
+        bucket = LocalTokenBucket(rate=10, capacity=2)
+
+        self.assertEqual(bucket.try_acquire(), 0)
+        self.assertEqual(bucket.try_acquire(), 0)
+        wait = bucket.try_acquire()
+        self.assertGreater(wait, 0)
+        self.assertLessEqual(wait, 0.1)
+
+    def test_local_bucket_refills_over_time(self):
+        bucket = LocalTokenBucket(rate=10, capacity=1)
+        bucket.try_acquire()
+
+        with mock.patch('notifications.ratelimit.time.monotonic', return_value=bucket._updated + 0.2):
+            self.assertEqual(bucket.try_acquire(), 0)
+
+    def test_redis_bucket_falls_back_to_local(self):
+        client = mock.Mock()
+        client.register_script.return_value = mock.Mock(side_effect=redis.ConnectionError('caído'))
+        bucket = RedisTokenBucket(client, 'sms:ratelimit', rate=10, capacity=1)
+
+        self.assertEqual(bucket.try_acquire(), 0)
+        self.assertGreater(bucket.try_acquire(), 0)
+
+    def test_limiter_failure_only_affects_its_message(self):
+        limiter = mock.Mock()
+        limiter.acquire.side_effect = [None, redis.ConnectionError('caído')]
+
+        results = dispatch([(1, '555', 'a'), (2, '555', 'b')], lambda to, msg: 'SM', 1, limiter)
+
+        self.assertEqual(results[0].sid, 'SM')
+        self.assertIsNone(results[0].error)
+        self.assertIsInstance(results[1].error, redis.ConnectionError)
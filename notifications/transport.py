@@ -0,0 +1,157 @@
+"""
+Capa de transporte para SMS: un backend por proceso (`settings.SMS_BACKEND`)
+con pool de conexiones HTTP keep-alive reutilizado entre mensajes.
+"""
+import os
+import threading
+import uuid
+
+import requests
+from requests.adapters import HTTPAdapter
+from twilio.base.exceptions import TwilioRestException
+from twilio.http.http_client import TwilioHttpClient
+from twilio.rest import Client
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+def _pooled_session():
+    """Sesión HTTP con pool de conexiones dimensionado desde settings"""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=settings.SMS_HTTP_POOL_SIZE,
+        pool_maxsize=settings.SMS_HTTP_POOL_SIZE,
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+class BaseSMSBackend:
+    """Interfaz común de los backends de SMS"""
+
+    def send(self, to_phone, message, status_callback=None):
+        """Envía un mensaje y devuelve su identificador (sid)"""
+        raise NotImplementedError
+
+    def close(self):
+        """Libera las conexiones abiertas"""
+        pass
+
+    def is_retryable(self, error):
+        """Indica si un error de envío es transitorio (throttling, red, 5xx)"""
+        if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+            return True
+        if isinstance(error, requests.HTTPError) and error.response is not None:
+            return error.response.status_code == 429 or error.response.status_code >= 500
+        return False
+
+
+class TwilioBackend(BaseSMSBackend):
+    """Envío real a través de la API de Twilio"""
+
+    def __init__(self):
+        self.http_client = TwilioHttpClient(
+            pool_connections=False,
+            timeout=settings.SMS_HTTP_TIMEOUT,
+        )
+        self.http_client.session = _pooled_session()
+        self.client = Client(
+            settings.TWILIO_ACCOUNT_SID,
+            settings.TWILIO_AUTH_TOKEN,
+            http_client=self.http_client,
+        )
+
+    def send(self, to_phone, message, status_callback=None):
+        sms = self.client.messages.create(
+            body=message,
+            from_=settings.TWILIO_PHONE_NUMBER,
+            to=to_phone,
+            status_callback=status_callback,
+        )
+        return sms.sid
+
+    def close(self):
+        self.http_client.session.close()
+
+    def is_retryable(self, error):
+        if isinstance(error, TwilioRestException):
+            return error.status == 429 or error.status >= 500
+        return super().is_retryable(error)
+
+
+class HTTPBackend(BaseSMSBackend):
+    """
+    Envío a un servidor SMS falso (benchmarks). Hace POST de un JSON
+    {to, from, body, status_callback} a `SMS_FAKE_SERVER_URL` y espera
+    una respuesta {"sid": "..."}.
+    """
+
+    def __init__(self):
+        self.url = settings.SMS_FAKE_SERVER_URL
+        self.session = _pooled_session()
+
+    def send(self, to_phone, message, status_callback=None):
+        response = self.session.post(
+            self.url,
+            json={
+                'to': to_phone,
+                'from': settings.TWILIO_PHONE_NUMBER,
+                'body': message,
+                'status_callback': status_callback,
+            },
+            timeout=settings.SMS_HTTP_TIMEOUT,
+        )
+        response.raise_for_status()
+        return response.json()['sid']
+
+    def close(self):
+        self.session.close()
+
+
+class LocMemBackend(BaseSMSBackend):
+    """Guarda los mensajes en memoria, sin red (desarrollo y pruebas)"""
+
+    def __init__(self):
+        self.outbox = []
+        self._lock = threading.Lock()
+
+    def send(self, to_phone, message, status_callback=None):
+        sid = f'SM{uuid.uuid4().hex}'
+        with self._lock:
+            self.outbox.append({'sid': sid, 'to': to_phone, 'body': message})
+        return sid
+
+
+_backend = None
+_backend_pid = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """
+    Devuelve el backend de SMS del proceso actual, creándolo si hace falta.
+
+    Se crea bajo un lock (hilos de Celery) y se descarta si cambia el PID
+    (hijos de prefork), para no compartir sockets heredados del padre.
+    """
+    global _backend, _backend_pid
+
+    pid = os.getpid()
+    if _backend is None or _backend_pid != pid:
+        with _backend_lock:
+            if _backend is None or _backend_pid != pid:
+                _backend = import_string(settings.SMS_BACKEND)()
+                _backend_pid = pid
+    return _backend
+
+
+def reset_backend():
+    """Cierra y descarta el backend actual (p. ej. tras cambiar settings)"""
+    global _backend, _backend_pid
+
+    with _backend_lock:
+        if _backend is not None and _backend_pid == os.getpid():
+            _backend.close()
+        _backend = None
+        _backend_pid = None
@@ -1,6 +1,8 @@
+from django.conf import settings
 from django.views.decorators.csrf import csrf_exempt
 from django.http import HttpResponse
-from .models import SMSNotification
+from .services import record_status_event
+from .task import flush_sms_status_events_task
 
 @csrf_exempt
 def sms_status_callback(request):
@@ -8,6 +10,9 @@ def sms_status_callback(request):
     status = request.POST.get('MessageStatus')
 
     if sid and status:
-        SMSNotification.objects.filter(sid=sid).update(status=status)
+        # Los eventos se acumulan y se aplican por lotes
+        pending = record_status_event(sid, status)
+        if pending and pending % settings.SMS_STATUS_BATCH_SIZE == 0:
+            flush_sms_status_events_task.delay()
 
     return HttpResponse('OK')
@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+
+def user_cache_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ModelBackend que guarda en caché el usuario de la sesión (con su rol),
+    así las páginas autenticadas no vuelven a leer la fila del usuario en
+    cada petición. La entrada se borra al guardar o eliminar el usuario
+    (ver signals); con USER_CACHE_TTL = 0 se comporta como ModelBackend.
+    """
+
+    def get_user(self, user_id):
+        if not settings.USER_CACHE_TTL:
+            return super().get_user(user_id)
+
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(key, user, settings.USER_CACHE_TTL)
+            return user
+
+        return user if self.user_can_authenticate(user) else None
@@ -1,7 +1,14 @@
+from functools import wraps
+
 from django.core.exceptions import PermissionDenied
 
 def allowed_roles(roles=[]):
+    """
+    Permite la vista solo a superusuarios y a los roles indicados. El usuario
+    llega de CachedModelBackend, así que la comprobación no consulta la BD.
+    """
     def decorator(view_func):
+        @wraps(view_func)
         def wrapper(request, *args, **kwargs):
 
             # Superusuario siempre permitido
@@ -9,7 +16,7 @@ def allowed_roles(roles=[]):
                 return view_func(request, *args, **kwargs)
 
             # Usuario normal con rol válido
-            if hasattr(request.user, 'role') and request.user.role in roles:
+            if getattr(request.user, 'role', None) in roles:
                 return view_func(request, *args, **kwargs)
 
             raise PermissionDenied
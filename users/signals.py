@@ -0,0 +1,18 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .backends import user_cache_key
+from .models import User
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    """
+    Un cambio de rol, contraseña o estado se aplica en la siguiente petición.
+    Se borra al confirmar: antes, otra petición podría volver a cachear la
+    fila anterior.
+    """
+    key = user_cache_key(instance.pk)
+    transaction.on_commit(lambda: cache.delete(key))
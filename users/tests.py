@@ -1,3 +1,60 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
 
-# Create your tests here.
+from .backends import CachedModelBackend, user_cache_key
+from .models import User
+
+
+@override_settings(USER_CACHE_TTL=300)
+class CachedModelBackendTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.backend = CachedModelBackend()
+        self.user = User.objects.create_user(username='recepcion', password='secreto', role='recep')
+
+    def test_user_is_read_once(self):
+        self.assertEqual(self.backend.get_user(self.user.pk), self.user)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.backend.get_user(self.user.pk).role, 'recep')
+
+    @override_settings(USER_CACHE_TTL=0)
+    def test_disabled_cache_always_reads_the_row(self):
+        self.backend.get_user(self.user.pk)
+
+        with self.assertNumQueries(1):
+            self.backend.get_user(self.user.pk)
+        self.assertIsNone(cache.get(user_cache_key(self.user.pk)))
+
+    def test_save_invalidates_after_commit(self):
+        self.backend.get_user(self.user.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.role = 'admin'
+            self.user.save()
+            # Hasta confirmar se sigue sirviendo la fila anterior
+            self.assertEqual(self.backend.get_user(self.user.pk).role, 'recep')
+
+        self.assertEqual(self.backend.get_user(self.user.pk).role, 'admin')
+
+    def test_delete_invalidates(self):
+        self.backend.get_user(self.user.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.get(pk=self.user.pk).delete()
+
+        self.assertIsNone(self.backend.get_user(self.user.pk))
+
+    def test_role_change_applies_to_the_next_request(self):
+        self.client.login(username='recepcion', password='secreto')
+        url = reverse('jumping:booking_list')
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.role = ''
+            self.user.save()
+
+        self.assertEqual(self.client.get(url).status_code, 403)
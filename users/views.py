@@ -1,6 +1,2 @@
-from django.shortcuts import render
-from django.contrib.auth.decorators import login_required
-
-@login_required
-def home(request):
-    return render(request, 'home.html')
+# La vista principal del dashboard vive en clients.views
+from clients.views import home  # noqa: F401